@@ -22,25 +22,62 @@ def create_app() -> Flask:
     
     app.config.from_object(Config())
 
-    CORS(app)  # allow cross-origin for MVP
+    CORS(app, expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"])  # allow cross-origin for MVP
     db.init_app(app)
     jwt.init_app(app)
     socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet')
 
+    from .utils.compression import init_compression
+    init_compression(app)
+
     with app.app_context():
         from . import models  # noqa: F401
+        from .utils import totals  # noqa: F401  (mantém Proposal.total_value)
+        from .utils import visibility  # noqa: F401  (mantém supplier_visibility)
+        from .utils import search  # noqa: F401  (mantém search_documents)
         db.create_all()
+        search.configure(db.engine, app.config["SEARCH_BACKEND"])
+
+        from .utils.auth import identity_cache, require_roles
+        identity_cache.configure(
+            maxsize=app.config["IDENTITY_CACHE_SIZE"],
+            ttl=app.config["IDENTITY_CACHE_TTL"],
+        )
+
+        from .utils.cache import result_cache
+        result_cache.configure(
+            max_entries=app.config["RESULT_CACHE_MAX_ENTRIES"],
+            max_bytes=app.config["RESULT_CACHE_MAX_BYTES"],
+        )
+
+        from .utils.deadlines import deadline_scheduler
+        if app.config["DEADLINE_SCHEDULER_ENABLED"]:
+            deadline_scheduler.start(app)
+
+        from .utils.autosave import autosave_buffer
+        autosave_buffer.configure(app.config["AUTOSAVE_FLUSH_INTERVAL_MS"])
+        autosave_buffer.start(app)
+
+        from .utils.passwords import hashing_executor
+        hashing_executor.configure(
+            workers=app.config["PASSWORD_HASH_WORKERS"],
+            max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+        )
 
         # Register blueprints
         from .blueprints.auth import bp as auth_bp
         from .blueprints.procurements import bp as proc_bp
         from .blueprints.tr import bp as tr_bp
         from .blueprints.proposals import bp as proposals_bp
+        from .blueprints.dashboard import bp as dashboard_bp
+        from .blueprints.search import bp as search_bp
 
         app.register_blueprint(auth_bp, url_prefix="/api/auth")
         app.register_blueprint(proc_bp, url_prefix="/api")
         app.register_blueprint(tr_bp, url_prefix="/api")
         app.register_blueprint(proposals_bp, url_prefix="/api")
+        app.register_blueprint(dashboard_bp, url_prefix="/api")
+        app.register_blueprint(search_bp, url_prefix="/api")
 
         # Rota principal para servir o HTML
         @app.route('/')
@@ -52,4 +89,38 @@ def create_app() -> Flask:
         def healthz():
             return {"status": "ok"}
 
+        @app.cli.command("rebuild-proposal-totals")
+        def rebuild_proposal_totals():
+            """Recalcula total_value/item_count de todas as propostas"""
+            count = totals.rebuild_all_proposal_totals(db.session)
+            db.session.commit()
+            print(f"{count} propostas recalculadas")
+
+        @app.cli.command("rebuild-supplier-visibility")
+        def rebuild_supplier_visibility():
+            """Recria a tabela supplier_visibility a partir dos convites"""
+            count = visibility.rebuild_supplier_visibility(db.session)
+            db.session.commit()
+            print(f"{count} linhas de visibilidade")
+
+        @app.cli.command("rebuild-search-index")
+        def rebuild_search_index():
+            """Recria search_documents e o índice de busca"""
+            count = search.rebuild_search_index(db.session)
+            db.session.commit()
+            print(f"{count} documentos indexados")
+
+        # Métricas internas de cache (só para compradores autenticados)
+        @app.get("/healthz/stats")
+        @require_roles("COMPRADOR")
+        def healthz_stats(user):
+            return {
+                "identity_cache": identity_cache.stats(),
+                "password_hashing": hashing_executor.stats(),
+                "result_cache": result_cache.stats(),
+                "search": search.search_index.stats(),
+                "deadlines": deadline_scheduler.stats(),
+                "autosave": autosave_buffer.stats(),
+            }
+
     return app
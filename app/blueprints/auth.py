@@ -4,10 +4,18 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 from datetime import timedelta
 from .. import db
 from ..models import User, Organization, Role
-from ..utils.passwords import hash_password, verify_password
+from ..utils.passwords import hash_password, verify_password, HashingBusy
+from ..utils.auth import claims_for
 
 bp = Blueprint("auth", __name__)
 
+
+@bp.errorhandler(HashingBusy)
+def hashing_busy(_exc):
+    # Pico de logins (ex.: perto do prazo): recusar rápido em vez de enfileirar
+    return {"error": "servidor ocupado, tente novamente em instantes"}, 503, {"Retry-After": "2"}
+
+
 @bp.post("/register")
 def register():
     data = request.get_json() or {}
@@ -56,8 +64,10 @@ def login():
         return {"error": "credenciais invalidas"}, 401
     
     # IMPORTANTE: Use apenas o ID como string
+    # role/org_id/email vão como claims assinadas para checagens sem banco
     token = create_access_token(
         identity=str(user.id),  # Converter para string
+        additional_claims=claims_for(user),
         expires_delta=timedelta(days=7)
     )
     
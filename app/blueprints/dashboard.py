@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Painel inicial por papel: histogramas de status, pendências e itens
+recentes agregados no servidor.
+
+Todos os contadores de um papel saem de um único UNION ALL de GROUP BYs
+(uma ida ao banco); os itens recentes vêm de uma segunda consulta limitada.
+"""
+
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy import String, and_, cast, func, literal, select, union_all
+from .. import db
+from ..models import (
+    Procurement, ProcurementStatus, TR, TRStatus, Invite,
+    Proposal, ProposalStatus, Role
+)
+from ..utils.auth import get_current_user
+from ..utils.suppliers import supplier_visibility_filter
+
+bp = Blueprint("dashboard", __name__)
+
+RECENT_DEFAULT = 5
+RECENT_MAX = 50
+
+
+def _histogram(name, column, *criteria, select_from=None):
+    stmt = select(
+        literal(name).label("metric"),
+        cast(column, String).label("key"),
+        func.count().label("total"),
+    )
+    if select_from is not None:
+        stmt = stmt.select_from(select_from)
+    return stmt.where(*criteria).group_by(column)
+
+
+def _counter(name, key, select_from, *criteria):
+    return select(
+        literal(name).label("metric"),
+        literal(key).label("key"),
+        func.count().label("total"),
+    ).select_from(select_from).where(*criteria)
+
+
+def _run_aggregates(*selects) -> dict:
+    out = {}
+    for row in db.session.execute(union_all(*selects)):
+        out.setdefault(row.metric, {})[row.key] = row.total
+    return out
+
+
+def _recent(criteria, limit):
+    rows = db.session.query(
+        Procurement.id,
+        Procurement.title,
+        Procurement.status,
+        Procurement.created_at,
+        Procurement.deadline_proposals,
+    ).filter(*criteria).order_by(
+        Procurement.created_at.desc(), Procurement.id.desc()
+    ).limit(limit).all()
+
+    return [{
+        "id": row.id,
+        "title": row.title,
+        "status": row.status.value if row.status else None,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "deadline": row.deadline_proposals.isoformat() if row.deadline_proposals else None
+    } for row in rows]
+
+
+def _comprador_dashboard(user, limit):
+    aggregates = _run_aggregates(
+        _histogram("procurements_by_status", Procurement.status),
+        _counter("pending", "trs_awaiting_approval", TR, TR.status == TRStatus.SUBMETIDO),
+        _counter("pending", "ready_to_open", Procurement, Procurement.status == ProcurementStatus.TR_APROVADO),
+        _counter("pending", "proposals_submitted", Proposal, Proposal.status == ProposalStatus.ENVIADA),
+    )
+    return aggregates, _recent([], limit)
+
+
+def _requisitante_dashboard(user, limit):
+    own = Procurement.requisitante_id == user.id
+    own_proposals = Proposal.__table__.join(Procurement, Procurement.id == Proposal.procurement_id)
+    aggregates = _run_aggregates(
+        _histogram("procurements_by_status", Procurement.status, own),
+        _counter("pending", "trs_to_write", Procurement, own, Procurement.status.in_([
+            ProcurementStatus.TR_PENDENTE, ProcurementStatus.TR_CRIADO, ProcurementStatus.TR_REJEITADO
+        ])),
+        _counter("pending", "proposals_awaiting_technical_review", own_proposals, own,
+                 Proposal.status == ProposalStatus.ENVIADA),
+    )
+    return aggregates, _recent([own], limit)
+
+
+def _fornecedor_dashboard(user, limit):
+    visible = supplier_visibility_filter(user)
+    open_invites = Invite.__table__.join(Procurement, Procurement.id == Invite.procurement_id)
+    own_drafts = Proposal.__table__.join(Procurement, Procurement.id == Proposal.procurement_id)
+    aggregates = _run_aggregates(
+        _histogram("procurements_by_status", Procurement.status, visible),
+        _histogram("proposals_by_status", Proposal.status, Proposal.supplier_user_id == user.id),
+        _counter("pending", "open_invites", open_invites, and_(
+            Invite.supplier_user_id == user.id,
+            Invite.accepted.isnot(True),
+            Procurement.status == ProcurementStatus.ABERTO
+        )),
+        _counter("pending", "draft_proposals", own_drafts, and_(
+            Proposal.supplier_user_id == user.id,
+            Proposal.status == ProposalStatus.RASCUNHO,
+            Procurement.status == ProcurementStatus.ABERTO
+        )),
+    )
+    return aggregates, _recent([visible], limit)
+
+
+ROLE_DASHBOARDS = {
+    Role.COMPRADOR: _comprador_dashboard,
+    Role.REQUISITANTE: _requisitante_dashboard,
+    Role.FORNECEDOR: _fornecedor_dashboard,
+}
+
+
+@bp.get("/dashboard")
+@jwt_required()
+def get_dashboard():
+    """Resumo do painel inicial para o papel do usuário"""
+    user = get_current_user()
+
+    if not user:
+        return {"error": "Usuario nao encontrado"}, 404
+
+    try:
+        limit = max(1, min(int(request.args.get("recent", RECENT_DEFAULT)), RECENT_MAX))
+    except ValueError:
+        return {"error": "recent inválido"}, 400
+
+    aggregates, recent = ROLE_DASHBOARDS[user.role](user, limit)
+
+    response = {
+        "role": user.role.value,
+        "procurements_by_status": aggregates.get("procurements_by_status", {}),
+        "pending": aggregates.get("pending", {}),
+        "recent": recent
+    }
+    if user.role == Role.FORNECEDOR:
+        response["proposals_by_status"] = aggregates.get("proposals_by_status", {})
+    return response
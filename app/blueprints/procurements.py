@@ -1,61 +1,134 @@
 # -*- coding: utf-8 -*-
 import secrets
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-from sqlalchemy import or_, and_, func
+from itertools import chain
+from sqlalchemy import or_, and_, func, insert
+from sqlalchemy.orm import joinedload
 from .. import db, socketio
 from ..models import (
     Procurement, Invite, User, Role, TR, TRStatus, 
     ProcurementStatus, Proposal, ProposalStatus,
-    Organization, TRServiceItem, ProposalPrice, ProposalService
+    Organization, TRServiceItem, ProposalPrice, ProposalService, ScoringConfig
 )
 
 from ..utils.auth import get_current_user
+from ..utils.pagination import keyset_page, parse_limit
+from ..utils.suppliers import resolve_suppliers, supplier_visibility_filter
+from ..utils.comparison import load_comparison_rows, build_ai_analysis, money
+from ..utils.analytics import build_price_analytics, load_price_matrix, price_statistics
+from ..utils.scoring import (
+    MAX_SCENARIOS, build_scenarios_response, config_scenario, evaluate, load_scoring_config,
+    load_scoring_inputs, parse_scenario, parse_top_k, rank_stability, sweep_scenarios
+)
+from ..utils.cache import cached_by_version, data_versions
+from ..utils.http import conditional_json
+from ..utils.loaders import load_procurement_or_404
+from ..utils.deadlines import parse_deadline
+from ..utils.visibility import sync_invites
+from ..utils.export import (
+    EXPORT_FORMATS, ITEM_HEADER, cents, export_response, iter_item_matrix,
+    line_total, load_export_proposals, supplier_label
+)
 bp = Blueprint("procurements", __name__)
 
 @bp.get("/procurements")
 @jwt_required()
 def list_procurements():
-    """Lista processos baseado no role do usuário"""
+    """
+    Lista processos baseado no role do usuário, paginada por cursor.
+
+    Parâmetros: limit, cursor, order (desc|asc), status (lista separada por
+    vírgula), org_id, requisitante_id, created_from, created_to, count
+    (0 desliga a contagem total) e include=description.  O corpo continua sendo uma lista; a
+    próxima página e o total vão nos headers X-Next-Cursor e X-Total-Count.
+    """
     user = get_current_user()
     
     if not user:
         return {"error": "Usuario nao encontrado"}, 404
     
+    args = request.args
+    include = {f.strip() for f in args.get("include", "").split(",") if f.strip()}
+    
+    # Projeção: apenas as colunas listadas, com o TR no mesmo JOIN (sem N+1
+    # nem entidades ORM completas); a descrição só vem se pedida.
+    columns = [
+        Procurement.id,
+        Procurement.title,
+        Procurement.status,
+        Procurement.created_at,
+        Procurement.deadline_proposals,
+        TR.id.label("tr_id"),
+        TR.status.label("tr_status"),
+    ]
+    if "description" in include:
+        columns.append(Procurement.description)
+    query = db.session.query(*columns).outerjoin(TR, TR.procurement_id == Procurement.id)
+    
     if user.role == Role.REQUISITANTE:
         # Requisitante vê apenas processos atribuídos a ele
-        procurements = Procurement.query.filter_by(requisitante_id=user.id).all()
+        query = query.filter(Procurement.requisitante_id == user.id)
     elif user.role == Role.COMPRADOR:
         # Comprador vê todos os processos
-        procurements = Procurement.query.all()
+        pass
     else:  # FORNECEDOR
         # Fornecedor vê apenas processos abertos ou que foi convidado
-        invited_proc_ids = db.session.query(Invite.procurement_id).filter_by(
-            email=user.email
-        ).subquery()
+        query = query.filter(supplier_visibility_filter(user))
+    
+    try:
+        limit = parse_limit(args.get("limit"))
         
-        procurements = Procurement.query.filter(
-            or_(
-                Procurement.status.in_([ProcurementStatus.ABERTO, ProcurementStatus.ANALISE_TECNICA]),
-                Procurement.id.in_(invited_proc_ids)
-            )
-        ).all()
+        if args.get("status"):
+            statuses = [ProcurementStatus(s.strip()) for s in args["status"].split(",") if s.strip()]
+            query = query.filter(Procurement.status.in_(statuses))
+        if args.get("org_id"):
+            query = query.filter(Procurement.org_id == int(args["org_id"]))
+        if args.get("requisitante_id"):
+            query = query.filter(Procurement.requisitante_id == int(args["requisitante_id"]))
+        if args.get("created_from"):
+            query = query.filter(Procurement.created_at >= datetime.fromisoformat(args["created_from"]))
+        if args.get("created_to"):
+            query = query.filter(Procurement.created_at <= datetime.fromisoformat(args["created_to"]))
+    except ValueError:
+        return {"error": "Parâmetros de filtro inválidos"}, 400
+    
+    total = None
+    if args.get("count", "1").lower() not in ("0", "false", "no"):
+        total = query.order_by(None).count()
+    
+    try:
+        procurements, next_cursor = keyset_page(
+            query, Procurement.created_at, Procurement.id,
+            cursor=args.get("cursor"),
+            limit=limit,
+            descending=args.get("order", "desc").lower() != "asc"
+        )
+    except ValueError:
+        return {"error": "cursor inválido"}, 400
     
     result = []
-    for proc in procurements:
-        result.append({
-            "id": proc.id,
-            "title": proc.title,
-            "description": proc.description,
-            "status": proc.status.value if proc.status else "TR_PENDENTE",
-            "created_at": proc.created_at.isoformat() if proc.created_at else None,
-            "deadline": proc.deadline_proposals.isoformat() if proc.deadline_proposals else None,
-            "has_tr": proc.tr is not None,
-            "tr_status": proc.tr.status.value if proc.tr else None
-        })
-    
-    return jsonify(result)
+    for row in procurements:
+        item = {
+            "id": row.id,
+            "title": row.title,
+            "status": row.status.value if row.status else "TR_PENDENTE",
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "deadline": row.deadline_proposals.isoformat() if row.deadline_proposals else None,
+            "has_tr": row.tr_id is not None,
+            "tr_status": row.tr_status.value if row.tr_status else None
+        }
+        if "description" in include:
+            item["description"] = row.description
+        result.append(item)
+    
+    response = jsonify(result)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return response
 
 
 @bp.get("/procurements/<int:proc_id>")
@@ -63,18 +136,24 @@ def list_procurements():
 def get_procurement(proc_id: int):
     """Obtém detalhes completos do processo"""
     user = get_current_user()
-    proc = Procurement.query.get_or_404(proc_id)
+    
+    # Processo, TR, organização, contagens e visibilidade em uma única consulta
+    is_supplier = user.role == Role.FORNECEDOR
+    detail = load_procurement_or_404(proc_id, supplier_id=user.id if is_supplier else None)
+    proc = detail.procurement
     
     # Verificar permissões
-    if user.role == Role.FORNECEDOR:
+    if is_supplier and not detail.supplier_visible:
         # Fornecedor só pode ver se foi convidado ou processo está aberto
-        if proc.status not in [ProcurementStatus.ABERTO, ProcurementStatus.ANALISE_TECNICA]:
-            invited = Invite.query.filter_by(
-                procurement_id=proc_id,
-                email=user.email
-            ).first()
-            if not invited:
-                return {"error": "Não autorizado"}, 403
+        return {"error": "Não autorizado"}, 403
+    
+    # Nada mudou desde a última leitura do cliente: 304 sem montar o corpo
+    etag_parts = (proc.id, proc.updated_at, data_versions.get(proc_id), user.role.value)
+    return conditional_json(etag_parts, lambda: _procurement_detail(detail, user))
+
+
+def _procurement_detail(detail, user) -> dict:
+    proc = detail.procurement
     
     # Montar resposta completa
     response = {
@@ -87,25 +166,25 @@ def get_procurement(proc_id: int):
         "deadline": proc.deadline_proposals.isoformat() if proc.deadline_proposals else None,
         "organization": {
             "id": proc.org_id,
-            "name": Organization.query.get(proc.org_id).name if proc.org_id else None
+            "name": detail.org_name
         }
     }
     
     # Adicionar informações do TR se existir
-    if proc.tr:
+    if detail.tr_id:
         response["tr"] = {
-            "id": proc.tr.id,
-            "status": proc.tr.status.value,
-            "submitted_at": proc.tr.submitted_at.isoformat() if proc.tr.submitted_at else None,
-            "approved_at": proc.tr.approved_at.isoformat() if proc.tr.approved_at else None
+            "id": detail.tr_id,
+            "status": detail.tr_status.value,
+            "submitted_at": detail.tr_submitted_at.isoformat() if detail.tr_submitted_at else None,
+            "approved_at": detail.tr_approved_at.isoformat() if detail.tr_approved_at else None
         }
     
     # Adicionar contagem de propostas para compradores
     if user.role == Role.COMPRADOR:
-        response["proposals_count"] = Proposal.query.filter_by(procurement_id=proc_id).count()
-        response["invites_count"] = Invite.query.filter_by(procurement_id=proc_id).count()
+        response["proposals_count"] = detail.proposals_count
+        response["invites_count"] = detail.invites_count
     
-    return jsonify(response)
+    return response
 
 
 @bp.post("/procurements")
@@ -180,10 +259,18 @@ def update_procurement(proc_id: int):
     if "description" in data:
         proc.description = data["description"]
     if "deadline_proposals" in data:
-        proc.deadline_proposals = datetime.fromisoformat(data["deadline_proposals"])
+        # Processo aberto: o agendador de encerramento acompanha o novo prazo
+        try:
+            proc.deadline_proposals = (
+                parse_deadline(data["deadline_proposals"], current_app.config["APP_TIMEZONE"])
+                if data["deadline_proposals"] else None
+            )
+        except ValueError:
+            return {"error": "Prazo inválido"}, 400
     
     proc.updated_at = datetime.utcnow()
     db.session.commit()
+    data_versions.bump(proc.id)
     
     return {"message": "Processo atualizado", "procurement_id": proc.id}
 
@@ -226,6 +313,7 @@ def send_invite(proc_id: int):
     )
     db.session.add(invite)
     db.session.commit()
+    data_versions.bump(proc_id)
     
     # Notificar via WebSocket
     socketio.emit("invite.sent", {
@@ -234,14 +322,13 @@ def send_invite(proc_id: int):
         "title": proc.title
     }, to=f"proc:{proc_id}")
     
-    # Se o fornecedor já está cadastrado, notificar diretamente
-    supplier = User.query.filter_by(email=email, role=Role.FORNECEDOR).first()
-    if supplier:
+    # Se o fornecedor já está cadastrado (resolvido no flush), notificar diretamente
+    if invite.supplier_user_id:
         socketio.emit("invite.received", {
             "procurement_id": proc_id,
             "title": proc.title,
             "token": token
-        }, to=f"user:{supplier.id}")
+        }, to=f"user:{invite.supplier_user_id}")
     
     return {
         "message": "Convite enviado",
@@ -250,6 +337,119 @@ def send_invite(proc_id: int):
     }
 
 
+MAX_BULK_INVITES = 500
+
+
+@bp.post("/procurements/<int:proc_id>/invites/bulk")
+@jwt_required()
+def send_invites_bulk(proc_id: int):
+    """
+    Envia convites em lote - apenas COMPRADOR.
+
+    Corpo: {"emails": [...], "message": "..."}.  Um número fixo de consultas
+    independente da quantidade de e-mails: convites existentes, fornecedores
+    cadastrados e um único INSERT; a resposta traz o resultado por e-mail.
+    """
+    data = request.get_json() or {}
+    user = get_current_user()
+    
+    # Verificar se é comprador
+    if user.role != Role.COMPRADOR:
+        return {"error": "Apenas compradores podem enviar convites"}, 403
+    
+    emails = data.get("emails")
+    if not isinstance(emails, list) or not emails:
+        return {"error": "emails deve ser uma lista não vazia"}, 400
+    if len(emails) > MAX_BULK_INVITES:
+        return {"error": f"Máximo de {MAX_BULK_INVITES} convites por requisição"}, 400
+    
+    proc = Procurement.query.get_or_404(proc_id)
+    
+    # Normalizar e classificar na ordem recebida
+    results = []
+    candidates = []
+    seen = set()
+    for raw in emails:
+        email = (raw or "").strip().lower() if isinstance(raw, str) else ""
+        result = {"email": email or raw}
+        if not email or "@" not in email:
+            result["status"] = "invalid"
+        elif email in seen:
+            result["status"] = "duplicate"
+        else:
+            seen.add(email)
+            candidates.append(email)
+        results.append(result)
+    
+    # Convites já existentes (uma consulta)
+    already_invited = {
+        email for (email,) in db.session.query(Invite.email).filter(
+            Invite.procurement_id == proc_id,
+            Invite.email.in_(candidates)
+        )
+    } if candidates else set()
+    new_emails = [email for email in candidates if email not in already_invited]
+    
+    # Fornecedores cadastrados (uma consulta) e INSERT único
+    suppliers = resolve_suppliers(new_emails)
+    created = {}
+    if new_emails:
+        now = datetime.utcnow()
+        rows = db.session.execute(
+            insert(Invite).returning(Invite.id, Invite.email, Invite.token, Invite.supplier_user_id),
+            [{
+                "procurement_id": proc_id,
+                "email": email,
+                "supplier_user_id": suppliers[email].id if email in suppliers else None,
+                "token": secrets.token_urlsafe(32),
+                "created_by": user.id,
+                "created_at": now,
+            } for email in new_emails]
+        ).all()
+        created = {row.email: row for row in rows}
+        # INSERT fora da unidade de trabalho: visibilidade sincronizada aqui
+        sync_invites(db.session, [row.id for row in rows])
+        db.session.commit()
+        data_versions.bump(proc_id)
+    
+    for result in results:
+        if "status" in result:
+            continue
+        email = result["email"]
+        if email in already_invited:
+            result["status"] = "already_invited"
+            continue
+        row = created[email]
+        result.update({
+            "status": "invited",
+            "invite_id": row.id,
+            "token": row.token,
+            "supplier_registered": row.supplier_user_id is not None
+        })
+    
+    # Notificações agrupadas: um evento para a sala do processo e um por
+    # fornecedor cadastrado (cada um recebe o próprio token)
+    if created:
+        socketio.emit("invite.sent", {
+            "procurement_id": proc_id,
+            "emails": list(created),
+            "title": proc.title
+        }, to=f"proc:{proc_id}")
+        for row in created.values():
+            if row.supplier_user_id:
+                socketio.emit("invite.received", {
+                    "procurement_id": proc_id,
+                    "title": proc.title,
+                    "token": row.token
+                }, to=f"user:{row.supplier_user_id}")
+    
+    return {
+        "message": f"{len(created)} convite(s) enviado(s)",
+        "invited": len(created),
+        "results": results
+    }
+
+
 @bp.get("/procurements/<int:proc_id>/invites")
 @jwt_required()
 def list_invites(proc_id: int):
@@ -261,10 +461,11 @@ def list_invites(proc_id: int):
         return {"error": "Apenas compradores podem ver convites"}, 403
     
     invites = Invite.query.filter_by(procurement_id=proc_id).all()
+    suppliers = resolve_suppliers(inv.email for inv in invites)
     
     result = []
     for inv in invites:
-        supplier = User.query.filter_by(email=inv.email, role=Role.FORNECEDOR).first()
+        supplier = suppliers.get(inv.email)
         result.append({
             "id": inv.id,
             "email": inv.email,
@@ -272,7 +473,7 @@ def list_invites(proc_id: int):
             "accepted_at": inv.accepted_at.isoformat() if inv.accepted_at else None,
             "created_at": inv.created_at.isoformat(),
             "supplier_name": supplier.full_name if supplier else None,
-            "supplier_org": supplier.organization.name if supplier and supplier.organization else None
+            "supplier_org": supplier.org_name if supplier else None
         })
     
     return jsonify(result)
@@ -300,7 +501,9 @@ def accept_invite(token: str):
     
     invite.accepted = True
     invite.accepted_at = datetime.utcnow()
+    invite.supplier_user_id = user.id
     db.session.commit()
+    data_versions.bump(invite.procurement_id)
     
     # Notificar comprador
     socketio.emit("invite.accepted", {
@@ -339,22 +542,31 @@ def open_procurement(proc_id: int):
     
     deadline = data.get("deadline")
     if deadline:
-        proc.deadline_proposals = datetime.fromisoformat(deadline)
+        try:
+            proc.deadline_proposals = parse_deadline(deadline, current_app.config["APP_TIMEZONE"])
+        except ValueError:
+            return {"error": "Prazo inválido"}, 400
+        if proc.deadline_proposals <= datetime.utcnow():
+            return {"error": "Prazo deve ser uma data futura"}, 400
     
     proc.status = ProcurementStatus.ABERTO
     proc.updated_at = datetime.utcnow()
     db.session.commit()
-    
-    # Notificar todos os fornecedores convidados
-    invites = Invite.query.filter_by(procurement_id=proc_id).all()
-    for inv in invites:
-        supplier = User.query.filter_by(email=inv.email, role=Role.FORNECEDOR).first()
-        if supplier:
-            socketio.emit("procurement.opened", {
-                "procurement_id": proc.id,
-                "title": proc.title,
-                "deadline": proc.deadline_proposals.isoformat() if proc.deadline_proposals else None
-            }, to=f"user:{supplier.id}")
+    data_versions.bump(proc.id)
+    
+    # Notificar todos os fornecedores convidados (uma consulta, um emit)
+    supplier_rooms = [f"user:{supplier_id}" for (supplier_id,) in db.session.query(
+        Invite.supplier_user_id
+    ).filter(
+        Invite.procurement_id == proc_id,
+        Invite.supplier_user_id.isnot(None)
+    )]
+    if supplier_rooms:
+        socketio.emit("procurement.opened", {
+            "procurement_id": proc.id,
+            "title": proc.title,
+            "deadline": proc.deadline_proposals.isoformat() if proc.deadline_proposals else None
+        }, to=supplier_rooms)
     
     # Notificar sala do processo
     socketio.emit("procurement.opened", {
@@ -389,6 +601,7 @@ def close_procurement(proc_id: int):
     proc.status = ProcurementStatus.ANALISE_TECNICA
     proc.updated_at = datetime.utcnow()
     db.session.commit()
+    data_versions.bump(proc.id)
     
     socketio.emit("procurement.closed", {
         "procurement_id": proc.id,
@@ -412,116 +625,207 @@ def get_proposals_comparison(proc_id: int):
     if user.role != Role.COMPRADOR:
         return {"error": "Apenas compradores podem ver análise comparativa"}, 403
     
-    proc = Procurement.query.get_or_404(proc_id)
-    
-    # Buscar apenas propostas aprovadas tecnicamente
-    proposals = Proposal.query.filter_by(
-        procurement_id=proc_id,
-        status=ProposalStatus.APROVADA_TECNICAMENTE
-    ).all()
+    Procurement.query.get_or_404(proc_id)
     
-    if not proposals:
+    # Resultado reaproveitado enquanto preços/quantidades/pareceres não mudarem
+    payload = cached_by_version("comparison", proc_id, lambda: _build_comparison(proc_id))
+    if payload is None:
         return {"error": "Nenhuma proposta aprovada tecnicamente"}, 404
     
-    comparison = []
-    for prop in proposals:
-        # Calcular total da proposta
-        total_price = 0
-        items_detail = []
-        
-        for service in prop.service_items:
-            price = ProposalPrice.query.filter_by(
-                proposal_id=prop.id,
-                service_item_id=service.service_item_id
-            ).first()
-            
-            if price:
-                item_total = float(service.qty) * float(price.unit_price)
-                total_price += item_total
-                
-                tr_item = TRServiceItem.query.get(service.service_item_id)
-                items_detail.append({
-                    "descricao": tr_item.descricao,
-                    "qty": float(service.qty),
-                    "unit_price": float(price.unit_price),
-                    "total": item_total
-                })
-        
-        comparison.append({
-            "proposal_id": prop.id,
-            "supplier": prop.supplier.full_name,
-            "organization": prop.supplier.organization.name if prop.supplier.organization else None,
-            "technical_score": prop.technical_score or 0,
-            "total_price": round(total_price, 2),
-            "delivery_time": prop.delivery_time,
-            "payment_conditions": prop.payment_conditions,
-            "warranty_terms": prop.warranty_terms,
-            "technical_review": prop.technical_review,
-            "items": items_detail,
-            "cost_benefit_score": (prop.technical_score or 0) / total_price if total_price > 0 else 0
-        })
-    
-    # Ordenar por melhor custo-benefício
-    comparison.sort(key=lambda x: x["cost_benefit_score"], reverse=True)
+    return payload
+
+
+def _build_comparison(proc_id: int):
+    # Apenas propostas aprovadas tecnicamente, com totais agregados no banco
+    comparison = load_comparison_rows(proc_id)
+    
+    if not comparison:
+        return None
+    
+    config = load_scoring_config(proc_id)
+    if config is None:
+        # Sem critério salvo: ordenar por custo-benefício (nota / preço)
+        comparison.sort(key=lambda x: x["cost_benefit_score"], reverse=True)
+    else:
+        # Critério do comprador: nota ponderada (empate: menor preço), cortadas por último
+        comparison.sort(key=lambda x: x["total_price"])
+        result = evaluate(
+            [p["technical_score"] for p in comparison],
+            [p["total_price"] for p in comparison],
+            [config_scenario(config)]
+        )
+        for prop, score, rank in zip(comparison, result["composite"][0].tolist(), result["ranks"][0].tolist()):
+            prop["weighted_score"] = round(score, 4) if rank else None
+            prop["rank"] = rank or None
+            prop["excluded"] = not rank
+        comparison.sort(key=lambda x: (x["excluded"], x["rank"] or 0))
     
     # Análise com IA (simulada)
-    best_price = min(comparison, key=lambda x: x["total_price"])
-    best_technical = max(comparison, key=lambda x: x["technical_score"])
-    best_overall = comparison[0] if comparison else None
-    
-    # Calcular médias
-    avg_price = sum(p["total_price"] for p in comparison) / len(comparison)
-    avg_score = sum(p["technical_score"] for p in comparison) / len(comparison)
-    
-    ai_analysis = {
-        "summary": {
-            "total_proposals": len(comparison),
-            "average_price": round(avg_price, 2),
-            "average_technical_score": round(avg_score, 1),
-            "price_range": {
-                "min": best_price["total_price"],
-                "max": max(comparison, key=lambda x: x["total_price"])["total_price"]
-            }
-        },
-        "best_options": {
-            "best_price": {
-                "supplier": best_price["supplier"],
-                "price": best_price["total_price"],
-                "savings": round(avg_price - best_price["total_price"], 2)
-            },
-            "best_technical": {
-                "supplier": best_technical["supplier"],
-                "score": best_technical["technical_score"],
-                "price": best_technical["total_price"]
-            },
-            "best_overall": {
-                "supplier": best_overall["supplier"],
-                "score": best_overall["technical_score"],
-                "price": best_overall["total_price"],
-                "reason": "Melhor equilíbrio entre qualidade técnica e preço"
-            } if best_overall else None
-        },
-        "recommendations": [
-            f"A proposta de {best_overall['supplier']} oferece o melhor custo-benefício" if best_overall else "",
-            f"Economia potencial de R$ {round(avg_price - best_price['total_price'], 2)} escolhendo o menor preço",
-            "Considere os prazos de entrega conforme urgência do projeto",
-            "Verifique as condições de pagamento e garantia antes da decisão final",
-            "Avalie se a diferença de qualidade técnica justifica diferenças de preço"
-        ],
-        "risk_analysis": {
-            "lowest_price_risk": "Baixo" if best_price["technical_score"] >= 70 else "Médio",
-            "delivery_risk": "Avaliar prazos individualmente",
-            "quality_risk": "Baixo" if avg_score >= 75 else "Médio"
-        }
-    }
+    ai_analysis = build_ai_analysis(comparison)
     
     return {
         "proposals": comparison,
         "ai_analysis": ai_analysis,
+        "scoring": config_scenario(config) if config else None,
         "generated_at": datetime.utcnow().isoformat()
     }
 
 
+@bp.get("/procurements/<int:proc_id>/scoring")
+@jwt_required()
+def get_scoring_config(proc_id: int):
+    """Critério de classificação do comparativo (padrão se não salvo) - apenas COMPRADOR"""
+    user = get_current_user()
+    
+    if user.role != Role.COMPRADOR:
+        return {"error": "Apenas compradores podem ver o critério de classificação"}, 403
+    
+    Procurement.query.get_or_404(proc_id)
+    config = load_scoring_config(proc_id)
+    return dict(config_scenario(config), saved=config is not None)
+
+
+@bp.put("/procurements/<int:proc_id>/scoring")
+@jwt_required()
+def save_scoring_config(proc_id: int):
+    """Salva pesos, normalização e cortes usados no comparativo - apenas COMPRADOR"""
+    user = get_current_user()
+    
+    if user.role != Role.COMPRADOR:
+        return {"error": "Apenas compradores podem definir o critério de classificação"}, 403
+    
+    Procurement.query.get_or_404(proc_id)
+    config = load_scoring_config(proc_id)
+    try:
+        scenario = parse_scenario(request.get_json() or {}, config_scenario(config))
+    except ValueError as exc:
+        return {"error": str(exc)}, 400
+    
+    if config is None:
+        config = ScoringConfig(procurement_id=proc_id)
+        db.session.add(config)
+    for field, value in scenario.items():
+        setattr(config, field, value)
+    config.updated_by = user.id
+    db.session.commit()
+    # Comparativo em cache foi calculado com o critério anterior
+    data_versions.bump(proc_id)
+    
+    return dict(scenario, saved=True)
+
+
+@bp.post("/procurements/<int:proc_id>/scoring/scenarios")
+@jwt_required()
+def evaluate_scoring_scenarios(proc_id: int):
+    """
+    Simula cenários de pesos (``scenarios`` e/ou ``sweep: {steps}``) sobre as
+    propostas aprovadas: top-k por cenário e estabilidade da classificação
+    em relação ao critério salvo - apenas COMPRADOR
+    """
+    user = get_current_user()
+    
+    if user.role != Role.COMPRADOR:
+        return {"error": "Apenas compradores podem simular cenários"}, 403
+    
+    Procurement.query.get_or_404(proc_id)
+    data = request.get_json() or {}
+    baseline = config_scenario(load_scoring_config(proc_id))
+    
+    try:
+        top_k = parse_top_k(data.get("top_k"))
+        scenarios = []
+        if "sweep" in data:
+            scenarios += sweep_scenarios(data["sweep"], baseline)
+        raw = data.get("scenarios") or []
+        if not isinstance(raw, list):
+            raise ValueError("scenarios deve ser uma lista")
+        scenarios += [parse_scenario(item, baseline) for item in raw]
+    except ValueError as exc:
+        return {"error": str(exc)}, 400
+    if not scenarios:
+        return {"error": "Informe scenarios ou sweep"}, 400
+    if len(scenarios) > MAX_SCENARIOS:
+        return {"error": f"No máximo {MAX_SCENARIOS} cenários"}, 400
+    
+    proposals = load_scoring_inputs(proc_id)
+    if not proposals:
+        return {"error": "Nenhuma proposta aprovada tecnicamente"}, 404
+    
+    scores = [p.technical_score or 0 for p in proposals]
+    totals = [p.total_value for p in proposals]
+    result = evaluate(scores, totals, scenarios)
+    stability = rank_stability(result, evaluate(scores, totals, [baseline]), top_k)
+    return build_scenarios_response(proposals, scenarios, result, stability, baseline, top_k)
+
+
+@bp.get("/procurements/<int:proc_id>/comparison/analytics")
+@jwt_required()
+def get_price_analytics(proc_id: int):
+    """
+    Estatísticas por item das propostas aprovadas (mínimo, mediana, máximo,
+    dispersão, preços atípicos) e o total da melhor divisão por item -
+    apenas COMPRADOR
+    """
+    user = get_current_user()
+    
+    if user.role != Role.COMPRADOR:
+        return {"error": "Apenas compradores podem ver análise comparativa"}, 403
+    
+    Procurement.query.get_or_404(proc_id)
+    
+    payload = cached_by_version("comparison-analytics", proc_id, lambda: _build_price_analytics(proc_id))
+    if payload is None:
+        return {"error": "Nenhuma proposta aprovada tecnicamente"}, 404
+    
+    return payload
+
+
+def _build_price_analytics(proc_id: int):
+    proposals = load_export_proposals(proc_id, Proposal.status == ProposalStatus.APROVADA_TECNICAMENTE)
+    if not proposals:
+        return None
+    
+    items, unit, line, priced = load_price_matrix(proc_id, [p.id for p in proposals])
+    payload = build_price_analytics(items, proposals, price_statistics(unit, line, priced))
+    payload["generated_at"] = datetime.utcnow().isoformat()
+    return payload
+
+
+@bp.get("/procurements/<int:proc_id>/comparison/export")
+@jwt_required()
+def export_proposals_comparison(proc_id: int):
+    """Matriz comparativa em CSV/XLSX (format=csv|xlsx) - apenas COMPRADOR"""
+    user = get_current_user()
+    
+    # Verificar se é comprador
+    if user.role != Role.COMPRADOR:
+        return {"error": "Apenas compradores podem ver análise comparativa"}, 403
+    
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return {"error": "Formato inválido (use csv ou xlsx)"}, 400
+    
+    Procurement.query.get_or_404(proc_id)
+    
+    # Mesmas propostas do comparativo: aprovadas tecnicamente
+    proposals = load_export_proposals(
+        proc_id, Proposal.status == ProposalStatus.APROVADA_TECNICAMENTE
+    )
+    if not proposals:
+        return {"error": "Nenhuma proposta aprovada tecnicamente"}, 404
+    
+    header = ITEM_HEADER + [supplier_label(p) for p in proposals]
+    rows = iter_item_matrix(
+        proc_id, [p.id for p in proposals],
+        lambda qty, unit_price: [line_total(qty, unit_price)]
+    )
+    totals = [None, None, "TOTAL", None, None] + [cents(p.total_value) for p in proposals]
+    
+    return export_response(
+        fmt, f"comparativo-{proc_id}", header, chain(rows, [totals]), "Comparativo"
+    )
+
+
 @bp.get("/procurements/<int:proc_id>/proposals")
 @jwt_required()
 def list_procurement_proposals(proc_id: int):
@@ -532,7 +836,9 @@ def list_procurement_proposals(proc_id: int):
     if user.role not in [Role.COMPRADOR, Role.REQUISITANTE]:
         return {"error": "Não autorizado"}, 403
     
-    proposals = Proposal.query.filter_by(procurement_id=proc_id).all()
+    proposals = Proposal.query.options(
+        joinedload(Proposal.supplier).joinedload(User.organization)
+    ).filter_by(procurement_id=proc_id).all()
     
     result = []
     for prop in proposals:
@@ -552,17 +858,9 @@ def list_procurement_proposals(proc_id: int):
         }
         
         if include_prices:
-            # Calcular total
-            total = 0
-            for service in prop.service_items:
-                price = ProposalPrice.query.filter_by(
-                    proposal_id=prop.id,
-                    service_item_id=service.service_item_id
-                ).first()
-                if price:
-                    total += float(service.qty) * float(price.unit_price)
-            
-            prop_data["total_value"] = round(total, 2)
+            # Total materializado na própria proposta
+            prop_data["total_value"] = money(prop.total_value)
+            prop_data["item_count"] = prop.item_count
             prop_data["payment_conditions"] = prop.payment_conditions
             prop_data["delivery_time"] = prop.delivery_time
         
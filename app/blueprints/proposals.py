@@ -2,12 +2,23 @@
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from itertools import chain
 from .. import db, socketio
 from ..models import (
     Proposal, ProposalService, ProposalPrice, TRServiceItem, 
     ProposalStatus, Procurement, ProcurementStatus, User, Role
 )
 from ..utils.auth import get_current_user
+from ..utils.autosave import autosave_buffer, parse_changes
+from ..utils.cache import data_versions, cached_by_version
+from ..utils.deadlines import deadline_scheduler
+from ..utils.http import conditional_json
+from ..utils.loaders import load_procurement_or_404
+from ..utils.proposal_items import collect_lines, get_or_create_draft, save_proposal_lines, tr_item_ids
+from ..utils.export import (
+    EXPORT_FORMATS, ITEM_HEADER, cents, export_response, iter_item_matrix,
+    line_total, load_export_proposals, supplier_label
+)
 bp = Blueprint("proposals", __name__)
 
 
@@ -22,26 +33,29 @@ def create_or_update_proposal(proc_id: int):
     if user.role != Role.FORNECEDOR:
         return {"error": "Apenas fornecedores podem criar propostas"}, 403
     
-    proc = Procurement.query.get_or_404(proc_id)
+    # Prazo vencido: recusa sem consultar o banco
+    if deadline_scheduler.is_past_deadline(proc_id):
+        return {"error": "Prazo para propostas encerrado"}, 400
+    
+    detail = load_procurement_or_404(proc_id)
     
     # Verificar se processo está aberto
-    if proc.status != ProcurementStatus.ABERTO:
+    if detail.procurement.status != ProcurementStatus.ABERTO:
         return {"error": "Processo não está aberto para propostas"}, 400
-    
-    # Criar ou obter proposta existente
-    proposal = Proposal.query.filter_by(
-        procurement_id=proc_id,
-        supplier_user_id=user.id
-    ).first()
-    
-    if not proposal:
-        proposal = Proposal(
-            procurement_id=proc_id,
-            supplier_user_id=user.id,
-            status=ProposalStatus.RASCUNHO
+    if not detail.tr_id:
+        return {"error": "Processo sem TR"}, 400
+    
+    # Itens fora do TR são ignorados; ids validados com uma consulta
+    valid_ids = tr_item_ids(db.session, detail.tr_id)
+    try:
+        services, _ = collect_lines(
+            data.get("service_items") or [], valid_ids, "qty", default=0, notes=True
         )
-        db.session.add(proposal)
-        db.session.flush()
+        prices, _ = collect_lines(data.get("prices") or [], valid_ids, "unit_price", default=0)
+    except ValueError as exc:
+        return {"error": str(exc)}, 400
+
+    proposal = get_or_create_draft(db.session, proc_id, user.id)
     
     # Atualizar dados técnicos
     if "technical_description" in data:
@@ -55,72 +69,11 @@ def create_or_update_proposal(proc_id: int):
     if "warranty_terms" in data:
         proposal.warranty_terms = data["warranty_terms"]
     
-    # Atualizar itens de serviço (quantidades e observações técnicas)
-    if "service_items" in data:
-        for item_data in data["service_items"]:
-            service_item_id = item_data.get("service_item_id")
-            qty = item_data.get("qty", 0)
-            technical_notes = item_data.get("technical_notes", "")
-            
-            # Verificar se item pertence ao TR
-            item = TRServiceItem.query.filter_by(
-                id=service_item_id,
-                tr_id=proc.tr.id
-            ).first()
-            
-            if not item:
-                continue
-            
-            # Criar ou atualizar ProposalService
-            prop_service = ProposalService.query.filter_by(
-                proposal_id=proposal.id,
-                service_item_id=service_item_id
-            ).first()
-            
-            if not prop_service:
-                prop_service = ProposalService(
-                    proposal_id=proposal.id,
-                    service_item_id=service_item_id,
-                    qty=qty,
-                    technical_notes=technical_notes
-                )
-                db.session.add(prop_service)
-            else:
-                prop_service.qty = qty
-                prop_service.technical_notes = technical_notes
-    
-    # Atualizar preços
-    if "prices" in data:
-        for price_data in data["prices"]:
-            service_item_id = price_data.get("service_item_id")
-            unit_price = price_data.get("unit_price", 0)
-            
-            # Verificar se item pertence ao TR
-            item = TRServiceItem.query.filter_by(
-                id=service_item_id,
-                tr_id=proc.tr.id
-            ).first()
-            
-            if not item:
-                continue
-            
-            # Criar ou atualizar ProposalPrice
-            prop_price = ProposalPrice.query.filter_by(
-                proposal_id=proposal.id,
-                service_item_id=service_item_id
-            ).first()
-            
-            if not prop_price:
-                prop_price = ProposalPrice(
-                    proposal_id=proposal.id,
-                    service_item_id=service_item_id,
-                    unit_price=unit_price
-                )
-                db.session.add(prop_price)
-            else:
-                prop_price.unit_price = unit_price
+    # Quantidades/observações e preços: upsert em lote
+    save_proposal_lines(db.session, proposal, services=services, prices=prices)
     
     db.session.commit()
+    data_versions.bump(proc_id)
     
     # Notificar compradores
     socketio.emit("proposal.updated", {
@@ -153,21 +106,33 @@ def submit_proposal(proposal_id: int):
     if proposal.supplier_user_id != user.id:
         return {"error": "Não autorizado"}, 403
     
-    # Validar proposta
-    if not proposal.technical_description:
-        return {"error": "Descrição técnica é obrigatória"}, 400
-    
-    if not proposal.service_items:
-        return {"error": "Proposta deve incluir itens de serviço"}, 400
-    
-    if not proposal.prices:
-        return {"error": "Proposta deve incluir preços"}, 400
-    
-    proposal.status = ProposalStatus.ENVIADA
-    proposal.technical_submitted_at = datetime.utcnow()
-    proposal.commercial_submitted_at = datetime.utcnow()
+    if deadline_scheduler.is_past_deadline(proposal.procurement_id):
+        return {"error": "Prazo para propostas encerrado"}, 400
+    if load_procurement_or_404(proposal.procurement_id).procurement.status != ProcurementStatus.ABERTO:
+        return {"error": "Processo não está aberto para propostas"}, 400
     
-    db.session.commit()
+    # Edições aceitas pelo autosave e ainda no buffer entram antes da
+    # validação; o que chegar depois do envio é descartado pelo buffer
+    with autosave_buffer.exclusive(proposal.id) as saved:
+        if not saved:
+            return {"error": "Não foi possível gravar as últimas alterações; tente novamente"}, 503
+        
+        # Validar proposta
+        if not proposal.technical_description:
+            return {"error": "Descrição técnica é obrigatória"}, 400
+        
+        if not proposal.service_items:
+            return {"error": "Proposta deve incluir itens de serviço"}, 400
+        
+        if not proposal.prices:
+            return {"error": "Proposta deve incluir preços"}, 400
+        
+        proposal.status = ProposalStatus.ENVIADA
+        proposal.technical_submitted_at = datetime.utcnow()
+        proposal.commercial_submitted_at = datetime.utcnow()
+        
+        db.session.commit()
+    data_versions.bump(proposal.procurement_id)
     
     # Notificar comprador e requisitante
     socketio.emit("proposal.submitted", {
@@ -196,27 +161,49 @@ def get_proposal_details(proposal_id: int):
     if user.role == Role.FORNECEDOR and proposal.supplier_user_id != user.id:
         return {"error": "Não autorizado"}, 403
     
+    etag_parts = (
+        proposal.id, proposal.updated_at,
+        data_versions.get(proposal.procurement_id), user.role.value
+    )
+    return conditional_json(etag_parts, lambda: _proposal_detail(proposal))
+
+
+def _proposal_detail(proposal) -> dict:
     # Montar resposta com todos os detalhes
+    # Itens, preços e baseline do TR em uma única consulta
+    rows = db.session.query(
+        ProposalService.service_item_id,
+        ProposalService.qty,
+        ProposalService.technical_notes,
+        ProposalPrice.unit_price,
+        TRServiceItem.item_ordem,
+        TRServiceItem.codigo,
+        TRServiceItem.descricao,
+        TRServiceItem.unid,
+        TRServiceItem.qtde,
+    ).join(
+        TRServiceItem, TRServiceItem.id == ProposalService.service_item_id
+    ).outerjoin(
+        ProposalPrice,
+        (ProposalPrice.proposal_id == ProposalService.proposal_id) &
+        (ProposalPrice.service_item_id == ProposalService.service_item_id)
+    ).filter(
+        ProposalService.proposal_id == proposal.id
+    ).order_by(TRServiceItem.item_ordem).all()
+    
     items = []
-    for service in proposal.service_items:
-        price = ProposalPrice.query.filter_by(
-            proposal_id=proposal.id,
-            service_item_id=service.service_item_id
-        ).first()
-        
-        tr_item = TRServiceItem.query.get(service.service_item_id)
-        
+    for row in rows:
         items.append({
-            "service_item_id": service.service_item_id,
-            "item_ordem": tr_item.item_ordem,
-            "codigo": tr_item.codigo,
-            "descricao": tr_item.descricao,
-            "unid": tr_item.unid,
-            "qty_proposed": float(service.qty),
-            "qty_baseline": float(tr_item.qtde),
-            "unit_price": float(price.unit_price) if price else 0,
-            "total": float(service.qty * price.unit_price) if price else 0,
-            "technical_notes": service.technical_notes
+            "service_item_id": row.service_item_id,
+            "item_ordem": row.item_ordem,
+            "codigo": row.codigo,
+            "descricao": row.descricao,
+            "unid": row.unid,
+            "qty_proposed": float(row.qty),
+            "qty_baseline": float(row.qtde),
+            "unit_price": float(row.unit_price) if row.unit_price is not None else 0,
+            "total": float(row.qty * row.unit_price) if row.unit_price is not None else 0,
+            "technical_notes": row.technical_notes
         })
     
     return {
@@ -235,7 +222,8 @@ def get_proposal_details(proposal_id: int):
         "delivery_time": proposal.delivery_time,
         "warranty_terms": proposal.warranty_terms,
         "items": items,
-        "total_value": sum(item["total"] for item in items),
+        "total_value": float(proposal.total_value),
+        "item_count": proposal.item_count,
         "submitted_at": proposal.technical_submitted_at.isoformat() if proposal.technical_submitted_at else None
     }
 
@@ -250,52 +238,33 @@ def upsert_quantities(proc_id: int):
     if user.role != Role.FORNECEDOR:
         return {"error": "Apenas fornecedores podem atualizar quantidades"}, 403
     
-    # Criar ou obter proposta
-    proposal = Proposal.query.filter_by(
-        procurement_id=proc_id,
-        supplier_user_id=user.id
-    ).first()
-    
-    if not proposal:
-        proposal = Proposal(
-            procurement_id=proc_id,
-            supplier_user_id=user.id,
-            status=ProposalStatus.RASCUNHO
-        )
-        db.session.add(proposal)
-        db.session.commit()
+    if deadline_scheduler.is_past_deadline(proc_id):
+        return {"error": "Prazo para propostas encerrado"}, 400
     
     payload = request.get_json() or []
     if not isinstance(payload, list):
         return {"error": "payload deve ser lista de itens"}, 400
     
-    # Verificar se service_item pertence ao TR do processo
-    proc = Procurement.query.get_or_404(proc_id)
-    valid_item_ids = {r.id for r in TRServiceItem.query.filter_by(tr_id=proc.tr.id).all()}
+    # O mapa de prazos só conhece os processos ABERTO desde a subida: o status
+    # no banco é o que vale para processos já encerrados
+    detail = load_procurement_or_404(proc_id)
+    if detail.procurement.status != ProcurementStatus.ABERTO:
+        return {"error": "Processo não está aberto para propostas"}, 400
     
-    for row in payload:
-        sid = row.get("service_item_id")
-        qty = row.get("qty")
-        
-        if sid not in valid_item_ids:
-            return {"error": f"service_item_id {sid} inválido para este processo"}, 400
-        
-        ps = ProposalService.query.filter_by(
-            proposal_id=proposal.id,
-            service_item_id=sid
-        ).first()
-        
-        if not ps:
-            ps = ProposalService(
-                proposal_id=proposal.id,
-                service_item_id=sid,
-                qty=qty
-            )
-            db.session.add(ps)
-        else:
-            ps.qty = qty
+    # Verificar se os service_items pertencem ao TR do processo (uma consulta)
+    try:
+        lines, invalid = collect_lines(payload, tr_item_ids(db.session, detail.tr_id), "qty")
+    except ValueError as exc:
+        return {"error": str(exc)}, 400
+    if invalid:
+        return {"error": f"service_item_id {invalid[0]} inválido para este processo"}, 400
+    
+    # Rascunho criado na mesma transação das linhas
+    proposal = get_or_create_draft(db.session, proc_id, user.id)
+    save_proposal_lines(db.session, proposal, services=lines)
     
     db.session.commit()
+    data_versions.bump(proc_id)
     
     socketio.emit("proposal.tech.received", {
         "procurement_id": proc_id,
@@ -315,52 +284,33 @@ def upsert_prices(proc_id: int):
     if user.role != Role.FORNECEDOR:
         return {"error": "Apenas fornecedores podem atualizar preços"}, 403
     
-    # Criar ou obter proposta
-    proposal = Proposal.query.filter_by(
-        procurement_id=proc_id,
-        supplier_user_id=user.id
-    ).first()
-    
-    if not proposal:
-        proposal = Proposal(
-            procurement_id=proc_id,
-            supplier_user_id=user.id,
-            status=ProposalStatus.RASCUNHO
-        )
-        db.session.add(proposal)
-        db.session.commit()
+    if deadline_scheduler.is_past_deadline(proc_id):
+        return {"error": "Prazo para propostas encerrado"}, 400
     
     payload = request.get_json() or []
     if not isinstance(payload, list):
         return {"error": "payload deve ser lista de itens"}, 400
     
-    # Verificar se service_item pertence ao TR do processo
-    proc = Procurement.query.get_or_404(proc_id)
-    valid_item_ids = {r.id for r in TRServiceItem.query.filter_by(tr_id=proc.tr.id).all()}
+    # O mapa de prazos só conhece os processos ABERTO desde a subida: o status
+    # no banco é o que vale para processos já encerrados
+    detail = load_procurement_or_404(proc_id)
+    if detail.procurement.status != ProcurementStatus.ABERTO:
+        return {"error": "Processo não está aberto para propostas"}, 400
     
-    for row in payload:
-        sid = row.get("service_item_id")
-        price = row.get("unit_price")
-        
-        if sid not in valid_item_ids:
-            return {"error": f"service_item_id {sid} inválido para este processo"}, 400
-        
-        pp = ProposalPrice.query.filter_by(
-            proposal_id=proposal.id,
-            service_item_id=sid
-        ).first()
-        
-        if not pp:
-            pp = ProposalPrice(
-                proposal_id=proposal.id,
-                service_item_id=sid,
-                unit_price=price
-            )
-            db.session.add(pp)
-        else:
-            pp.unit_price = price
+    # Verificar se os service_items pertencem ao TR do processo (uma consulta)
+    try:
+        lines, invalid = collect_lines(payload, tr_item_ids(db.session, detail.tr_id), "unit_price")
+    except ValueError as exc:
+        return {"error": str(exc)}, 400
+    if invalid:
+        return {"error": f"service_item_id {invalid[0]} inválido para este processo"}, 400
+    
+    # Rascunho criado na mesma transação das linhas
+    proposal = get_or_create_draft(db.session, proc_id, user.id)
+    save_proposal_lines(db.session, proposal, prices=lines)
     
     db.session.commit()
+    data_versions.bump(proc_id)
     
     socketio.emit("proposal.comm.received", {
         "procurement_id": proc_id,
@@ -370,61 +320,178 @@ def upsert_prices(proc_id: int):
     return {"proposal_id": proposal.id, "items": len(payload)}
 
 
+@bp.patch("/proposals/<int:proc_id>/autosave")
+@jwt_required()
+def autosave_proposal(proc_id: int):
+    """
+    Autosave por células - apenas FORNECEDOR.  Corpo: ``{"seq": n, "changes":
+    [{"service_item_id", "field": qty|unit_price|technical_notes, "value"}]}``.
+    ``seq`` cresce a cada envio; a gravação é adiada e agrupada, e
+    ``committed_seq`` (aqui e em ``proposal.autosaved``) indica até onde já
+    está no banco.  Reenvio de um ``seq`` já aceito só é confirmado de novo.
+    """
+    user = get_current_user()
+
+    if user.role != Role.FORNECEDOR:
+        return {"error": "Apenas fornecedores podem editar propostas"}, 403
+
+    if deadline_scheduler.is_past_deadline(proc_id):
+        return {"error": "Prazo para propostas encerrado"}, 400
+
+    data = request.get_json() or {}
+    seq = data.get("seq")
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 1:
+        return {"error": "seq deve ser um inteiro positivo"}, 400
+
+    detail = load_procurement_or_404(proc_id)
+    if detail.procurement.status != ProcurementStatus.ABERTO:
+        return {"error": "Processo não está aberto para propostas"}, 400
+    if not detail.tr_id:
+        return {"error": "Processo sem TR"}, 400
+
+    try:
+        changes = parse_changes(data.get("changes"), detail.tr_id)
+    except ValueError as exc:
+        return {"error": str(exc)}, 400
+
+    # O rascunho precisa existir no banco antes da gravação adiada
+    proposal = get_or_create_draft(db.session, proc_id, user.id)
+    if proposal.status != ProposalStatus.RASCUNHO:
+        return {"error": "Proposta já enviada; o autosave só vale para rascunhos"}, 409
+    proposal_id = proposal.id
+    db.session.commit()
+
+    accepted = autosave_buffer.accept(proposal_id, proc_id, user.id, seq, changes)
+    return {
+        "proposal_id": proposal_id,
+        "ack": seq,
+        "duplicate": not accepted,
+        "committed_seq": autosave_buffer.committed_seq(proposal_id)
+    }, 202
+
+
+@bp.get("/proposals/<int:proc_id>/autosave")
+@jwt_required()
+def autosave_status(proc_id: int):
+    """Última sequência aceita/gravada do autosave (retomada do cliente)"""
+    user = get_current_user()
+
+    if user.role != Role.FORNECEDOR:
+        return {"error": "Apenas fornecedores podem editar propostas"}, 403
+
+    proposal = Proposal.query.filter_by(procurement_id=proc_id, supplier_user_id=user.id).first()
+    if not proposal:
+        return {"proposal_id": None, "accepted_seq": 0, "committed_seq": 0}
+    return {
+        "proposal_id": proposal.id,
+        "accepted_seq": autosave_buffer.accepted_seq(proposal.id),
+        "committed_seq": autosave_buffer.committed_seq(proposal.id)
+    }
+
+
 @bp.get("/proposals/<int:proc_id>/commercial-items")
 @jwt_required()
 def list_commercial_items(proc_id: int):
-    """Consolidado por item (JOIN TR baseline + quantidade + preço unitário + total)."""
+    """
+    Consolidado por item: baseline do TR uma vez (``items``) e, por proposta,
+    quantidade/preço unitário/total em listas na ordem de ``items``.
+    """
     user = get_current_user()
     
-    props = Proposal.query.filter_by(procurement_id=proc_id).all()
+    # Preços só para o comprador e para o fornecedor (a própria proposta)
+    if user.role not in (Role.COMPRADOR, Role.FORNECEDOR):
+        return {"error": "Apenas compradores e fornecedores podem ver itens comerciais"}, 403
     
-    out = []
-    for p in props:
-        # Se fornecedor, só enxerga sua própria proposta
-        if user.role == Role.FORNECEDOR and p.supplier_user_id != user.id:
-            continue
-        
-        items = db.session.query(
-            TRServiceItem.item_ordem,
-            TRServiceItem.codigo,
-            TRServiceItem.descricao,
-            TRServiceItem.unid,
-            ProposalService.qty,
-            ProposalPrice.unit_price,
-        ).outerjoin(
-            ProposalService, 
-            (ProposalService.service_item_id == TRServiceItem.id) & 
-            (ProposalService.proposal_id == p.id)
-        ).outerjoin(
-            ProposalPrice, 
-            (ProposalPrice.service_item_id == TRServiceItem.id) & 
-            (ProposalPrice.proposal_id == p.id)
-        ).filter(
-            TRServiceItem.tr.has(procurement_id=proc_id)
-        ).order_by(TRServiceItem.item_ordem).all()
-        
-        items_out = []
-        total_geral = 0.0
-        for item in items:
-            qty = float(item.qty or 0)
-            unit_price = float(item.unit_price or 0)
-            total = qty * unit_price
-            total_geral += total
-            items_out.append({
-                "item_ordem": item.item_ordem,
-                "codigo": item.codigo,
-                "descricao": item.descricao,
-                "unid": item.unid,
-                "qty": qty,
-                "unit_price": unit_price,
-                "total_item": total,
-            })
-        
-        out.append({
+    # Fornecedor tem uma visão própria (só a sua proposta)
+    scope = user.id if user.role == Role.FORNECEDOR else None
+    return cached_by_version(
+        "commercial-items", proc_id, lambda: _build_commercial_items(proc_id, user), scope=scope
+    )
+
+
+def _build_commercial_items(proc_id: int, user):
+    """
+    Matriz item × proposta em uma consulta (iter_item_matrix).  As colunas do
+    TR vão uma vez em ``items``; cada proposta traz listas alinhadas a elas.
+    """
+    criteria = []
+    # Fornecedor só enxerga a própria proposta (filtro no SQL)
+    if user.role == Role.FORNECEDOR:
+        criteria.append(Proposal.supplier_user_id == user.id)
+    proposals = db.session.query(
+        Proposal.id, Proposal.supplier_user_id, Proposal.total_value
+    ).filter(
+        Proposal.procurement_id == proc_id, *criteria
+    ).order_by(Proposal.id).all()
+    
+    items = []
+    columns = [{"qty": [], "unit_price": [], "total_item": []} for _ in proposals]
+    rows = iter_item_matrix(
+        proc_id, [p.id for p in proposals],
+        lambda qty, unit_price: [qty or 0, unit_price or 0]
+    )
+    width = len(ITEM_HEADER)
+    for row in rows:
+        item_ordem, codigo, descricao, unid, qtde = row[:width]
+        items.append({
+            "item_ordem": item_ordem,
+            "codigo": codigo,
+            "descricao": descricao,
+            "unid": unid,
+            "qtde": float(qtde),
+        })
+        for index, column in enumerate(columns):
+            qty, unit_price = row[width + 2 * index:width + 2 * index + 2]
+            column["qty"].append(float(qty))
+            column["unit_price"].append(float(unit_price))
+            column["total_item"].append(float(qty * unit_price))
+    
+    return {
+        "items": items,
+        "proposals": [{
             "proposal_id": p.id,
             "supplier_user_id": p.supplier_user_id,
-            "total_geral": round(total_geral, 2),
-            "itens": items_out,
-        })
+            "total_geral": round(float(p.total_value), 2),
+            **column,
+        } for p, column in zip(proposals, columns)]
+    }
+
+
+@bp.get("/proposals/<int:proc_id>/commercial-items/export")
+@jwt_required()
+def export_commercial_items(proc_id: int):
+    """Itens comerciais em CSV/XLSX (format=csv|xlsx): um item por linha, colunas por fornecedor"""
+    user = get_current_user()
     
-    return {"proposals": out}
+    # Preços só para o comprador e para o fornecedor (a própria proposta)
+    if user.role not in (Role.COMPRADOR, Role.FORNECEDOR):
+        return {"error": "Apenas compradores e fornecedores podem exportar itens comerciais"}, 403
+    
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return {"error": "Formato inválido (use csv ou xlsx)"}, 400
+    
+    load_procurement_or_404(proc_id)
+    
+    # Fornecedor só exporta a própria proposta
+    criteria = []
+    if user.role == Role.FORNECEDOR:
+        criteria.append(Proposal.supplier_user_id == user.id)
+    proposals = load_export_proposals(proc_id, *criteria)
+    
+    header = list(ITEM_HEADER)
+    for p in proposals:
+        label = supplier_label(p)
+        header += [f"{label} - Qtde.", f"{label} - Preço unit.", f"{label} - Total"]
+    
+    rows = iter_item_matrix(
+        proc_id, [p.id for p in proposals],
+        lambda qty, unit_price: [qty, unit_price, line_total(qty, unit_price)]
+    )
+    totals = [None, None, "TOTAL", None, None]
+    for p in proposals:
+        totals += [None, None, cents(p.total_value)]
+    
+    return export_response(
+        fmt, f"itens-comerciais-{proc_id}", header, chain(rows, [totals]), "Itens comerciais"
+    )
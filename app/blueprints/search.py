@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from .. import db
+from ..models import Procurement, TR, TRStatus, Role
+from ..utils.auth import get_current_user
+from ..utils.pagination import parse_limit
+from ..utils.search import search_procurements
+from ..utils.suppliers import supplier_visibility_filter
+
+bp = Blueprint("search", __name__)
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+@bp.get("/search")
+@jwt_required()
+def search():
+    """
+    Busca textual em processos e TRs (q, limit), ranqueada por relevância e
+    restrita ao que o papel do usuário pode ver
+    """
+    user = get_current_user()
+
+    if not user:
+        return {"error": "Usuario nao encontrado"}, 404
+
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return {"error": "Parâmetro q é obrigatório"}, 400
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=SEARCH_DEFAULT_LIMIT, maximum=SEARCH_MAX_LIMIT)
+    except ValueError:
+        return {"error": "limit inválido"}, 400
+
+    query = db.session.query(
+        Procurement.id,
+        Procurement.title,
+        Procurement.status,
+        Procurement.created_at,
+        Procurement.deadline_proposals,
+        TR.id.label("tr_id"),
+        TR.status.label("tr_status"),
+    ).outerjoin(TR, TR.procurement_id == Procurement.id)
+
+    if user.role == Role.REQUISITANTE:
+        query = query.filter(Procurement.requisitante_id == user.id)
+    elif user.role == Role.FORNECEDOR:
+        # Fornecedor só pesquisa processos visíveis e com TR já aprovado
+        # (o índice inclui o texto do TR)
+        query = query.filter(supplier_visibility_filter(user), TR.status == TRStatus.APROVADO)
+
+    result = []
+    for row, rank in search_procurements(q, query, limit):
+        result.append({
+            "id": row.id,
+            "title": row.title,
+            "status": row.status.value if row.status else "TR_PENDENTE",
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "deadline": row.deadline_proposals.isoformat() if row.deadline_proposals else None,
+            "has_tr": row.tr_id is not None,
+            "tr_status": row.tr_status.value if row.tr_status else None,
+            "rank": round(rank, 6)
+        })
+
+    return jsonify(result)
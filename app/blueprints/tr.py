@@ -1,14 +1,30 @@
 # -*- coding: utf-8 -*-
-from flask import Blueprint, request, jsonify
+import codecs
+import os
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, selectinload
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
 from .. import db, socketio
-from ..models import TR, TRServiceItem, Procurement, TRStatus, ProcurementStatus, Proposal, ProposalStatus, User, Role
+from ..models import TR, Procurement, TRStatus, ProcurementStatus, Proposal, ProposalStatus, User, Role
 from ..utils.auth import get_current_user
+from ..utils.cache import data_versions
+from ..utils.http import conditional_json
+from ..utils.loaders import load_procurement, load_procurement_or_404
+from ..utils.spreadsheet import IMPORT_FORMATS, SpreadsheetError, iter_csv_rows, iter_xlsx_rows
+from ..utils.tr_items import ItemsLockedError, import_service_items, sync_service_items
 
 bp = Blueprint("tr", __name__)
 
 
+@bp.errorhandler(RequestEntityTooLarge)
+def upload_too_large(_exc):
+    # Corpo acima de MAX_CONTENT_LENGTH, com ou sem Content-Length
+    return {"error": "Arquivo muito grande"}, 413
+
+
 @bp.post("/procurements/<int:proc_id>/tr")
 @jwt_required()
 def create_or_update_tr(proc_id: int):
@@ -20,13 +36,13 @@ def create_or_update_tr(proc_id: int):
     if user.role != Role.REQUISITANTE:
         return {"error": "Apenas requisitantes podem criar/editar TR"}, 403
     
-    proc = Procurement.query.get_or_404(proc_id)
+    detail = load_procurement_or_404(proc_id)
     
     # Verificar se é o requisitante atribuído
-    if proc.requisitante_id != user.id:
+    if detail.procurement.requisitante_id != user.id:
         return {"error": "Você não é o requisitante deste processo"}, 403
     
-    tr = TR.query.filter_by(procurement_id=proc_id).first()
+    tr = db.session.get(TR, detail.tr_id) if detail.tr_id else None
     if not tr:
         tr = TR(procurement_id=proc_id, created_by=user.id)
         db.session.add(tr)
@@ -53,24 +69,21 @@ def create_or_update_tr(proc_id: int):
         if field in data:
             setattr(tr, field, data[field])
     
-    # Atualizar planilha de serviços se fornecida
+    # Atualizar planilha de serviços se fornecida (diff: só grava o que mudou)
+    item_counts = None
     if "planilha_servico" in data and isinstance(data["planilha_servico"], list):
-        # Remove itens antigos
-        TRServiceItem.query.filter_by(tr_id=tr.id).delete()
-        
-        # Adiciona novos itens
-        for idx, item in enumerate(data["planilha_servico"], start=1):
-            service_item = TRServiceItem(
-                tr_id=tr.id,
-                item_ordem=item.get("item_ordem", idx),
-                codigo=item.get("codigo", ""),
-                descricao=item.get("descricao", ""),
-                unid=item.get("unid", "UN"),
-                qtde=item.get("qtde", 1)
-            )
-            db.session.add(service_item)
+        db.session.flush()
+        try:
+            item_counts = sync_service_items(db.session, tr, data["planilha_servico"])
+        except ValueError as exc:
+            db.session.rollback()
+            return {"error": f"Planilha inválida: {exc}"}, 400
+        except ItemsLockedError as exc:
+            db.session.rollback()
+            return {"error": f"Planilha não gravada: {exc}"}, 409
     
     db.session.commit()
+    data_versions.bump(proc_id)
     
     # Emitir evento real-time
     socketio.emit("tr.saved", {
@@ -80,11 +93,14 @@ def create_or_update_tr(proc_id: int):
         "updated_by": user.id
     }, to=f"proc:{proc_id}")
     
-    return {
+    response = {
         "tr_id": tr.id,
         "status": tr.status.value,
         "message": "TR salvo com sucesso"
     }
+    if item_counts is not None:
+        response["items"] = item_counts
+    return response
 
 
 @bp.post("/tr/<int:tr_id>/submit")
@@ -121,6 +137,7 @@ def submit_tr_for_approval(tr_id: int):
     proc.status = ProcurementStatus.TR_SUBMETIDO
     
     db.session.commit()
+    data_versions.bump(proc.id)
     
     # Notificar compradores em real-time
     socketio.emit("tr.submitted", {
@@ -140,66 +157,94 @@ def submit_tr_for_approval(tr_id: int):
 @bp.get("/tr/<int:proc_id>")
 @jwt_required()
 def get_tr_details(proc_id: int):
-    """Obtém detalhes completos do TR baseado no procurement_id"""
+    """Obtém detalhes do TR baseado no procurement_id (``fields=`` limita os campos)"""
     user = get_current_user()
     
-    # Busca TR pelo procurement_id (não pelo tr.id)
-    tr = TR.query.filter_by(procurement_id=proc_id).first()
+    # Busca TR pelo procurement_id (não pelo tr.id), junto com o processo
+    detail = load_procurement(proc_id)
     
-    if not tr:
+    if not detail or not detail.tr_id:
         return {"error": "TR não encontrado para este processo"}, 404
     
     # Fornecedores só podem ver TR aprovados
-    if user.role == Role.FORNECEDOR and tr.status != TRStatus.APROVADO:
+    if user.role == Role.FORNECEDOR and detail.tr_status != TRStatus.APROVADO:
         return {"error": "TR não disponível"}, 403
     
     # Requisitante só pode ver TRs dos seus processos
     if user.role == Role.REQUISITANTE:
-        proc = Procurement.query.get(proc_id)
-        if proc.requisitante_id != user.id:
+        if detail.procurement.requisitante_id != user.id:
             return {"error": "Não autorizado"}, 403
     
-    items = [{
-        "id": item.id,
-        "item_ordem": item.item_ordem,
-        "codigo": item.codigo,
-        "descricao": item.descricao,
-        "unid": item.unid,
-        "qtde": float(item.qtde)
-    } for item in tr.service_items]
-    
-    tr_data = {
-        "id": tr.id,
-        "tr_id": tr.id,  # Adicionar para compatibilidade com frontend
-        "procurement_id": tr.procurement_id,
-        "status": tr.status.value,
-        "objetivo": tr.objetivo,
-        "situacao_atual": tr.situacao_atual,
-        "descricao_servicos": tr.descricao_servicos,
-        "local_horario_trabalhos": tr.local_horario_trabalhos,
-        "prazo_execucao": tr.prazo_execucao,
-        "local_canteiro": tr.local_canteiro,
-        "atividades_preliminares": tr.atividades_preliminares,
-        "garantia": tr.garantia,
-        "matriz_responsabilidades": tr.matriz_responsabilidades,
-        "descricoes_gerais": tr.descricoes_gerais,
-        "normas_observar": tr.normas_observar,
-        "regras_responsabilidades": tr.regras_responsabilidades,
-        "relacoes_contratada_fiscalizacao": tr.relacoes_contratada_fiscalizacao,
-        "sst": tr.sst,
-        "credenciamento_observacoes": tr.credenciamento_observacoes,
-        "anexos_info": tr.anexos_info,
-        "service_items": items,
-        "submitted_at": tr.submitted_at.isoformat() if tr.submitted_at else None,
-        "approved_at": tr.approved_at.isoformat() if tr.approved_at else None,
-        "approval_comments": tr.approval_comments
-    }
-    # Incluir campos adicionais quando existirem
-    tr_data["credenciamento"] = tr.credenciamento
-    tr_data["observacoes"] = tr.observacoes
-    tr_data["orcamento_estimado"] = float(tr.orcamento_estimado) if tr.orcamento_estimado is not None else None
-    tr_data["prazo_maximo_execucao"] = tr.prazo_maximo_execucao
-    return tr_data
+    # fields=: só as colunas pedidas são lidas do banco (e os itens só se pedidos)
+    try:
+        fields = _parse_tr_fields(request.args.get("fields"))
+    except ValueError as exc:
+        return {"error": str(exc)}, 400
+
+    # O corpo (TR + itens) só é carregado se o cliente não o tiver
+    etag_parts = (detail.tr_id, detail.tr_updated_at, data_versions.get(proc_id), user.role.value, ",".join(fields))
+    return conditional_json(etag_parts, lambda: _tr_detail(_load_tr(detail.tr_id, fields), fields))
+
+
+# Campos de texto do TR devolvidos como estão
+TR_TEXT_FIELDS = (
+    "objetivo", "situacao_atual", "descricao_servicos", "local_horario_trabalhos",
+    "prazo_execucao", "local_canteiro", "atividades_preliminares", "garantia",
+    "matriz_responsabilidades", "descricoes_gerais", "normas_observar",
+    "regras_responsabilidades", "relacoes_contratada_fiscalizacao", "sst",
+    "credenciamento_observacoes", "anexos_info", "approval_comments",
+    "credenciamento", "observacoes", "prazo_maximo_execucao",
+)
+TR_DETAIL_FIELDS = (
+    "id", "tr_id", "procurement_id", "status", *TR_TEXT_FIELDS,
+    "service_items", "submitted_at", "approved_at", "orcamento_estimado",
+)
+
+
+def _parse_tr_fields(raw):
+    """Campos pedidos em ``fields=a,b``, na ordem de TR_DETAIL_FIELDS"""
+    if not raw:
+        return TR_DETAIL_FIELDS
+    requested = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = requested.difference(TR_DETAIL_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos inválidos: {', '.join(sorted(unknown))}")
+    return tuple(f for f in TR_DETAIL_FIELDS if f in requested)
+
+
+def _load_tr(tr_id: int, fields):
+    """TR só com as colunas dos campos pedidos; as demais ficam adiadas"""
+    columns = [getattr(TR, f) for f in fields if f not in ("id", "tr_id", "service_items")]
+    stmt = select(TR).where(TR.id == tr_id).options(load_only(TR.id, *columns))
+    if "service_items" in fields:
+        stmt = stmt.options(selectinload(TR.service_items))
+    return db.session.scalars(stmt).one()
+
+
+def _tr_field(tr, field):
+    if field in ("id", "tr_id"):  # tr_id: compatibilidade com frontend
+        return tr.id
+    if field == "status":
+        return tr.status.value
+    if field == "service_items":
+        return [{
+            "id": item.id,
+            "item_ordem": item.item_ordem,
+            "codigo": item.codigo,
+            "descricao": item.descricao,
+            "unid": item.unid,
+            "qtde": float(item.qtde)
+        } for item in tr.service_items]
+    if field in ("submitted_at", "approved_at"):
+        value = getattr(tr, field)
+        return value.isoformat() if value else None
+    if field == "orcamento_estimado":
+        return float(tr.orcamento_estimado) if tr.orcamento_estimado is not None else None
+    return getattr(tr, field)
+
+
+def _tr_detail(tr, fields=TR_DETAIL_FIELDS) -> dict:
+    return {field: _tr_field(tr, field) for field in fields}
 
 
 @bp.post("/tr/<int:tr_id>/approve")
@@ -248,6 +293,7 @@ def approve_tr(tr_id: int):
         return {"error": "Ação inválida"}, 400
     
     db.session.commit()
+    data_versions.bump(tr.procurement_id)
     
     # Notificar requisitante
     socketio.emit("tr.approval_result", {
@@ -298,6 +344,7 @@ def review_technical_proposal(tr_id: int):
         proposal.status = ProposalStatus.REJEITADA_TECNICAMENTE
     
     db.session.commit()
+    data_versions.bump(proposal.procurement_id)
     
     # Notificar comprador e fornecedor
     socketio.emit("proposal.technical_reviewed", {
@@ -356,18 +403,13 @@ def create_independent_tr():
     db.session.add(tr)
     db.session.flush()
     
-    # Adicionar itens de serviço se fornecidos
-    if "planilha_servico" in data:
-        for idx, item in enumerate(data.get("planilha_servico", []), start=1):
-            service_item = TRServiceItem(
-                tr_id=tr.id,
-                item_ordem=item.get("item_ordem", idx),
-                codigo=item.get("codigo", ""),
-                descricao=item.get("descricao", ""),
-                unid=item.get("unid", "UN"),
-                qtde=item.get("qtde", 1)
-            )
-            db.session.add(service_item)
+    # Adicionar itens de serviço se fornecidos (INSERT único)
+    if isinstance(data.get("planilha_servico"), list):
+        try:
+            sync_service_items(db.session, tr, data["planilha_servico"])
+        except ValueError as exc:
+            db.session.rollback()
+            return {"error": f"Planilha inválida: {exc}"}, 400
     
     db.session.commit()
     
@@ -384,6 +426,19 @@ def create_independent_tr():
     }
 
 
+def _check_tr_owner(tr, user):
+    """Erro 403 se o usuário não for o requisitante do TR, senão None"""
+    # Para TRs vinculados a um processo, o requisitante está em ``proc.requisitante_id``.
+    if tr.procurement_id:
+        proc = load_procurement(tr.procurement_id).procurement
+        if proc.requisitante_id != user.id:
+            return {"error": "Você não é o requisitante deste processo"}, 403
+    # TR independente: conferir o campo ``created_by``
+    elif tr.created_by != user.id:
+        return {"error": "Você não criou este TR"}, 403
+    return None
+
+
 # -----------------------------------------------------------------------------
 # Rota para atualizar um TR existente a partir do seu ID.  Essa funcionalidade
 # permite que o frontend envie uma requisição PUT para ``/tr/<tr_id>`` quando
@@ -400,17 +455,9 @@ def update_tr_by_id(tr_id: int):
         return {"error": "Apenas requisitantes podem editar TR"}, 403
 
     tr = TR.query.get_or_404(tr_id)
-
-    # Verificar se o usuário é o requisitante criador (ou requisitante do processo)
-    # Para TRs vinculados a um processo, o requisitante está em ``proc.requisitante_id``.
-    if tr.procurement_id:
-        proc = Procurement.query.get(tr.procurement_id)
-        if proc.requisitante_id != user.id:
-            return {"error": "Você não é o requisitante deste processo"}, 403
-    else:
-        # TR independente: conferir o campo ``created_by``
-        if tr.created_by != user.id:
-            return {"error": "Você não criou este TR"}, 403
+    denied = _check_tr_owner(tr, user)
+    if denied:
+        return denied
 
     data = request.get_json() or {}
 
@@ -428,21 +475,21 @@ def update_tr_by_id(tr_id: int):
         if field in data:
             setattr(tr, field, data[field])
 
-    # Atualizar itens de serviço se fornecido
+    # Atualizar itens de serviço se fornecido (diff: só grava o que mudou)
+    item_counts = None
     if "planilha_servico" in data and isinstance(data["planilha_servico"], list):
-        TRServiceItem.query.filter_by(tr_id=tr.id).delete()
-        for idx, item in enumerate(data["planilha_servico"], start=1):
-            service_item = TRServiceItem(
-                tr_id=tr.id,
-                item_ordem=item.get("item_ordem", idx),
-                codigo=item.get("codigo", ""),
-                descricao=item.get("descricao", ""),
-                unid=item.get("unid", "UN"),
-                qtde=item.get("qtde", 1)
-            )
-            db.session.add(service_item)
+        try:
+            item_counts = sync_service_items(db.session, tr, data["planilha_servico"])
+        except ValueError as exc:
+            db.session.rollback()
+            return {"error": f"Planilha inválida: {exc}"}, 400
+        except ItemsLockedError as exc:
+            db.session.rollback()
+            return {"error": f"Planilha não gravada: {exc}"}, 409
 
     db.session.commit()
+    if tr.procurement_id:
+        data_versions.bump(tr.procurement_id)
 
     # Emite evento em tempo real para outros usuários no processo
     socketio.emit("tr.saved", {
@@ -452,8 +499,92 @@ def update_tr_by_id(tr_id: int):
         "updated_by": user.id
     }, to=f"proc:{tr.procurement_id}" if tr.procurement_id else None)
 
-    return {
+    response = {
         "tr_id": tr.id,
         "status": tr.status.value,
         "message": "TR atualizado com sucesso"
     }
+    if item_counts is not None:
+        response["items"] = item_counts
+    return response
+
+
+@bp.post("/tr/<int:tr_id>/items/import")
+@jwt_required()
+def import_tr_items(tr_id: int):
+    """
+    Importa a planilha de serviços de um arquivo CSV/XLSX (campo ``file``) -
+    apenas REQUISITANTE.  ``mode=replace`` substitui os itens atuais; o padrão
+    (append) acrescenta.  Com qualquer linha inválida nada é gravado e a
+    resposta traz os erros por linha.
+    """
+    user = get_current_user()
+    if user.role != Role.REQUISITANTE:
+        return {"error": "Apenas requisitantes podem editar TR"}, 403
+
+    tr = TR.query.get_or_404(tr_id)
+    denied = _check_tr_owner(tr, user)
+    if denied:
+        return denied
+
+    if (request.content_length or 0) > current_app.config["TR_IMPORT_MAX_BYTES"]:
+        return {"error": "Arquivo muito grande"}, 413
+
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return {"error": "Envie a planilha no campo file"}, 400
+
+    # Upload chunked não traz Content-Length: mede o arquivo já recebido
+    upload.stream.seek(0, os.SEEK_END)
+    if upload.stream.tell() > current_app.config["TR_IMPORT_MAX_BYTES"]:
+        return {"error": "Arquivo muito grande"}, 413
+    upload.stream.seek(0)
+
+    fmt = (request.args.get("format") or upload.filename.rsplit(".", 1)[-1]).lower()
+    if fmt not in IMPORT_FORMATS:
+        return {"error": "Formato inválido (use csv ou xlsx)"}, 400
+
+    mode = request.args.get("mode", "append")
+    if mode not in ("append", "replace"):
+        return {"error": "mode inválido (use append ou replace)"}, 400
+
+    if fmt == "xlsx":
+        rows = iter_xlsx_rows(upload.stream)
+    else:
+        encoding = request.args.get("encoding") or "utf-8-sig"
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            return {"error": "encoding inválido"}, 400
+        rows = iter_csv_rows(upload.stream, encoding)
+
+    try:
+        result = import_service_items(db.session, tr, rows, replace=mode == "replace")
+    except SpreadsheetError:
+        db.session.rollback()
+        return {"error": f"Arquivo {fmt.upper()} inválido ou com codificação diferente de UTF-8"}, 400
+    except ValueError as exc:
+        # Inclui SpreadsheetFormatError (parte do XLSX ausente)
+        db.session.rollback()
+        return {"error": f"Planilha inválida: {exc}"}, 400
+    except ItemsLockedError as exc:
+        db.session.rollback()
+        return {"error": f"Planilha não gravada: {exc}"}, 409
+
+    if result["error_count"]:
+        db.session.rollback()
+        return {"error": "Planilha com erros; nenhum item foi importado", **result}, 400
+
+    tr.updated_at = datetime.utcnow()
+    db.session.commit()
+    if tr.procurement_id:
+        data_versions.bump(tr.procurement_id)
+
+    socketio.emit("tr.saved", {
+        "procurement_id": tr.procurement_id,
+        "tr_id": tr.id,
+        "status": tr.status.value,
+        "updated_by": user.id
+    }, to=f"proc:{tr.procurement_id}" if tr.procurement_id else None)
+
+    return {"tr_id": tr.id, **result}
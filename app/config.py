@@ -15,3 +15,35 @@ class Config:
         SQLALCHEMY_DATABASE_URI = "sqlite:///concorrencia.db"
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Cache de identidade (usuário autenticado) em memória do processo
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "1024"))
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "60"))
+
+    # Executor de bcrypt (threads nativas fora do hub do eventlet)
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+    # Cache de resultados versionado por processo (comparativo, itens comerciais)
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+    RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Busca textual: auto (pelo dialeto), postgres, sqlite (FTS5) ou memory
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+    # Encerramento automático dos processos no prazo de propostas
+    # Fuso dos prazos enviados sem offset (ex.: datetime-local do navegador)
+    APP_TIMEZONE = os.getenv("APP_TIMEZONE", "America/Sao_Paulo")
+    DEADLINE_SCHEDULER_ENABLED = os.getenv("DEADLINE_SCHEDULER_ENABLED", "1").lower() not in ("0", "false", "no")
+
+    # Importação de planilha do TR (CSV/XLSX): tamanho máximo do arquivo
+    TR_IMPORT_MAX_BYTES = int(os.getenv("TR_IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+    # Corpo máximo de qualquer requisição, contado também em uploads chunked
+    # (sem Content-Length); a maior é a planilha do TR mais o envelope multipart
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(TR_IMPORT_MAX_BYTES + 1024 * 1024)))
+
+    # Compressão gzip/brotli das respostas JSON da API a partir deste tamanho
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+    # Autosave de propostas: intervalo da gravação adiada (0 = grava na requisição)
+    AUTOSAVE_FLUSH_INTERVAL_MS = int(os.getenv("AUTOSAVE_FLUSH_INTERVAL_MS", "250"))
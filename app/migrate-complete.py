@@ -174,8 +174,120 @@ def migrate_database():
                 db.session.commit()
                 print("   ✓ Status sincronizados (PostgreSQL)")
             
-            # 6. Verificar integridade dos dados
-            print("\n6. Verificando integridade dos dados...")
+            # 6. Índices usados pelas listagens paginadas
+            print("\n6. Criando índices de listagem...")
+            for index_sql in (
+                "CREATE INDEX IF NOT EXISTS ix_procurements_created_at_id ON procurements (created_at, id)",
+                "CREATE INDEX IF NOT EXISTS ix_procurements_status ON procurements (status)",
+                "CREATE INDEX IF NOT EXISTS ix_procurements_requisitante_id ON procurements (requisitante_id)",
+            ):
+                db.session.execute(text(index_sql))
+            db.session.commit()
+            print("   ✓ Índices criados")
+            
+            # 7. Totais materializados das propostas
+            print("\n7. Adicionando totais materializados nas propostas...")
+            for column_sql in (
+                "ALTER TABLE proposals ADD COLUMN total_value NUMERIC(24, 5) NOT NULL DEFAULT 0",
+                "ALTER TABLE proposals ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0",
+            ):
+                try:
+                    db.session.execute(text(column_sql))
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    if "duplicate column" not in str(e).lower() and "already exists" not in str(e).lower():
+                        raise
+            result = db.session.execute(text("""
+                UPDATE proposals
+                SET total_value = COALESCE((
+                        SELECT SUM(ps.qty * pp.unit_price)
+                        FROM proposal_service ps
+                        JOIN proposal_prices pp
+                          ON pp.proposal_id = ps.proposal_id
+                         AND pp.service_item_id = ps.service_item_id
+                        WHERE ps.proposal_id = proposals.id
+                    ), 0),
+                    item_count = (
+                        SELECT COUNT(*)
+                        FROM proposal_service ps
+                        JOIN proposal_prices pp
+                          ON pp.proposal_id = ps.proposal_id
+                         AND pp.service_item_id = ps.service_item_id
+                        WHERE ps.proposal_id = proposals.id
+                    )
+            """))
+            db.session.commit()
+            print(f"   ✓ {result.rowcount} propostas recalculadas")
+            
+            # 8. Visibilidade dos fornecedores por convite
+            print("\n8. Criando visibilidade dos fornecedores...")
+            try:
+                db.session.execute(text(
+                    "ALTER TABLE invites ADD COLUMN supplier_user_id INTEGER REFERENCES users(id)"
+                ))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                if "duplicate column" not in str(e).lower() and "already exists" not in str(e).lower():
+                    raise
+            for ddl in (
+                """
+                CREATE TABLE IF NOT EXISTS supplier_visibility (
+                    user_id INTEGER NOT NULL REFERENCES users(id),
+                    procurement_id INTEGER NOT NULL REFERENCES procurements(id),
+                    PRIMARY KEY (user_id, procurement_id)
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS ix_supplier_visibility_procurement_id ON supplier_visibility (procurement_id)",
+                "CREATE INDEX IF NOT EXISTS ix_invites_email ON invites (email)",
+                "CREATE INDEX IF NOT EXISTS ix_invites_supplier_user_id ON invites (supplier_user_id)",
+                "CREATE INDEX IF NOT EXISTS ix_invites_procurement_id ON invites (procurement_id)",
+            ):
+                db.session.execute(text(ddl))
+            db.session.execute(text("""
+                UPDATE invites
+                SET supplier_user_id = (
+                    SELECT users.id FROM users
+                    WHERE users.email = invites.email AND users.role = 'FORNECEDOR'
+                )
+                WHERE supplier_user_id IS NULL
+            """))
+            db.session.commit()
+            # Versão anterior da tabela: uma linha por fornecedor × processo
+            # público, marcada por ``invited``; agora só os convites ficam
+            try:
+                db.session.execute(text("ALTER TABLE supplier_visibility DROP COLUMN invited"))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                if "no such column" not in str(e).lower() and "does not exist" not in str(e).lower():
+                    raise
+            db.session.execute(text("DELETE FROM supplier_visibility"))
+            db.session.execute(text("""
+                INSERT INTO supplier_visibility (user_id, procurement_id)
+                SELECT DISTINCT supplier_user_id, procurement_id
+                FROM invites
+                WHERE supplier_user_id IS NOT NULL
+            """))
+            db.session.commit()
+            vis_count = db.session.execute(text("SELECT COUNT(*) FROM supplier_visibility")).scalar()
+            print(f"   ✓ {vis_count} linhas de visibilidade")
+            
+            # 9. Corte de validade dos tokens por usuário
+            print("\n9. Adicionando tokens_valid_after nos usuários...")
+            try:
+                db.session.execute(text("ALTER TABLE users ADD COLUMN tokens_valid_after TIMESTAMP"))
+                db.session.commit()
+                print("   ✓ Campo tokens_valid_after adicionado")
+            except Exception as e:
+                db.session.rollback()
+                if "duplicate column" not in str(e).lower() and "already exists" not in str(e).lower():
+                    raise
+                print("   ✓ Campo tokens_valid_after já existe")
+            
+            # 10. Verificar integridade dos dados
+            print("\n10. Verificando integridade dos dados...")
             
             # Contar registros
             proc_count = db.session.execute(text("SELECT COUNT(*) FROM procurements")).scalar()
@@ -210,12 +322,12 @@ def migrate_database():
                 print(f"\n   ⚠️  ATENÇÃO: {proc_sem_req} processos sem requisitante atribuído!")
                 print("      Você pode atribuir manualmente ou criar um requisitante.")
             
-            # 7. Criar usuários de teste se não existirem
+            # 11. Criar usuários de teste se não existirem
             if user_count == 0:
-                print("\n7. Criando usuários de teste...")
+                print("\n11. Criando usuários de teste...")
                 create_test_users()
             else:
-                print("\n7. Usuários já existem, pulando criação de usuários de teste")
+                print("\n11. Usuários já existem, pulando criação de usuários de teste")
             
             print("\n" + "=" * 60)
             print("✅ MIGRAÇÃO CONCLUÍDA COM SUCESSO!")
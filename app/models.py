@@ -64,6 +64,8 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    # Tokens emitidos antes disso são recusados (mudança de role/org/email, desativação)
+    tokens_valid_after = db.Column(db.DateTime)
 
 
 class Procurement(db.Model):
@@ -95,6 +97,13 @@ class Procurement(db.Model):
     proposals = relationship("Proposal", backref="procurement")
     invites = relationship("Invite", backref="procurement")
 
+    __table_args__ = (
+        # Paginação por cursor em (created_at, id)
+        db.Index("ix_procurements_created_at_id", "created_at", "id"),
+        db.Index("ix_procurements_status", "status"),
+        db.Index("ix_procurements_requisitante_id", "requisitante_id"),
+    )
+
 
 class TR(db.Model):
     __tablename__ = "tr_terms"
@@ -151,6 +160,19 @@ class TR(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class SearchDocument(db.Model):
+    """
+    Texto pesquisável de cada processo (título + descrição + campos do TR),
+    mantido por utils/search.py.  No Postgres ganha a coluna ``tsv``
+    (tsvector gerado, índice GIN); no SQLite é espelhado numa tabela FTS5.
+    """
+    __tablename__ = "search_documents"
+    procurement_id = db.Column(db.Integer, db.ForeignKey("procurements.id"), primary_key=True)
+    title = db.Column(db.Text, nullable=False, default="")
+    body = db.Column(db.Text, nullable=False, default="")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class TRServiceItem(db.Model):
     __tablename__ = "tr_service_items"
     id = db.Column(db.Integer, primary_key=True)
@@ -173,11 +195,30 @@ class Invite(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     procurement_id = db.Column(db.Integer, db.ForeignKey("procurements.id"), nullable=False)
     email = db.Column(db.String(255), nullable=False)
+    # Fornecedor cadastrado com esse e-mail (resolvido no convite ou no registro)
+    supplier_user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     token = db.Column(db.String(64), nullable=False, unique=True)
     accepted = db.Column(db.Boolean, default=False)
     accepted_at = db.Column(db.DateTime)
     created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index("ix_invites_email", "email"),
+        db.Index("ix_invites_supplier_user_id", "supplier_user_id"),
+        db.Index("ix_invites_procurement_id", "procurement_id"),
+    )
+
+
+class SupplierVisibility(db.Model):
+    """
+    Processos para os quais cada fornecedor foi convidado (os em status
+    público valem para todos e não entram aqui).  Mantida por
+    utils/visibility.py.
+    """
+    __tablename__ = "supplier_visibility"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    procurement_id = db.Column(db.Integer, db.ForeignKey("procurements.id"), primary_key=True, index=True)
 
 
 class Proposal(db.Model):
@@ -203,6 +244,11 @@ class Proposal(db.Model):
     delivery_time = db.Column(db.String(100))
     warranty_terms = db.Column(db.Text)
     
+    # Totais materializados (sum(qty × unit_price) e nº de itens com preço),
+    # mantidos por utils/totals.py a cada escrita de itens/preços
+    total_value = db.Column(db.Numeric(24, 5), nullable=False, default=0, server_default="0")
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -236,6 +282,26 @@ class ProposalPrice(db.Model):
         CheckConstraint("unit_price >= 0", name="chk_price_nonneg"),
     )
 
+class ScoringConfig(db.Model):
+    """
+    Critério de classificação das propostas escolhido pelo comprador
+    (pesos de preço/técnica, normalização e cortes), usado pelo comparativo.
+    """
+    __tablename__ = "scoring_configs"
+    procurement_id = db.Column(db.Integer, db.ForeignKey("procurements.id"), primary_key=True)
+    price_weight = db.Column(db.Float, nullable=False, default=0.5)
+    technical_weight = db.Column(db.Float, nullable=False, default=0.5)
+    normalization = db.Column(db.String(20), nullable=False, default="min_ratio")
+    min_technical_score = db.Column(db.Float)  # abaixo disso a proposta é excluída
+    max_price = db.Column(db.Numeric(18, 2))   # acima disso a proposta é excluída
+    updated_by = db.Column(db.Integer, db.ForeignKey("users.id"))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        CheckConstraint("price_weight >= 0 AND technical_weight >= 0", name="chk_scoring_weights_nonneg"),
+    )
+
+
 class AuditLog(db.Model):
     """Log de auditoria para todas as ações importantes"""
     __tablename__ = "audit_logs"
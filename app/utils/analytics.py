@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Estatísticas por item da matriz de preços (item × proposta) com NumPy.
+
+Os valores chegam do banco já em centavos inteiros (``round(x * 100)`` no
+SQL, exato no Numeric do Postgres), então somas e totais são feitos em
+int64 sem perda; só mínimo/mediana/máximo usam float64, que representa
+centavos inteiros exatamente até 2**53.  Células sem preço ficam como NaN
+(float) ou fora da máscara ``priced``.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import BigInteger, and_, cast, func, select
+from .. import db
+from ..models import ProposalPrice, ProposalService, TR, TRServiceItem
+from .comparison import money
+
+# Escore robusto (mediana/MAD) acima do qual o preço é atípico
+OUTLIER_Z = 3.5
+# Sem dispersão (MAD = 0): atípico se desviar mais que isso da mediana
+OUTLIER_MIN_DEVIATION = 0.5
+# MAD -> desvio padrão para dados normais
+MAD_SCALE = 1.4826
+
+
+def _cents(column):
+    return cast(func.round(column * 100), BigInteger)
+
+
+def load_price_matrix(proc_id: int, proposal_ids: list):
+    """
+    Itens do TR (na ordem) e matrizes item × proposta em centavos: preço
+    unitário e total da linha (qtde × preço), mais a máscara ``priced``.
+    Duas consultas; o preenchimento é vetorizado (searchsorted).
+    """
+    items = db.session.execute(
+        select(
+            TRServiceItem.id, TRServiceItem.item_ordem, TRServiceItem.codigo,
+            TRServiceItem.descricao, TRServiceItem.unid,
+        ).join(
+            TR, and_(TR.id == TRServiceItem.tr_id, TR.procurement_id == proc_id)
+        ).order_by(TRServiceItem.item_ordem, TRServiceItem.id)
+    ).all()
+
+    shape = (len(items), len(proposal_ids))
+    unit = np.zeros(shape, dtype=np.int64)
+    line = np.zeros(shape, dtype=np.int64)
+    priced = np.zeros(shape, dtype=bool)
+    if not items or not proposal_ids:
+        return items, unit, line, priced
+
+    cells = db.session.execute(
+        select(
+            ProposalPrice.service_item_id,
+            ProposalPrice.proposal_id,
+            _cents(ProposalPrice.unit_price),
+            _cents(ProposalService.qty * ProposalPrice.unit_price),
+        ).join(
+            ProposalService,
+            and_(
+                ProposalService.proposal_id == ProposalPrice.proposal_id,
+                ProposalService.service_item_id == ProposalPrice.service_item_id,
+            )
+        ).join(
+            TRServiceItem, TRServiceItem.id == ProposalPrice.service_item_id
+        ).join(
+            TR, and_(TR.id == TRServiceItem.tr_id, TR.procurement_id == proc_id)
+        ).where(ProposalPrice.proposal_id.in_(proposal_ids))
+    ).all()
+    if not cells:
+        return items, unit, line, priced
+
+    sids, pids, unit_cents, line_cents = (np.array(col, dtype=np.int64) for col in zip(*cells))
+    item_ids = np.array([row.id for row in items], dtype=np.int64)
+    item_order = np.argsort(item_ids)
+    rows = item_order[np.searchsorted(item_ids, sids, sorter=item_order)]
+    proposal_array = np.array(proposal_ids, dtype=np.int64)
+    proposal_order = np.argsort(proposal_array)
+    cols = proposal_order[np.searchsorted(proposal_array, pids, sorter=proposal_order)]
+
+    unit[rows, cols] = unit_cents
+    line[rows, cols] = line_cents
+    priced[rows, cols] = True
+    return items, unit, line, priced
+
+
+def _money(cents) -> float:
+    # int (somas) ou float (mediana, pode ter meio centavo): Decimal exato dos dois
+    return money(Decimal(cents).scaleb(-2))
+
+
+def price_statistics(unit, line, priced) -> dict:
+    """Estatísticas vetorizadas por item e por proposta (arrays NumPy)"""
+    n_items, n_props = unit.shape
+    counts = priced.sum(axis=1)
+    has_price = counts > 0
+
+    values = np.where(priced, unit, np.nan).astype(np.float64)
+    with np.errstate(all="ignore"):
+        low = np.nanmin(np.where(has_price[:, None], values, 0), axis=1)
+        high = np.nanmax(np.where(has_price[:, None], values, 0), axis=1)
+        median = np.nanmedian(np.where(has_price[:, None], values, 0), axis=1)
+        spread = np.where(low > 0, (high - low) / low, 0.0)
+
+        deviation = np.abs(values - median[:, None])
+        mad = np.nanmedian(np.where(has_price[:, None], deviation, 0), axis=1)
+        robust_z = deviation / (MAD_SCALE * mad[:, None])
+        relative = deviation / np.where(median > 0, median, np.inf)[:, None]
+    outliers = priced & np.where(
+        (mad > 0)[:, None], robust_z > OUTLIER_Z, relative > OUTLIER_MIN_DEVIATION
+    )
+
+    # Melhor fornecedor por item: menor total da linha entre os que cotaram
+    big = np.iinfo(np.int64).max
+    masked_line = np.where(priced, line, big)
+    best = masked_line.argmin(axis=1) if n_props else np.zeros(n_items, dtype=np.int64)
+    best_line = np.where(has_price, masked_line[np.arange(n_items), best], 0)
+
+    totals = np.where(priced, line, 0).sum(axis=0)
+    priced_items = priced.sum(axis=0)
+    wins = np.bincount(best[has_price], minlength=n_props)
+    complete = priced_items == n_items
+
+    return {
+        "counts": counts,
+        "min": low,
+        "median": median,
+        "max": high,
+        "spread": spread,
+        "outliers": outliers,
+        "best": best,
+        "has_price": has_price,
+        "split_total": int(best_line.sum()),
+        "totals": totals,
+        "priced_items": priced_items,
+        "wins": wins,
+        "complete": complete,
+    }
+
+
+def build_price_analytics(items, proposals, stats) -> dict:
+    """Resposta JSON (valores em reais) a partir das estatísticas"""
+    proposal_ids = [p.id for p in proposals]
+    complete_totals = [t for t, ok in zip(stats["totals"].tolist(), stats["complete"].tolist()) if ok]
+    best_single = min(complete_totals) if complete_totals else None
+
+    # Centavos inteiros (a mediana arredonda meio centavo para o par, como
+    # ``money``) / 100: a divisão IEEE dá o mesmo float do Decimal arredondado
+    columns = zip(
+        stats["has_price"].tolist(), stats["counts"].tolist(),
+        (stats["min"] / 100).tolist(), (np.round(stats["median"]) / 100).tolist(),
+        (stats["max"] / 100).tolist(), np.round(stats["spread"], 4).tolist(),
+        stats["best"].tolist(), stats["outliers"].any(axis=1).tolist(),
+    )
+    out_items = []
+    for index, (item, (has_price, count, low, median, high, spread, best, any_outlier)) in enumerate(
+            zip(items, columns)):
+        entry = {
+            "service_item_id": item.id,
+            "item_ordem": item.item_ordem,
+            "codigo": item.codigo,
+            "descricao": item.descricao,
+            "unid": item.unid,
+            "suppliers": count,
+        }
+        if has_price:
+            entry.update({
+                "min_unit_price": low,
+                "median_unit_price": median,
+                "max_unit_price": high,
+                "spread": spread,
+                "best_proposal_id": proposal_ids[best],
+                "outlier_proposal_ids": [
+                    proposal_ids[col] for col in np.flatnonzero(stats["outliers"][index]).tolist()
+                ] if any_outlier else [],
+            })
+        out_items.append(entry)
+
+    totals = stats["totals"].tolist()
+    return {
+        "items": out_items,
+        "proposals": [{
+            "proposal_id": p.id,
+            "supplier": p.supplier,
+            "organization": p.organization,
+            "total": _money(totals[col]),
+            "priced_items": int(stats["priced_items"][col]),
+            "complete": bool(stats["complete"][col]),
+            "cheapest_items": int(stats["wins"][col]),
+            "outlier_items": int(stats["outliers"][:, col].sum()),
+        } for col, p in enumerate(proposals)],
+        "summary": {
+            "total_items": len(items),
+            "priced_items": int(stats["has_price"].sum()),
+            "split_total": _money(stats["split_total"]),
+            "best_single_total": _money(best_single) if best_single is not None else None,
+            "split_savings": _money(best_single - stats["split_total"]) if best_single is not None else None,
+            "outlier_cells": int(stats["outliers"].sum()),
+        },
+    }
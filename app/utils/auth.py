@@ -4,26 +4,204 @@ Helper functions para autenticação JWT
 Resolve o problema de compatibilidade entre diferentes formatos de JWT
 """
 
-from flask_jwt_extended import get_jwt_identity
-from ..models import User
+import calendar
+from datetime import datetime, timedelta
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_header, get_jwt_identity
+from flask_jwt_extended.exceptions import RevokedTokenError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload
+from .. import db, jwt
+from ..models import User, Organization, Role
+from .cache import TTLCache
 
-def get_current_user():
-    identity = get_jwt_identity()
-    
+# Cache de identidade do processo, indexado pelo id do usuário do JWT.
+# Tamanho e TTL são ajustados em create_app a partir da Config.
+identity_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+class CachedOrganization:
+    """Cópia somente leitura da organização do usuário"""
+    __slots__ = ("id", "name")
+
+    def __init__(self, org):
+        self.id = org.id
+        self.name = org.name
+
+
+class CachedUser:
+    """
+    Cópia somente leitura do usuário autenticado, desacoplada da sessão do
+    SQLAlchemy para poder ser reutilizada entre requisições.
+    """
+    __slots__ = ("id", "email", "full_name", "role", "org_id", "is_active", "organization",
+                 "tokens_valid_after")
+
+    def __init__(self, user):
+        self.id = user.id
+        self.email = user.email
+        self.full_name = user.full_name
+        self.role = user.role
+        self.org_id = user.org_id
+        self.is_active = user.is_active
+        self.organization = CachedOrganization(user.organization) if user.organization else None
+        # Epoch (segundos) a partir do qual os tokens são aceitos; 0 = todos
+        self.tokens_valid_after = (
+            calendar.timegm(user.tokens_valid_after.utctimetuple()) if user.tokens_valid_after else 0
+        )
+
+    def accepts_token(self, issued_at) -> bool:
+        return self.is_active is not False and issued_at is not None and issued_at >= self.tokens_valid_after
+
+
+class Principal:
+    """
+    Usuário autenticado montado a partir das claims assinadas do JWT.
+    id, email, role e org_id vêm do token (já conferido contra
+    ``tokens_valid_after`` no blocklist); os demais atributos (full_name,
+    organization, ...) são resolvidos sob demanda via load_user.
+    """
+    __slots__ = ("id", "email", "role", "org_id", "_user")
+
+    def __init__(self, user_id: int, claims: dict):
+        self.id = user_id
+        self.email = claims["email"]
+        self.role = Role(claims["role"])
+        self.org_id = claims.get("org_id")
+        self._user = None
+
+    def __getattr__(self, name):
+        if self._user is None:
+            self._user = load_user(self.id)
+            if self._user is None:
+                # Usuário removido durante a requisição: mesmo 401 do token revogado
+                raise RevokedTokenError(get_jwt_header(), get_jwt())
+        return getattr(self._user, name)
+
+
+# Claims de autorização embutidas no token (além do id em ``sub``)
+CLAIM_KEYS = ("role", "org_id", "email")
+
+
+def claims_for(user) -> dict:
+    return {"role": user.role.value, "org_id": user.org_id, "email": user.email}
+
+
+@jwt.token_in_blocklist_loader
+def _token_revoked(jwt_header, jwt_payload):
+    # Usuário inexistente, desativado ou com claims alteradas depois da
+    # emissão: 401.  load_user usa o cache de identidade (TTL), então outros
+    # processos enxergam a mudança em até IDENTITY_CACHE_TTL segundos.
+    user_id = _identity_to_user_id(jwt_payload.get("sub"))
+    if user_id is None:
+        return True
+    user = load_user(user_id)
+    return user is None or not user.accepts_token(jwt_payload.get("iat"))
+
+
+def _identity_to_user_id(identity):
     # Converter para int se for string
     if isinstance(identity, str):
         try:
-            user_id = int(identity)
-        except:
+            return int(identity)
+        except ValueError:
             return None
     elif isinstance(identity, int):
-        user_id = identity
+        return identity
     elif isinstance(identity, dict):
-        user_id = identity.get("user_id")
-    else:
+        return identity.get("user_id")
+    return None
+
+
+def load_user(user_id: int):
+    """Resolve o usuário pelo id: cache do processo primeiro, banco depois"""
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    user = db.session.get(User, user_id, options=[joinedload(User.organization)])
+    if not user:
+        return None
+
+    cached = CachedUser(user)
+    identity_cache.set(user_id, cached)
+    return cached
+
+
+def get_current_user():
+    user_id = _identity_to_user_id(get_jwt_identity())
+    if not user_id:
         return None
-    
-    return User.query.get(user_id) if user_id else None
+
+    # Memoização por requisição: handlers e decorators chamam várias vezes
+    memo = g.get("_current_user")
+    if memo is not None and memo.id == user_id:
+        return memo
+
+    # Token não revogado: as claims assinadas batem com o usuário atual
+    claims = get_jwt()
+    if all(k in claims for k in CLAIM_KEYS):
+        user = Principal(user_id, claims)
+    else:
+        user = load_user(user_id)
+    if user is not None:
+        g._current_user = user
+    return user
+
+
+def invalidate_user(user_id: int):
+    identity_cache.invalidate(user_id)
+    memo = g.get("_current_user") if g else None
+    if memo is not None and memo.id == user_id:
+        g.pop("_current_user", None)
+
+
+def _next_second() -> datetime:
+    # iat do JWT tem resolução de segundos: tokens do segundo da mudança também caem
+    return datetime.utcnow().replace(microsecond=0) + timedelta(seconds=1)
+
+
+@event.listens_for(Session, "before_flush")
+def _expire_stale_tokens(session, flush_context, instances):
+    for obj in session.dirty:
+        if isinstance(obj, User) and obj.id is not None:
+            attrs = inspect(obj).attrs
+            deactivated = attrs.is_active.history.has_changes() and obj.is_active is False
+            if deactivated or any(attrs[name].history.has_changes() for name in ("role", "org_id", "email")):
+                obj.tokens_valid_after = _next_second()
+
+
+# Invalidação: qualquer alteração em linhas de usuário ou organização
+# descarta as cópias em cache.  Invalida no flush (antes do commit, para
+# que a própria requisição não veja dados antigos) e novamente no commit,
+# para descartar uma entrada que outro greenlet tenha repovoado no meio.
+@event.listens_for(Session, "after_flush")
+def _collect_identity_changes(session, flush_context):
+    pending = session.info.setdefault("identity_changes", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            pending.add(obj.id)
+            invalidate_user(obj.id)
+        elif isinstance(obj, Organization):
+            pending.add(None)
+            identity_cache.clear()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_identity_changes(session):
+    pending = session.info.pop("identity_changes", None)
+    if not pending:
+        return
+    if None in pending:
+        identity_cache.clear()
+        return
+    for user_id in pending:
+        identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_identity_changes(session):
+    session.info.pop("identity_changes", None)
 
 
 def require_roles(*allowed_roles):
@@ -34,19 +212,20 @@ def require_roles(*allowed_roles):
     def decorator(f):
         from functools import wraps
         from flask_jwt_extended import jwt_required
-        
+
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
+            # Com claims válidas a role vem do token: nenhuma consulta de identidade
             user = get_current_user()
             if not user:
-                return {"error": "Usuário não encontrado"}, 404
-            
+                return {"error": "Usuário não encontrado"}, 401
+
             if user.role.value not in allowed_roles:
                 return {"error": f"Acesso negado. Requer um dos papéis: {', '.join(allowed_roles)}"}, 403
-            
+
             # Injeta o usuário como primeiro argumento da função
             return f(user, *args, **kwargs)
-        
+
         return decorated_function
     return decorator
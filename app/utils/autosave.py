@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Autosave por deltas das propostas, com escrita adiada (write-behind).
+
+O cliente envia só as células alteradas com um número de sequência
+crescente; a rota valida e entrega a ``AutosaveBuffer``, que guarda o valor
+mais recente de cada célula por proposta.  Um greenlet grava o buffer a cada
+``interval`` segundos em uma transação (upsert em lote + totais) e avisa o
+fornecedor com ``proposal.autosaved`` e a última sequência gravada.  Edições
+rápidas na mesma célula viram uma escrita só.
+
+Com ``interval`` 0 a gravação é feita na própria requisição.  O buffer é do
+processo (um worker): edições ainda não gravadas se perdem se ele cair,
+limitadas ao último intervalo.  Só propostas em RASCUNHO de processos ABERTO
+e dentro do prazo são gravadas: o envio (``submit``) grava antes o pendente
+da proposta com ``exclusive`` e o que chegar depois, ou depois do
+encerramento do processo, é descartado.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from eventlet.queue import Empty, LightQueue
+from sqlalchemy import select
+from .. import db, socketio
+from ..models import (
+    Procurement, ProcurementStatus, Proposal, ProposalService, ProposalPrice, ProposalStatus, TRServiceItem
+)
+from .cache import data_versions
+from .deadlines import deadline_scheduler
+from .proposal_items import PRICE_PLACES, QTY_PLACES, parse_amount, bulk_upsert
+from .totals import refresh_proposal_totals
+
+logger = logging.getLogger(__name__)
+
+AUTOSAVE_FIELDS = ("qty", "technical_notes", "unit_price")
+MAX_CHANGES = 5000
+
+
+def parse_changes(changes, tr_id: int) -> list:
+    """
+    ``[{service_item_id, field, value}]`` validados: campo conhecido, valor
+    numérico para qty/unit_price e item do TR (consulta só dos ids enviados).
+    ValueError com a mensagem para o cliente.
+    """
+    if not isinstance(changes, list) or not changes:
+        raise ValueError("changes deve ser uma lista não vazia")
+    if len(changes) > MAX_CHANGES:
+        raise ValueError(f"no máximo {MAX_CHANGES} alterações por envio")
+
+    parsed = []
+    for change in changes:
+        if not isinstance(change, dict):
+            raise ValueError("cada alteração deve ser um objeto")
+        sid, field, value = change.get("service_item_id"), change.get("field"), change.get("value")
+        # bool é int em Python (True == 1); listas/objetos nem são hasheáveis
+        if isinstance(sid, bool) or not isinstance(sid, int):
+            raise ValueError("service_item_id inválido")
+        if field not in AUTOSAVE_FIELDS:
+            raise ValueError(f"field inválido: {field!r}")
+        if field == "qty":
+            value = parse_amount(value, QTY_PLACES, field, sid)
+        elif field == "unit_price":
+            value = parse_amount(value, PRICE_PLACES, field, sid)
+        elif value is not None and not isinstance(value, str):
+            raise ValueError(f"technical_notes deve ser texto (service_item_id {sid})")
+        parsed.append((sid, field, value))
+
+    ids = {sid for sid, _, _ in parsed}
+    found = set(db.session.scalars(
+        select(TRServiceItem.id).where(TRServiceItem.tr_id == tr_id, TRServiceItem.id.in_(ids))
+    ))
+    missing = ids - found
+    if missing:
+        raise ValueError(f"service_item_id {min(missing)} inválido para este processo")
+    return parsed
+
+
+class _Pending:
+    __slots__ = ("proc_id", "supplier_id", "seq", "cells", "attempts")
+
+    def __init__(self, proc_id, supplier_id):
+        self.proc_id = proc_id
+        self.supplier_id = supplier_id
+        self.seq = 0
+        self.cells = {}  # (service_item_id, field) -> valor mais recente
+        self.attempts = 0
+
+
+class AutosaveBuffer:
+    # Tentativas de gravar uma proposta antes de descartar as edições
+    MAX_ATTEMPTS = 3
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Uma gravação por vez; o submit segura para validar sem corrida
+        self._write_lock = threading.RLock()
+        self._pending = {}
+        self._accepted = {}
+        self._committed = {}
+        self._wakeup = LightQueue()
+        self._app = None
+        self._greenlet = None
+        self.interval = 0.25
+        self.received = 0
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        self.discarded = 0
+
+    def configure(self, interval_ms: int) -> None:
+        self.interval = max(interval_ms, 0) / 1000.0
+
+    def accept(self, proposal_id: int, proc_id: int, supplier_id: int, seq: int, changes) -> bool:
+        """
+        Enfileira as alterações; False se ``seq`` já foi aceita (reenvio do
+        cliente), caso em que nada muda.
+        """
+        with self._lock:
+            if seq <= self._accepted.get(proposal_id, 0):
+                return False
+            self._accepted[proposal_id] = seq
+            pending = self._pending.get(proposal_id)
+            if pending is None:
+                pending = self._pending[proposal_id] = _Pending(proc_id, supplier_id)
+            pending.seq = seq
+            for sid, field, value in changes:
+                pending.cells[(sid, field)] = value
+            self.received += len(changes)
+
+        if self.interval and self._greenlet is not None:
+            self._wakeup.put(None)
+        else:
+            self.flush()
+        return True
+
+    def accepted_seq(self, proposal_id: int) -> int:
+        return self._accepted.get(proposal_id, 0)
+
+    def committed_seq(self, proposal_id: int) -> int:
+        return self._committed.get(proposal_id, 0)
+
+    def _write(self, batch: dict):
+        """
+        Grava o lote; retorna (células gravadas, {proposta recusada: motivo}).
+        Motivos: ``not_draft`` (já enviada) e ``closed`` (processo fora de
+        ABERTO ou prazo vencido, antes mesmo do encerramento automático).
+        """
+        rows = db.session.execute(
+            select(Proposal.id, Proposal.status, Procurement.status)
+            .join(Procurement, Procurement.id == Proposal.procurement_id)
+            .where(Proposal.id.in_(batch))
+            .with_for_update(of=Proposal)
+        ).all()
+        skipped = dict.fromkeys(batch, "not_draft")
+        for proposal_id, proposal_status, proc_status in rows:
+            if proposal_status != ProposalStatus.RASCUNHO:
+                continue
+            closed = proc_status != ProcurementStatus.ABERTO
+            if closed or deadline_scheduler.is_past_deadline(batch[proposal_id].proc_id):
+                skipped[proposal_id] = "closed"
+            else:
+                del skipped[proposal_id]
+        drafts = set(batch) - set(skipped)
+        written = 0
+        for proposal_id, pending in batch.items():
+            if proposal_id not in drafts:
+                continue
+            services = {}
+            prices = []
+            for (sid, field), value in pending.cells.items():
+                if field == "unit_price":
+                    prices.append({"proposal_id": proposal_id, "service_item_id": sid, "unit_price": value})
+                else:
+                    services.setdefault(sid, {})[field] = value
+            # Linhas agrupadas pelas colunas alteradas: o UPDATE só toca nelas
+            groups = {}
+            for sid, fields in services.items():
+                groups.setdefault(tuple(sorted(fields)), []).append(
+                    dict({"qty": 0}, proposal_id=proposal_id, service_item_id=sid, **fields)
+                )
+            for columns, rows in groups.items():
+                bulk_upsert(db.session, ProposalService, rows, columns)
+            bulk_upsert(db.session, ProposalPrice, prices, ["unit_price"])
+            written += len(pending.cells)
+        if drafts:
+            refresh_proposal_totals(db.session, drafts)
+        return written, skipped
+
+    def _flush_batch(self, batch: dict) -> bool:
+        with self._write_lock:
+            try:
+                written, skipped = self._write(batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.failures += 1
+                logger.exception("Falha ao gravar autosave das propostas %s", sorted(batch))
+                return False
+
+        self.flushes += 1
+        self.written += written
+        # Proposta já enviada ou processo encerrado: as edições não entram mais
+        for proposal_id, reason in skipped.items():
+            pending = batch.pop(proposal_id)
+            self.discarded += len(pending.cells)
+            self._notify_failed(proposal_id, pending, reason)
+        with self._lock:
+            for proposal_id, pending in batch.items():
+                self._committed[proposal_id] = max(self._committed.get(proposal_id, 0), pending.seq)
+        for proc_id in {pending.proc_id for pending in batch.values()}:
+            data_versions.bump(proc_id)
+        for proposal_id, pending in batch.items():
+            socketio.emit("proposal.autosaved", {
+                "proposal_id": proposal_id,
+                "procurement_id": pending.proc_id,
+                "seq": pending.seq
+            }, to=f"user:{pending.supplier_id}")
+        return True
+
+    def flush(self) -> None:
+        """Grava tudo o que está pendente, em uma transação"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch or self._flush_batch(batch):
+            return
+        # Uma proposta com problema não pode travar as outras: isola cada uma
+        for proposal_id, pending in batch.items():
+            if len(batch) == 1 or not self._flush_batch({proposal_id: pending}):
+                self._retry_or_drop(proposal_id, pending)
+
+    @contextmanager
+    def exclusive(self, proposal_id: int):
+        """
+        Grava o pendente da proposta e bloqueia outras gravações até o fim do
+        bloco (validação + commit do envio).  Produz False se a gravação falhou.
+        """
+        with self._write_lock:
+            with self._lock:
+                pending = self._pending.pop(proposal_id, None)
+            saved = pending is None or self._flush_batch({proposal_id: pending})
+            if not saved:
+                self._retry_or_drop(proposal_id, pending)
+            yield saved
+
+    def _notify_failed(self, proposal_id: int, pending: _Pending, reason: str) -> None:
+        socketio.emit("proposal.autosave_failed", {
+            "proposal_id": proposal_id,
+            "procurement_id": pending.proc_id,
+            "committed_seq": self.committed_seq(proposal_id),
+            "reason": reason
+        }, to=f"user:{pending.supplier_id}")
+
+    def _retry_or_drop(self, proposal_id: int, old: _Pending) -> None:
+        old.attempts += 1
+        if old.attempts >= self.MAX_ATTEMPTS:
+            self.dropped += len(old.cells)
+            self._notify_failed(proposal_id, old, "write_failed")
+            return
+        # Devolve ao buffer sem sobrescrever edições que chegaram depois
+        with self._lock:
+            pending = self._pending.get(proposal_id)
+            if pending is None:
+                self._pending[proposal_id] = old
+                return
+            pending.attempts = max(pending.attempts, old.attempts)
+            for key, value in old.cells.items():
+                pending.cells.setdefault(key, value)
+
+    def _run(self):
+        while True:
+            try:
+                self._wakeup.get(timeout=60)
+            except Empty:
+                continue
+            # Janela de coalescência: junta as edições que chegarem nesse meio tempo
+            socketio.sleep(self.interval)
+            while not self._wakeup.empty():
+                self._wakeup.get_nowait()
+            with self._app.app_context():
+                self.flush()
+            if self._pending:
+                self._wakeup.put(None)
+
+    def start(self, app) -> None:
+        """Inicia o greenlet de gravação (uma vez); sem intervalo grava na hora"""
+        self._app = app
+        if self.interval and self._greenlet is None:
+            self._greenlet = socketio.start_background_task(self._run)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "interval_ms": int(self.interval * 1000),
+                "pending_proposals": len(self._pending),
+                "pending_cells": sum(len(p.cells) for p in self._pending.values()),
+                "received": self.received,
+                "written": self.written,
+                "flushes": self.flushes,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "discarded": self.discarded,
+            }
+
+
+autosave_buffer = AutosaveBuffer()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Caches em memória do processo (um único worker eventlet em produção)
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache LRU limitado com expiração por TTL e contadores de acerto/erro.
+    Seguro para uso concorrente entre greenlets/threads.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, maxsize: int = None, ttl: float = None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._evict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class DataVersions:
+    """
+    Versão dos dados de cada processo.  Os caminhos de escrita chamam
+    ``bump`` após o commit; resultados em cache ficam indexados pela versão
+    vigente e deixam de ser alcançáveis assim que ela muda.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._listeners = []
+
+    def get(self, proc_id: int) -> int:
+        return self._versions.get(proc_id, 0)
+
+    def bump(self, proc_id: int) -> int:
+        with self._lock:
+            version = self._versions.get(proc_id, 0) + 1
+            self._versions[proc_id] = version
+        for listener in self._listeners:
+            listener(proc_id, version)
+        return version
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+
+class ResultCache:
+    """
+    Cache LRU de resultados serializáveis em JSON, limitado por número de
+    entradas e por memória (tamanho aproximado do JSON de cada valor).
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_entries: int = None, max_bytes: int = None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._evict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+            self._evict()
+
+    def discard(self, predicate):
+        """Remove as entradas cujas chaves satisfazem ``predicate``"""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                self.bytes -= self._data.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def _evict(self):
+        while self._data and (len(self._data) > self.max_entries or self.bytes > self.max_bytes):
+            _, (_, size) = self._data.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+data_versions = DataVersions()
+result_cache = ResultCache()
+
+# Entradas de versões antigas nunca mais serão lidas: liberar memória já
+data_versions.subscribe(
+    lambda proc_id, version: result_cache.discard(lambda key: key[1] == proc_id and key[2] < version)
+)
+
+
+def cached_by_version(namespace: str, proc_id: int, compute, scope=None):
+    """
+    Retorna o resultado de ``compute()`` para o processo, reaproveitando o
+    valor calculado enquanto a versão dos dados do processo não mudar.
+    ``scope`` separa visões diferentes do mesmo dado (ex.: por fornecedor).
+    Resultados ``None`` não são guardados.
+    """
+    key = (namespace, proc_id, data_versions.get(proc_id), scope)
+    value = result_cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            result_cache.set(key, value)
+    return value
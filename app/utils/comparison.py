@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Motor da análise comparativa de propostas.
+
+Os totais vêm de ``Proposal.total_value`` (materializado em Numeric por
+utils/totals.py) e os itens de uma única consulta sobre proposal_service ⋈
+proposal_prices ⋈ tr_service_items; o Python só monta o ranking e o resumo
+``ai_analysis`` sobre essas linhas.
+"""
+
+from decimal import Decimal
+from sqlalchemy import and_
+from .. import db
+from ..models import (
+    Proposal, ProposalStatus, ProposalService, ProposalPrice,
+    TR, TRServiceItem, User, Organization
+)
+
+CENTS = Decimal("0.01")
+
+
+def money(value) -> float:
+    """Decimal exato arredondado a centavos, serializável em JSON"""
+    return float(Decimal(value or 0).quantize(CENTS))
+
+
+def _priced_lines(proc_id: int):
+    """Linhas com quantidade e preço dos itens do TR do processo"""
+    return db.session.query(
+        ProposalService.proposal_id.label("proposal_id"),
+        TRServiceItem.item_ordem,
+        TRServiceItem.descricao,
+        ProposalService.qty,
+        ProposalPrice.unit_price,
+    ).join(
+        ProposalPrice,
+        and_(
+            ProposalPrice.proposal_id == ProposalService.proposal_id,
+            ProposalPrice.service_item_id == ProposalService.service_item_id,
+        )
+    ).join(
+        TRServiceItem, TRServiceItem.id == ProposalService.service_item_id
+    ).join(
+        TR, and_(TR.id == TRServiceItem.tr_id, TR.procurement_id == proc_id)
+    )
+
+
+def load_comparison_rows(proc_id: int) -> list:
+    """
+    Propostas aprovadas tecnicamente com totais e itens, em duas consultas
+    fixas (independente do número de propostas e de itens).
+    """
+    proposals = db.session.query(
+        Proposal.id,
+        Proposal.technical_score,
+        Proposal.delivery_time,
+        Proposal.payment_conditions,
+        Proposal.warranty_terms,
+        Proposal.technical_review,
+        User.full_name.label("supplier"),
+        Organization.name.label("organization"),
+        Proposal.total_value.label("total_price"),
+    ).join(
+        User, User.id == Proposal.supplier_user_id
+    ).outerjoin(
+        Organization, Organization.id == User.org_id
+    ).filter(
+        Proposal.procurement_id == proc_id,
+        Proposal.status == ProposalStatus.APROVADA_TECNICAMENTE
+    ).order_by(Proposal.id).all()
+
+    if not proposals:
+        return []
+
+    items_by_proposal = {}
+    item_rows = _priced_lines(proc_id).join(
+        Proposal, Proposal.id == ProposalService.proposal_id
+    ).filter(
+        Proposal.status == ProposalStatus.APROVADA_TECNICAMENTE
+    ).order_by(ProposalService.proposal_id, TRServiceItem.item_ordem)
+    for row in item_rows:
+        qty = Decimal(row.qty)
+        unit_price = Decimal(row.unit_price)
+        items_by_proposal.setdefault(row.proposal_id, []).append({
+            "descricao": row.descricao,
+            "qty": float(qty),
+            "unit_price": float(unit_price),
+            "total": money(qty * unit_price)
+        })
+
+    comparison = []
+    for prop in proposals:
+        total_price = money(prop.total_price)
+        score = prop.technical_score or 0
+        comparison.append({
+            "proposal_id": prop.id,
+            "supplier": prop.supplier,
+            "organization": prop.organization,
+            "technical_score": score,
+            "total_price": total_price,
+            "delivery_time": prop.delivery_time,
+            "payment_conditions": prop.payment_conditions,
+            "warranty_terms": prop.warranty_terms,
+            "technical_review": prop.technical_review,
+            "items": items_by_proposal.get(prop.id, []),
+            "cost_benefit_score": score / total_price if total_price > 0 else 0
+        })
+    return comparison
+
+
+def build_ai_analysis(comparison: list) -> dict:
+    """Resumo (simulado) sobre as propostas já ordenadas por custo-benefício"""
+    best_price = min(comparison, key=lambda x: x["total_price"])
+    best_technical = max(comparison, key=lambda x: x["technical_score"])
+    best_overall = comparison[0] if comparison else None
+
+    # Calcular médias
+    avg_price = sum(p["total_price"] for p in comparison) / len(comparison)
+    avg_score = sum(p["technical_score"] for p in comparison) / len(comparison)
+
+    return {
+        "summary": {
+            "total_proposals": len(comparison),
+            "average_price": round(avg_price, 2),
+            "average_technical_score": round(avg_score, 1),
+            "price_range": {
+                "min": best_price["total_price"],
+                "max": max(comparison, key=lambda x: x["total_price"])["total_price"]
+            }
+        },
+        "best_options": {
+            "best_price": {
+                "supplier": best_price["supplier"],
+                "price": best_price["total_price"],
+                "savings": round(avg_price - best_price["total_price"], 2)
+            },
+            "best_technical": {
+                "supplier": best_technical["supplier"],
+                "score": best_technical["technical_score"],
+                "price": best_technical["total_price"]
+            },
+            "best_overall": {
+                "supplier": best_overall["supplier"],
+                "score": best_overall["technical_score"],
+                "price": best_overall["total_price"],
+                "reason": "Melhor equilíbrio entre qualidade técnica e preço"
+            } if best_overall else None
+        },
+        "recommendations": [
+            f"A proposta de {best_overall['supplier']} oferece o melhor custo-benefício" if best_overall else "",
+            f"Economia potencial de R$ {round(avg_price - best_price['total_price'], 2)} escolhendo o menor preço",
+            "Considere os prazos de entrega conforme urgência do projeto",
+            "Verifique as condições de pagamento e garantia antes da decisão final",
+            "Avalie se a diferença de qualidade técnica justifica diferenças de preço"
+        ],
+        "risk_analysis": {
+            "lowest_price_risk": "Baixo" if best_price["technical_score"] >= 70 else "Médio",
+            "delivery_risk": "Avaliar prazos individualmente",
+            "quality_risk": "Baixo" if avg_score >= 75 else "Médio"
+        }
+    }
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Compressão negociada (brotli/gzip) das respostas JSON da API.
+
+Só comprime corpos já montados (respostas em streaming, como as exportações,
+passam direto) e acima de ``COMPRESS_MIN_BYTES``.  O ETag vira fraco: o corpo
+comprimido não é byte a byte o mesmo, mas a representação é; o GET
+condicional compara ETags fracos (``contains_weak``).
+"""
+
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli é opcional em dev
+    brotli = None
+
+GZIP_LEVEL = 6
+# Qualidade 5: boa taxa sem o custo das qualidades altas (feitas para estáticos)
+BROTLI_QUALITY = 5
+
+
+def choose_encoding(accept_encodings) -> str:
+    """Melhor codificação aceita pelo cliente (br, gzip) ou None"""
+    options = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = accept_encodings.best_match(options)
+    if best and accept_encodings[best] > 0:
+        return best
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def init_compression(app, prefix: str = "/api") -> None:
+    min_bytes = app.config["COMPRESS_MIN_BYTES"]
+
+    @app.after_request
+    def compress_response(response):
+        if (not request.path.startswith(prefix)
+                or response.mimetype != "application/json"
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.is_streamed or response.direct_passthrough
+                or "Content-Encoding" in response.headers):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
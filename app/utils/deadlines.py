@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Encerramento automático dos processos no prazo de propostas.
+
+Um único greenlet mantém um heap (prazo, processo) dos processos ABERTO com
+``deadline_proposals`` e dorme até o prazo mais próximo; ao vencer, passa o
+processo para ANALISE_TECNICA e emite ``procurement.closed``.  Os prazos são
+recarregados do banco na subida e acompanham, após cada commit, as mudanças
+de status/prazo feitas pela sessão (abrir, fechar, alterar o prazo).
+
+O mapa processo -> prazo também responde em O(1), sem ir ao banco, se um
+processo já passou do prazo: as rotas de proposta recusam escritas tardias,
+inclusive no intervalo antes de o encerramento ser gravado.  Prazos vencidos
+continuam no mapa depois do encerramento; só saem quando o prazo é removido.
+"""
+
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from eventlet.queue import Empty, LightQueue
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from .. import db, socketio
+from ..models import Procurement, ProcurementStatus
+from .cache import data_versions
+
+logger = logging.getLogger(__name__)
+
+
+def as_utc_naive(value: datetime):
+    """Prazos são comparados como UTC sem fuso, como o resto do app (utcnow)"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_deadline(value, tz_name: str) -> datetime:
+    """
+    Prazo ISO 8601 como UTC sem fuso.  Sem offset, o horário é lido no fuso
+    do app (``APP_TIMEZONE``), não como UTC.  ValueError se inválido.
+    """
+    if not isinstance(value, str):
+        raise ValueError("prazo deve ser uma data ISO 8601")
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=ZoneInfo(tz_name))
+    return as_utc_naive(parsed)
+
+
+class DeadlineScheduler:
+    # Teto do sono do greenlet (protege contra ajustes do relógio)
+    MAX_SLEEP = 60.0
+    # Nova tentativa quando o encerramento falha (ex.: banco indisponível)
+    RETRY_DELAY = timedelta(seconds=5)
+
+    def __init__(self, clock=datetime.utcnow):
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._heap = []
+        self._deadlines = {}
+        self._wakeup = LightQueue()
+        self._app = None
+        self._greenlet = None
+        self.closed = 0
+        self.failures = 0
+
+    def schedule(self, proc_id: int, deadline: datetime) -> None:
+        deadline = as_utc_naive(deadline)
+        with self._lock:
+            if self._deadlines.get(proc_id) == deadline:
+                return
+            self._deadlines[proc_id] = deadline
+            heapq.heappush(self._heap, (deadline, proc_id))
+            earliest = self._heap[0] == (deadline, proc_id)
+        if earliest:
+            self._wakeup.put(None)
+
+    def cancel(self, proc_id: int) -> None:
+        # A entrada do heap fica e é descartada quando chegar ao topo
+        with self._lock:
+            self._deadlines.pop(proc_id, None)
+
+    def is_past_deadline(self, proc_id: int) -> bool:
+        deadline = self._deadlines.get(proc_id)
+        return deadline is not None and self._clock() >= deadline
+
+    def _pop_due(self):
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, proc_id = heapq.heappop(self._heap)
+                current = self._deadlines.get(proc_id)
+                # Entradas de prazos cancelados ou já remarcados para depois
+                if current is not None and deadline >= current:
+                    due.append(proc_id)
+            next_at = self._heap[0][0] if self._heap else None
+        return due, next_at
+
+    def _close(self, proc_id: int) -> None:
+        with self._app.app_context():
+            try:
+                proc = db.session.get(Procurement, proc_id)
+                deadline = as_utc_naive(proc.deadline_proposals) if proc else None
+                if proc is None or deadline is None:
+                    self.cancel(proc_id)
+                    return
+                if proc.status != ProcurementStatus.ABERTO:
+                    return  # já encerrado por outra via
+                if deadline > self._clock():
+                    self.schedule(proc_id, deadline)
+                    return
+
+                proc.status = ProcurementStatus.ANALISE_TECNICA
+                proc.updated_at = datetime.utcnow()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.failures += 1
+                logger.exception("Falha ao encerrar processo %s no prazo", proc_id)
+                with self._lock:
+                    heapq.heappush(self._heap, (self._clock() + self.RETRY_DELAY, proc_id))
+                return
+
+            data_versions.bump(proc.id)
+            self.closed += 1
+
+            socketio.emit("procurement.closed", {
+                "procurement_id": proc.id,
+                "title": proc.title,
+                "reason": "deadline"
+            }, to=f"proc:{proc.id}")
+
+    def _run(self):
+        while True:
+            due, next_at = self._pop_due()
+            for proc_id in due:
+                self._close(proc_id)
+            if due:
+                continue
+
+            timeout = self.MAX_SLEEP
+            if next_at is not None:
+                timeout = min(max((next_at - self._clock()).total_seconds(), 0), self.MAX_SLEEP)
+            try:
+                self._wakeup.get(timeout=timeout)
+            except Empty:
+                pass
+            while not self._wakeup.empty():
+                self._wakeup.get_nowait()
+
+    def start(self, app) -> None:
+        """Carrega os prazos pendentes e inicia o greenlet (uma vez)"""
+        self._app = app
+        pending = db.session.query(
+            Procurement.id, Procurement.deadline_proposals
+        ).filter(
+            Procurement.status == ProcurementStatus.ABERTO,
+            Procurement.deadline_proposals.isnot(None)
+        ).all()
+        for proc_id, deadline in pending:
+            self.schedule(proc_id, deadline)
+        if self._greenlet is None:
+            self._greenlet = socketio.start_background_task(self._run)
+
+    def stats(self) -> dict:
+        with self._lock:
+            upcoming = self._heap[0][0] if self._heap else None
+            return {
+                "tracked": len(self._deadlines),
+                "heap": len(self._heap),
+                "next_deadline": upcoming.isoformat() if upcoming else None,
+                "closed": self.closed,
+                "failures": self.failures,
+            }
+
+
+deadline_scheduler = DeadlineScheduler()
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_deadline_changes(session, flush_context, instances):
+    pending = session.info.setdefault("deadline_dirty", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Procurement):
+            state = inspect(obj)
+            if (state.attrs.status.history.has_changes()
+                    or state.attrs.deadline_proposals.history.has_changes()):
+                pending.append(obj)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _record_deadline_changes(session, flush_context):
+    pending = session.info.pop("deadline_dirty", None)
+    if pending:
+        changes = session.info.setdefault("deadline_changes", {})
+        for proc in pending:
+            changes[proc.id] = (proc.status, proc.deadline_proposals)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_deadline_changes(session):
+    # Só depois do commit: um rollback não pode agendar nem cancelar prazos
+    changes = session.info.pop("deadline_changes", None)
+    for proc_id, (status, deadline) in (changes or {}).items():
+        if deadline is None:
+            deadline_scheduler.cancel(proc_id)
+        elif status == ProcurementStatus.ABERTO:
+            deadline_scheduler.schedule(proc_id, deadline)
+        elif deadline_scheduler.is_past_deadline(proc_id):
+            pass  # encerrado no prazo: mantém a marca para recusar escritas tardias
+        else:
+            deadline_scheduler.cancel(proc_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deadline_changes(session):
+    session.info.pop("deadline_changes", None)
+    session.info.pop("deadline_dirty", None)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Exportação em streaming (CSV/XLSX) das matrizes item × fornecedor.
+
+As linhas saem de um gerador: a consulta é lida em lotes (``yield_per``,
+cursor do lado do servidor no Postgres) e cada linha do item é escrita e
+enviada assim que o último fornecedor daquele item chega, sem montar a
+matriz inteira em memória.  O XLSX é gerado com ``zipfile`` sobre um buffer
+que é esvaziado a cada bloco de linhas.
+"""
+
+import codecs
+import csv
+import io
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from flask import Response, stream_with_context
+from sqlalchemy import and_, select
+from .. import db
+from ..models import (
+    Proposal, ProposalService, ProposalPrice, TR, TRServiceItem, User, Organization
+)
+
+CENTS = Decimal("0.01")
+YIELD_PER = 1000
+# Linhas do XLSX acumuladas antes de enviar um bloco comprimido
+XLSX_FLUSH_ROWS = 200
+
+ITEM_HEADER = ["Item", "Código", "Descrição", "Unid.", "Qtde. TR"]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def load_export_proposals(proc_id: int, *criteria) -> list:
+    """Propostas (id, fornecedor, organização, total) na ordem das colunas"""
+    return db.session.query(
+        Proposal.id,
+        User.full_name.label("supplier"),
+        Organization.name.label("organization"),
+        Proposal.total_value,
+    ).join(
+        User, User.id == Proposal.supplier_user_id
+    ).outerjoin(
+        Organization, Organization.id == User.org_id
+    ).filter(
+        Proposal.procurement_id == proc_id, *criteria
+    ).order_by(Proposal.id).all()
+
+
+def supplier_label(proposal) -> str:
+    if proposal.organization:
+        return f"{proposal.supplier} ({proposal.organization})"
+    return proposal.supplier
+
+
+def iter_item_matrix(proc_id: int, proposal_ids: list, cells):
+    """
+    Uma linha por item do TR: colunas do item + ``cells(qty, unit_price)``
+    de cada proposta, na ordem de ``proposal_ids``.  Lê item × proposta em
+    uma consulta ordenada e agrupa linhas consecutivas do mesmo item.
+    """
+    stmt = select(
+        TRServiceItem.id,
+        TRServiceItem.item_ordem,
+        TRServiceItem.codigo,
+        TRServiceItem.descricao,
+        TRServiceItem.unid,
+        TRServiceItem.qtde,
+        Proposal.id.label("proposal_id"),
+        ProposalService.qty,
+        ProposalPrice.unit_price,
+    ).select_from(TRServiceItem).join(
+        TR, and_(TR.id == TRServiceItem.tr_id, TR.procurement_id == proc_id)
+    ).outerjoin(
+        Proposal, Proposal.id.in_(proposal_ids or [-1])
+    ).outerjoin(
+        ProposalService,
+        and_(
+            ProposalService.proposal_id == Proposal.id,
+            ProposalService.service_item_id == TRServiceItem.id,
+        )
+    ).outerjoin(
+        ProposalPrice,
+        and_(
+            ProposalPrice.proposal_id == Proposal.id,
+            ProposalPrice.service_item_id == TRServiceItem.id,
+        )
+    ).order_by(
+        TRServiceItem.item_ordem, TRServiceItem.id, Proposal.id
+    ).execution_options(yield_per=YIELD_PER)
+
+    position = {pid: index for index, pid in enumerate(proposal_ids)}
+    empty = cells(None, None)
+    current_id = None
+    row = None
+    for line in db.session.execute(stmt):
+        if line.id != current_id:
+            if row is not None:
+                yield row
+            current_id = line.id
+            row = [line.item_ordem, line.codigo, line.descricao, line.unid, line.qtde]
+            row.extend(value for _ in proposal_ids for value in empty)
+        if line.proposal_id is not None:
+            width = len(empty)
+            start = len(ITEM_HEADER) + position[line.proposal_id] * width
+            row[start:start + width] = cells(line.qty, line.unit_price)
+    if row is not None:
+        yield row
+
+
+def cents(value) -> Decimal:
+    return Decimal(value or 0).quantize(CENTS)
+
+
+def line_total(qty, unit_price):
+    if qty is None or unit_price is None:
+        return None
+    return cents(Decimal(qty) * Decimal(unit_price))
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    return value
+
+
+def stream_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM: o Excel reconhece o arquivo como UTF-8
+    yield codecs.BOM_UTF8
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Destino do zipfile: guarda os bytes escritos até o próximo ``drain``"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_workbook(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31], {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _xlsx_cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f"<c><v>{_csv_value(value)}</v></c>"
+    text = _XML_ILLEGAL.sub("", str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values) -> str:
+    return "<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>"
+
+
+def stream_xlsx(header, rows, sheet_name: str = "Planilha"):
+    sink = _ChunkWriter()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        archive.writestr("xl/workbook.xml", _xlsx_workbook(sheet_name))
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            sheet.write(_xlsx_row(header).encode("utf-8"))
+            yield sink.drain()
+
+            pending = []
+            for row in rows:
+                pending.append(_xlsx_row(row))
+                if len(pending) >= XLSX_FLUSH_ROWS:
+                    sheet.write("".join(pending).encode("utf-8"))
+                    pending.clear()
+                    yield sink.drain()
+            if pending:
+                sheet.write("".join(pending).encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+def export_response(fmt: str, filename: str, header, rows, sheet_name: str = "Planilha") -> Response:
+    """Resposta em streaming; ``rows`` é consumido só durante o envio"""
+    if fmt == "xlsx":
+        body = stream_xlsx(header, rows, sheet_name)
+    else:
+        body = stream_csv(header, rows)
+    response = Response(stream_with_context(body), content_type=EXPORT_FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    response.headers["Cache-Control"] = "private, no-store"
+    return response
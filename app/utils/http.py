@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+GET condicional (ETag / If-None-Match) para endpoints de detalhe
+"""
+
+import hashlib
+import uuid
+from flask import request, jsonify, current_app
+
+# Muda a cada boot: as versões de dados vivem em memória e recomeçam do zero
+BOOT_ID = uuid.uuid4().hex
+
+
+def make_etag(*parts) -> str:
+    raw = "|".join("" if p is None else str(p) for p in (BOOT_ID,) + parts)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional_json(etag_parts, build):
+    """
+    Responde 304 sem chamar ``build`` quando o cliente já tem a versão
+    indicada por ``etag_parts``; caso contrário serializa ``build()``.
+
+    ``etag_parts`` deve incluir tudo que muda o corpo (updated_at, versão
+    dos dados, role/usuário quando a visão depende de quem pede).  A
+    resposta é ``private`` e revalidada a cada uso, variando por token.
+    A comparação é fraca: a compressão devolve o mesmo ETag como W/"...".
+    """
+    etag = make_etag(*etag_parts)
+    if request.if_none_match.star_tag or request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Authorization")
+    return response
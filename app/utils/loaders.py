@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Carregador compartilhado do processo com TR, organização e contagens em
+uma única consulta (JOINs + subconsultas escalares correlacionadas).
+
+O resultado é memorizado por requisição, então os blueprints de processos,
+TR e propostas podem pedir o mesmo processo várias vezes sem reconsultar.
+"""
+
+from flask import g, abort
+from sqlalchemy import func, select, exists, and_, or_
+from .. import db
+from ..models import Procurement, Organization, TR, Proposal, Invite, SupplierVisibility
+from .suppliers import PUBLIC_STATUSES
+
+
+class ProcurementDetail:
+    """Processo + resumo do TR + nome da organização + contagens"""
+    __slots__ = (
+        "procurement", "org_name", "tr_id", "tr_status", "tr_created_by",
+        "tr_submitted_at", "tr_approved_at", "tr_updated_at",
+        "proposals_count", "invites_count", "supplier_visible",
+    )
+
+    def __init__(self, row):
+        self.procurement = row.Procurement
+        self.org_name = row.org_name
+        self.tr_id = row.tr_id
+        self.tr_status = row.tr_status
+        self.tr_created_by = row.tr_created_by
+        self.tr_submitted_at = row.tr_submitted_at
+        self.tr_approved_at = row.tr_approved_at
+        self.tr_updated_at = row.tr_updated_at
+        self.proposals_count = row.proposals_count
+        self.invites_count = row.invites_count
+        self.supplier_visible = bool(row.supplier_visible)
+
+
+def load_procurement(proc_id: int, supplier_id: int = None):
+    """
+    Retorna ``ProcurementDetail`` ou None.  ``supplier_id`` preenche
+    ``supplier_visible`` (processo visível para esse fornecedor).
+    """
+    memo = g.setdefault("_procurement_details", {})
+    key = (proc_id, supplier_id)
+    if key in memo:
+        return memo[key]
+
+    proposals_count = select(func.count(Proposal.id)).where(
+        Proposal.procurement_id == Procurement.id
+    ).correlate(Procurement).scalar_subquery()
+
+    invites_count = select(func.count(Invite.id)).where(
+        Invite.procurement_id == Procurement.id
+    ).correlate(Procurement).scalar_subquery()
+
+    if supplier_id:
+        # Status público ou convite (supplier_visibility só guarda convites)
+        supplier_visible = or_(
+            Procurement.status.in_(PUBLIC_STATUSES),
+            exists().where(and_(
+                SupplierVisibility.user_id == supplier_id,
+                SupplierVisibility.procurement_id == Procurement.id
+            )).correlate(Procurement),
+        )
+    else:
+        supplier_visible = db.literal(False)
+
+    row = db.session.query(
+        Procurement,
+        Organization.name.label("org_name"),
+        TR.id.label("tr_id"),
+        TR.status.label("tr_status"),
+        TR.created_by.label("tr_created_by"),
+        TR.submitted_at.label("tr_submitted_at"),
+        TR.approved_at.label("tr_approved_at"),
+        TR.updated_at.label("tr_updated_at"),
+        proposals_count.label("proposals_count"),
+        invites_count.label("invites_count"),
+        supplier_visible.label("supplier_visible"),
+    ).outerjoin(
+        Organization, Organization.id == Procurement.org_id
+    ).outerjoin(
+        TR, TR.procurement_id == Procurement.id
+    ).filter(
+        Procurement.id == proc_id
+    ).first()
+
+    detail = ProcurementDetail(row) if row else None
+    memo[key] = detail
+    return detail
+
+
+def load_procurement_or_404(proc_id: int, supplier_id: int = None) -> ProcurementDetail:
+    detail = load_procurement(proc_id, supplier_id)
+    if detail is None:
+        abort(404)
+    return detail
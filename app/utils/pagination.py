@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Paginação por cursor (keyset) para listagens ordenadas por (created_at, id)
+"""
+
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Retorna (created_at, id); levanta ValueError se o cursor for inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as exc:
+        raise ValueError("cursor inválido") from exc
+
+
+def parse_limit(value, default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        raise ValueError("limit inválido")
+    return max(1, min(limit, maximum))
+
+
+def keyset_page(query, created_col, id_col, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                descending: bool = True):
+    """
+    Aplica ordenação estável e o filtro de cursor à query e busca uma página.
+    Retorna (linhas, próximo_cursor); próximo_cursor é None na última página.
+    """
+    key = tuple_(created_col, id_col)
+    if cursor:
+        after = decode_cursor(cursor)
+        query = query.filter(key < after if descending else key > after)
+
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col.asc(), id_col.asc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
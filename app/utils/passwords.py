@@ -1,12 +1,109 @@
 # -*- coding: utf-8 -*-
+import threading
+import time
 from passlib.hash import bcrypt
 from typing import Optional
 
-def hash_password(password: str) -> str:
-    return bcrypt.hash(password)
+try:
+    from eventlet import patcher, tpool
+except ImportError:  # pragma: no cover - eventlet é opcional em dev
+    patcher = tpool = None
 
-def verify_password(password: str, password_hash: str) -> bool:
+
+class HashingBusy(Exception):
+    """Fila do executor de hashing está cheia; o cliente deve tentar novamente"""
+
+
+class HashingExecutor:
+    """
+    Executa bcrypt fora do hub do eventlet, em threads nativas (tpool).
+
+    O número de hashes simultâneos é limitado por ``workers`` e a fila de
+    espera por ``max_pending``; acima disso a chamada é recusada com
+    ``HashingBusy`` em vez de acumular greenlets bloqueados.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def configure(self, workers: int = None, max_pending: int = None):
+        if workers is not None and workers != self.workers:
+            self.workers = workers
+            self._slots = threading.BoundedSemaphore(workers)
+            if tpool is not None:
+                tpool.set_num_threads(max(workers, 1))
+        if max_pending is not None:
+            self.max_pending = max_pending
+
+    @staticmethod
+    def _offload_available() -> bool:
+        # Sem monkey patch (dev/testes) não há hub para liberar: executa inline
+        return tpool is not None and patcher.is_monkey_patched("thread")
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingBusy()
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        try:
+            with self._slots:
+                started = time.monotonic()
+                if self._offload_available():
+                    result = tpool.execute(fn, *args)
+                else:
+                    result = fn(*args)
+                elapsed = time.monotonic() - started
+            with self._lock:
+                self.completed += 1
+                self.busy_seconds += elapsed
+            return result
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "queued": max(self.pending - self.workers, 0),
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.busy_seconds * 1000 / self.completed, 1) if self.completed else 0.0,
+                "offloaded": self._offload_available(),
+            }
+
+
+hashing_executor = HashingExecutor()
+
+# O passlib carrega o backend do bcrypt sob demanda usando locks do módulo
+# threading (que viram locks verdes após o monkey patch).  Carregar aqui, na
+# thread principal, evita que isso aconteça dentro de uma thread nativa do tpool.
+bcrypt.get_backend()
+
+
+def _verify(password: str, password_hash: str) -> bool:
     try:
         return bcrypt.verify(password, password_hash)
     except Exception:
         return False
+
+
+def hash_password(password: str) -> str:
+    return hashing_executor.run(bcrypt.hash, password)
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return hashing_executor.run(_verify, password, password_hash)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Gravação em lote das quantidades e preços de uma proposta.
+
+Os ids enviados são validados contra o TR com uma consulta (conjunto de ids
+do TR) e as linhas vão ao banco com ``INSERT ... ON CONFLICT DO UPDATE`` em
+executemany, na transação corrente.  Como a escrita não passa pela unidade
+de trabalho do ORM, os totais da proposta são recalculados aqui mesmo com
+``refresh_proposal_totals``.
+"""
+
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from ..models import Proposal, ProposalService, ProposalPrice, ProposalStatus, TRServiceItem
+from .totals import refresh_proposal_totals
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+QTY_PLACES = Decimal("0.001")
+PRICE_PLACES = Decimal("0.01")
+
+
+def tr_item_ids(session, tr_id: int) -> set:
+    return set(session.scalars(select(TRServiceItem.id).where(TRServiceItem.tr_id == tr_id)))
+
+
+def get_or_create_draft(session, proc_id: int, supplier_id: int) -> Proposal:
+    """Proposta do fornecedor no processo; cria o rascunho (flush, sem commit)"""
+    proposal = session.scalars(
+        select(Proposal).where(Proposal.procurement_id == proc_id, Proposal.supplier_user_id == supplier_id)
+    ).first()
+    if proposal is None:
+        proposal = Proposal(procurement_id=proc_id, supplier_user_id=supplier_id, status=ProposalStatus.RASCUNHO)
+        session.add(proposal)
+        session.flush()
+    return proposal
+
+
+def parse_amount(value, places: Decimal, field: str, sid) -> Decimal:
+    try:
+        number = Decimal(str(value))
+        # NaN (aceito pelo json do Python) passa pelo quantize e falha na comparação
+        if not number.is_finite():
+            raise ValueError
+        number = number.quantize(places)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError(f"{field} inválido para service_item_id {sid}")
+    if number < 0:
+        raise ValueError(f"{field} negativo para service_item_id {sid}")
+    return number
+
+
+def collect_lines(payload, valid_ids: set, field: str, default=None, notes: bool = False):
+    """
+    Linhas ``{service_item_id, field[, technical_notes]}`` por item (a última
+    ocorrência de um id vence) e a lista de ids que não são do TR.
+    ValueError se o payload ou um valor for inválido.
+    """
+    if not isinstance(payload, list):
+        raise ValueError("itens devem ser enviados em uma lista")
+    places = PRICE_PLACES if field == "unit_price" else QTY_PLACES
+    lines = {}
+    invalid = []
+    for row in payload:
+        if not isinstance(row, dict):
+            raise ValueError("cada item deve ser um objeto")
+        sid = row.get("service_item_id")
+        # bool é int em Python (True == 1); listas/objetos nem são hasheáveis
+        if isinstance(sid, bool) or not isinstance(sid, int):
+            raise ValueError("service_item_id inválido")
+        if sid not in valid_ids:
+            invalid.append(sid)
+            continue
+        line = {"service_item_id": sid, field: parse_amount(row.get(field, default), places, field, sid)}
+        if notes:
+            line["technical_notes"] = row.get("technical_notes", "")
+        lines[sid] = line
+    return list(lines.values()), invalid
+
+
+def bulk_upsert(session, model, rows: list, update_columns) -> None:
+    """INSERT ... ON CONFLICT (chave primária) DO UPDATE das colunas indicadas"""
+    if not rows:
+        return
+    make_insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if make_insert is None:
+        # Outros bancos: merge pelo ORM (uma consulta por linha)
+        for row in rows:
+            session.merge(model(**row))
+        session.flush()
+        return
+    table = model.__table__
+    stmt = make_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+    session.execute(stmt, rows)
+
+
+def save_proposal_lines(session, proposal, services=None, prices=None) -> None:
+    """Grava quantidades/preços já validados da proposta e atualiza os totais"""
+    if services:
+        rows = [dict(line, proposal_id=proposal.id) for line in services]
+        bulk_upsert(session, ProposalService, rows, [c for c in rows[0] if c not in ("proposal_id", "service_item_id")])
+    if prices:
+        rows = [dict(line, proposal_id=proposal.id) for line in prices]
+        bulk_upsert(session, ProposalPrice, rows, ["unit_price"])
+    if services or prices:
+        refresh_proposal_totals(session, [proposal.id])
+        # Coleções carregadas ficaram desatualizadas pela escrita em lote
+        session.expire(proposal, ["service_items", "prices"])
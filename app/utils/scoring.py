@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Classificação ponderada das propostas e simulação de cenários de pesos.
+
+Cada cenário tem pesos de preço/técnica, normalização e cortes (nota técnica
+mínima, preço máximo).  ``evaluate`` calcula todos os cenários de uma vez
+sobre os vetores de notas e totais (matriz cenário × proposta), e
+``rank_stability`` resume o quanto a classificação muda entre eles.  O
+cenário salvo do processo (``ScoringConfig``) é o usado no comparativo.
+"""
+
+import warnings
+
+import numpy as np
+from .. import db
+from ..models import Proposal, ProposalStatus, ScoringConfig, User
+
+NORMALIZATIONS = ("min_ratio", "min_max")
+DEFAULT_SCENARIO = {
+    "price_weight": 0.5,
+    "technical_weight": 0.5,
+    "normalization": "min_ratio",
+    "min_technical_score": None,
+    "max_price": None,
+}
+MAX_SCENARIOS = 1000
+# ScoringConfig.max_price é Numeric(18, 2): até 16 dígitos inteiros
+MAX_PRICE_LIMIT = 10 ** 16
+DEFAULT_TOP_K = 3
+MAX_TOP_K = 20
+
+
+def _number(value, field: str, allow_none: bool = False):
+    if value is None and allow_none:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{field} deve ser numérico")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} deve ser numérico")
+    if not np.isfinite(number) or number < 0:
+        raise ValueError(f"{field} deve ser um número não negativo")
+    return number
+
+
+def parse_scenario(data, base: dict = None) -> dict:
+    """Cenário validado; campos ausentes vêm de ``base``.  ValueError se inválido"""
+    if not isinstance(data, dict):
+        raise ValueError("cenário deve ser um objeto")
+    scenario = dict(base or DEFAULT_SCENARIO)
+    for field in ("price_weight", "technical_weight"):
+        if field in data:
+            scenario[field] = _number(data[field], field)
+    for field in ("min_technical_score", "max_price"):
+        if field in data:
+            scenario[field] = _number(data[field], field, allow_none=True)
+    if scenario["max_price"] is not None:
+        if scenario["max_price"] >= MAX_PRICE_LIMIT:
+            raise ValueError("max_price deve ser menor que 10^16")
+        # Mesmo valor que será gravado (centavos)
+        scenario["max_price"] = round(scenario["max_price"], 2)
+    if "normalization" in data:
+        scenario["normalization"] = data["normalization"]
+    if scenario["normalization"] not in NORMALIZATIONS:
+        raise ValueError(f"normalization deve ser {' ou '.join(NORMALIZATIONS)}")
+    if scenario["price_weight"] + scenario["technical_weight"] <= 0:
+        raise ValueError("a soma dos pesos deve ser positiva")
+    return scenario
+
+
+def sweep_scenarios(sweep, base: dict) -> list:
+    """``{"steps": n}``: peso de preço de 0 a 1 em n passos (técnica = 1 - preço)"""
+    if not isinstance(sweep, dict):
+        raise ValueError("sweep deve ser um objeto")
+    steps = sweep.get("steps")
+    if not isinstance(steps, int) or isinstance(steps, bool) or not 2 <= steps <= MAX_SCENARIOS:
+        raise ValueError(f"sweep.steps deve ser um inteiro entre 2 e {MAX_SCENARIOS}")
+    return [
+        dict(base, price_weight=weight, technical_weight=round(1 - weight, 10))
+        for weight in np.round(np.linspace(0, 1, steps), 10).tolist()
+    ]
+
+
+def parse_top_k(value) -> int:
+    """Tamanho do top-k (padrão ``DEFAULT_TOP_K``); ValueError fora de 1..MAX_TOP_K"""
+    if value is None:
+        return DEFAULT_TOP_K
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= MAX_TOP_K:
+        raise ValueError(f"top_k deve ser um inteiro entre 1 e {MAX_TOP_K}")
+    return value
+
+
+def config_scenario(config) -> dict:
+    """Cenário de um ScoringConfig (ou o padrão se não houver)"""
+    if config is None:
+        return dict(DEFAULT_SCENARIO)
+    return {
+        "price_weight": config.price_weight,
+        "technical_weight": config.technical_weight,
+        "normalization": config.normalization,
+        "min_technical_score": config.min_technical_score,
+        "max_price": float(config.max_price) if config.max_price is not None else None,
+    }
+
+
+def load_scoring_config(proc_id: int):
+    return db.session.get(ScoringConfig, proc_id)
+
+
+def load_scoring_inputs(proc_id: int) -> list:
+    """Propostas aprovadas tecnicamente (nota e total), do menor total ao maior"""
+    return db.session.query(
+        Proposal.id,
+        User.full_name.label("supplier"),
+        Proposal.technical_score,
+        Proposal.total_value,
+    ).join(
+        User, User.id == Proposal.supplier_user_id
+    ).filter(
+        Proposal.procurement_id == proc_id,
+        Proposal.status == ProposalStatus.APROVADA_TECNICAMENTE
+    ).order_by(Proposal.total_value, Proposal.id).all()
+
+
+def evaluate(scores, totals, scenarios: list) -> dict:
+    """
+    Notas compostas (cenário × proposta) em uma passada.  Empates ficam com a
+    ordem de entrada (passe as propostas do menor total ao maior).  Propostas
+    cortadas têm nota -inf e posição 0.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    totals = np.asarray(totals, dtype=np.float64)
+    n_scenarios, n_props = len(scenarios), len(scores)
+
+    price_w = np.array([s["price_weight"] for s in scenarios], dtype=np.float64)
+    tech_w = np.array([s["technical_weight"] for s in scenarios], dtype=np.float64)
+    weight_sum = price_w + tech_w
+    price_w, tech_w = price_w / weight_sum, tech_w / weight_sum
+    min_tech = np.array([
+        -np.inf if s["min_technical_score"] is None else s["min_technical_score"] for s in scenarios
+    ])
+    max_price = np.array([np.inf if s["max_price"] is None else s["max_price"] for s in scenarios])
+    min_max = np.array([s["normalization"] == "min_max" for s in scenarios])[:, None]
+
+    eligible = (
+        (scores[None, :] >= min_tech[:, None])
+        & (totals[None, :] <= max_price[:, None])
+        & (totals > 0)[None, :]
+    )
+    # Extremos entre as elegíveis de cada cenário
+    price_low = np.where(eligible, totals, np.inf).min(axis=1, initial=np.inf)[:, None]
+    price_high = np.where(eligible, totals, -np.inf).max(axis=1, initial=-np.inf)[:, None]
+    tech_low = np.where(eligible, scores, np.inf).min(axis=1, initial=np.inf)[:, None]
+    tech_high = np.where(eligible, scores, -np.inf).max(axis=1, initial=-np.inf)[:, None]
+
+    with np.errstate(all="ignore"):
+        price_span = price_high - price_low
+        tech_span = tech_high - tech_low
+        price_norm = np.where(
+            min_max,
+            np.where(price_span > 0, (price_high - totals) / price_span, 1.0),
+            price_low / totals,
+        )
+        tech_norm = np.where(
+            min_max,
+            np.where(tech_span > 0, (scores - tech_low) / tech_span, 1.0),
+            np.where(tech_high > 0, scores / tech_high, 0.0),
+        )
+        composite = price_w[:, None] * price_norm + tech_w[:, None] * tech_norm
+    composite = np.where(eligible, composite, -np.inf)
+
+    order = np.argsort(-composite, axis=1, kind="stable")
+    ranks = np.empty((n_scenarios, n_props), dtype=np.int64)
+    ranks[np.arange(n_scenarios)[:, None], order] = np.arange(1, n_props + 1)
+    ranks = np.where(eligible, ranks, 0)
+    return {"composite": composite, "eligible": eligible, "order": order, "ranks": ranks}
+
+
+def rank_stability(result: dict, baseline: dict, top_k: int) -> dict:
+    """
+    Por proposta: fração de cenários em 1º lugar, posição média/melhor/pior e
+    desvio; no geral: vencedores distintos, concordância com o vencedor do
+    cenário base e sobreposição média do top-k com o do cenário base.
+    """
+    ranks = result["ranks"].astype(np.float64)
+    eligible = result["eligible"]
+    has_winner = eligible.any(axis=1)
+    winners = np.where(has_winner, result["order"][:, 0], -1)
+
+    ranked = np.where(eligible, ranks, np.nan)
+    # Proposta nunca elegível: média/mínimo de fatia vazia viram NaN (sem aviso)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        per_proposal = {
+            "first_place_share": (ranks == 1).mean(axis=0),
+            "eligible_share": eligible.mean(axis=0),
+            "mean_rank": np.nanmean(ranked, axis=0),
+            "best_rank": np.nanmin(ranked, axis=0),
+            "worst_rank": np.nanmax(ranked, axis=0),
+            "rank_std": np.nanstd(ranked, axis=0),
+        }
+
+    base_ranks = baseline["ranks"][0]
+    base_eligible = baseline["eligible"][0]
+    base_winner = int(baseline["order"][0, 0]) if base_eligible.any() else -1
+    in_top = eligible & (result["ranks"] <= top_k)
+    base_top = base_eligible & (base_ranks <= top_k)
+    overlap = (in_top & base_top[None, :]).sum(axis=1) / max(min(top_k, int(base_top.sum())), 1)
+
+    return {
+        "per_proposal": per_proposal,
+        "distinct_winners": int(np.unique(winners[has_winner]).size),
+        "baseline_winner_share": float((winners == base_winner).mean()) if base_winner >= 0 else 0.0,
+        "mean_top_k_overlap": float(overlap.mean()) if len(overlap) else 0.0,
+    }
+
+
+def _round(value, digits: int = 4):
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def build_scenarios_response(proposals, scenarios: list, result: dict, stability: dict,
+                             baseline_scenario: dict, top_k: int) -> dict:
+    proposal_ids = [p.id for p in proposals]
+    top_orders = result["order"][:, :top_k].tolist()
+    top_scores = np.take_along_axis(result["composite"], result["order"][:, :top_k], axis=1).tolist()
+    top_eligible = np.take_along_axis(result["eligible"], result["order"][:, :top_k], axis=1).tolist()
+
+    per_proposal = {key: values.tolist() for key, values in stability["per_proposal"].items()}
+    return {
+        "baseline": baseline_scenario,
+        "proposals": [{
+            "proposal_id": p.id,
+            "supplier": p.supplier,
+            "technical_score": p.technical_score or 0,
+            "total_price": round(float(p.total_value), 2),
+            "first_place_share": _round(per_proposal["first_place_share"][col]),
+            "eligible_share": _round(per_proposal["eligible_share"][col]),
+            "mean_rank": _round(per_proposal["mean_rank"][col], 2),
+            "best_rank": _round(per_proposal["best_rank"][col], 0),
+            "worst_rank": _round(per_proposal["worst_rank"][col], 0),
+            "rank_std": _round(per_proposal["rank_std"][col]),
+        } for col, p in enumerate(proposals)],
+        "scenarios": [dict(scenario, top=[
+            {"proposal_id": proposal_ids[col], "score": round(score, 4)}
+            for col, score, ok in zip(order, row_scores, row_eligible) if ok
+        ]) for scenario, order, row_scores, row_eligible in zip(scenarios, top_orders, top_scores, top_eligible)],
+        "stability": {
+            "scenarios": len(scenarios),
+            "top_k": top_k,
+            "distinct_winners": stability["distinct_winners"],
+            "baseline_winner_share": round(stability["baseline_winner_share"], 4),
+            "mean_top_k_overlap": round(stability["mean_top_k_overlap"], 4),
+        },
+    }
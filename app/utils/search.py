@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+Busca textual em processos e TRs.
+
+O texto pesquisável de cada processo fica em ``search_documents`` e é
+regravado no mesmo flush em que o processo (título/descrição) ou o TR é
+salvo.  A consulta nunca lê as colunas de texto originais, só o índice do
+backend escolhido em ``SEARCH_BACKEND``:
+
+- ``postgres``: coluna tsvector gerada (título peso A, corpo peso B) com
+  índice GIN, ``websearch_to_tsquery`` e ``ts_rank_cd``;
+- ``sqlite``: tabela FTS5 ``search_fts`` ranqueada por bm25;
+- ``memory``: índice invertido no processo (testes, ou SQLite sem FTS5).
+
+``auto`` escolhe pelo dialeto do banco.
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from datetime import datetime
+from functools import reduce
+
+from sqlalchemy import column, delete, event, func, insert, inspect, literal, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from .. import db
+from ..models import Procurement, SearchDocument, TR
+
+TS_CONFIG = "portuguese"
+
+# Campos do TR que entram no índice (pareceres internos da aprovação ficam de fora)
+TR_SEARCH_FIELDS = (
+    "objetivo", "situacao_atual", "descricao_servicos", "local_horario_trabalhos",
+    "prazo_execucao", "local_canteiro", "atividades_preliminares", "garantia",
+    "matriz_responsabilidades", "descricoes_gerais", "normas_observar",
+    "regras_responsabilidades", "relacoes_contratada_fiscalizacao", "sst",
+    "credenciamento_observacoes", "anexos_info", "credenciamento", "observacoes",
+    "prazo_maximo_execucao",
+)
+PROCUREMENT_SEARCH_FIELDS = ("title", "description")
+
+_documents = SearchDocument.__table__
+_procurements = Procurement.__table__
+_trs = TR.__table__
+_fts = table("search_fts", column("rowid"), column("title"), column("body"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(value: str) -> list:
+    """Termos minúsculos e sem acento (mesma normalização do FTS5 unicode61)"""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(stripped.lower())
+
+
+def _document_select(*criteria):
+    parts = [func.coalesce(_procurements.c.description, "")]
+    parts += [func.coalesce(_trs.c[name], "") for name in TR_SEARCH_FIELDS]
+    body = reduce(lambda acc, part: acc + " " + part, parts)
+    return select(
+        _procurements.c.id,
+        func.coalesce(_procurements.c.title, ""),
+        body,
+        literal(datetime.utcnow()),
+    ).select_from(
+        _procurements.outerjoin(_trs, _trs.c.procurement_id == _procurements.c.id)
+    ).where(*criteria)
+
+
+def _write_documents(conn, *criteria):
+    conn.execute(insert(_documents).from_select(
+        ["procurement_id", "title", "body", "updated_at"], _document_select(*criteria)
+    ))
+
+
+def refresh_documents(session, proc_ids) -> None:
+    """Regrava os documentos dos processos indicados (delete + insert/select)"""
+    proc_ids = {pid for pid in proc_ids if pid is not None}
+    if not proc_ids:
+        return
+    conn = session.connection()
+    conn.execute(delete(_documents).where(_documents.c.procurement_id.in_(proc_ids)))
+    _write_documents(conn, _procurements.c.id.in_(proc_ids))
+    search_index.documents_changed(conn, proc_ids)
+    session.info.setdefault("search_changed", set()).update(proc_ids)
+
+
+def rebuild_search_index(session) -> int:
+    """Recria todos os documentos e o índice do backend; retorna quantos"""
+    conn = session.connection()
+    conn.execute(delete(_documents))
+    _write_documents(conn)
+    search_index.rebuild(conn)
+    return conn.execute(select(func.count()).select_from(_documents)).scalar()
+
+
+class PostgresSearch:
+    """tsvector gerado + GIN; o ranking usa apenas a coluna indexada"""
+    name = "postgres"
+
+    def setup(self, conn):
+        conn.execute(text(f"""
+            ALTER TABLE search_documents ADD COLUMN IF NOT EXISTS tsv tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('{TS_CONFIG}', coalesce(body, '')), 'B')
+            ) STORED
+        """))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)"
+        ))
+        return self
+
+    def documents_changed(self, conn, proc_ids):
+        pass  # coluna gerada: o Postgres recalcula no próprio INSERT
+
+    def committed(self, proc_ids):
+        pass
+
+    def rebuild(self, conn):
+        pass
+
+    def search(self, q, query, limit):
+        tsv = literal_column("search_documents.tsv")
+        tsquery = func.websearch_to_tsquery(TS_CONFIG, q)
+        rank = func.ts_rank_cd(tsv, tsquery)
+        rows = query.join(
+            SearchDocument, SearchDocument.procurement_id == Procurement.id
+        ).filter(
+            tsv.op("@@")(tsquery)
+        ).add_columns(
+            rank.label("search_rank")
+        ).order_by(rank.desc(), Procurement.id.desc()).limit(limit).all()
+        return [(row, float(row.search_rank)) for row in rows]
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+class SqliteFtsSearch:
+    """Tabela FTS5 espelhando search_documents (rowid = procurement_id)"""
+    name = "sqlite"
+
+    # Pesos do bm25 por coluna: título vale mais que o corpo
+    WEIGHTS = (10.0, 1.0)
+
+    def setup(self, conn):
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'"
+        )).first()
+        if not exists:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE search_fts USING fts5("
+                "title, body, tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            self.rebuild(conn)
+        return self
+
+    def documents_changed(self, conn, proc_ids):
+        conn.execute(delete(_fts).where(_fts.c.rowid.in_(proc_ids)))
+        self._copy(conn, _documents.c.procurement_id.in_(proc_ids))
+
+    def committed(self, proc_ids):
+        pass
+
+    def rebuild(self, conn):
+        conn.execute(delete(_fts))
+        self._copy(conn)
+
+    def _copy(self, conn, *criteria):
+        conn.execute(insert(_fts).from_select(
+            ["rowid", "title", "body"],
+            select(_documents.c.procurement_id, _documents.c.title, _documents.c.body).where(*criteria)
+        ))
+
+    @staticmethod
+    def match_expression(q):
+        # Termos entre aspas (sem sintaxe FTS do usuário); o último vale como prefixo
+        terms = tokenize(q)
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def search(self, q, query, limit):
+        expression = self.match_expression(q)
+        if expression is None:
+            return []
+        fts = literal_column("search_fts")
+        rank = func.bm25(fts, *self.WEIGHTS)
+        rows = query.join(
+            _fts, _fts.c.rowid == Procurement.id
+        ).filter(
+            fts.op("MATCH")(expression)
+        ).add_columns(
+            rank.label("search_rank")
+        ).order_by(rank, Procurement.id.desc()).limit(limit).all()
+        # bm25 é "menor é melhor"; expõe como relevância positiva
+        return [(row, -float(row.search_rank)) for row in rows]
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+class MemorySearch:
+    """
+    Índice invertido em memória (termo -> {processo: peso}), carregado de
+    ``search_documents`` na primeira busca.  Processos alterados são
+    reindexados na busca seguinte ao commit.
+    """
+    name = "memory"
+
+    TITLE_WEIGHT = 3
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._loaded = False
+        self._dirty = set()
+
+    def setup(self, conn):
+        return self
+
+    def documents_changed(self, conn, proc_ids):
+        pass  # visível só após o commit (ver ``committed``)
+
+    def committed(self, proc_ids):
+        with self._lock:
+            self._dirty.update(proc_ids)
+
+    def rebuild(self, conn):
+        with self._lock:
+            self._loaded = False
+            self._dirty.clear()
+
+    def _remove(self, proc_id):
+        for term in self._doc_terms.pop(proc_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(proc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _add(self, proc_id, title, body):
+        weights = defaultdict(int)
+        for term in tokenize(title):
+            weights[term] += self.TITLE_WEIGHT
+        for term in tokenize(body):
+            weights[term] += 1
+        for term, weight in weights.items():
+            self._postings[term][proc_id] = weight
+        self._doc_terms[proc_id] = set(weights)
+
+    def _sync(self):
+        with self._lock:
+            if not self._loaded:
+                rows = db.session.execute(
+                    select(_documents.c.procurement_id, _documents.c.title, _documents.c.body)
+                ).all()
+                self._postings.clear()
+                self._doc_terms.clear()
+                self._dirty.clear()
+                for row in rows:
+                    self._add(*row)
+                self._loaded = True
+            elif self._dirty:
+                proc_ids, self._dirty = self._dirty, set()
+                rows = db.session.execute(
+                    select(_documents.c.procurement_id, _documents.c.title, _documents.c.body)
+                    .where(_documents.c.procurement_id.in_(proc_ids))
+                ).all()
+                for proc_id in proc_ids:
+                    self._remove(proc_id)
+                for row in rows:
+                    self._add(*row)
+
+    def _matches(self, term, prefix):
+        if not prefix:
+            return self._postings.get(term, {})
+        merged = {}
+        for candidate, postings in self._postings.items():
+            if candidate.startswith(term):
+                for proc_id, weight in postings.items():
+                    merged[proc_id] = merged.get(proc_id, 0) + weight
+        return merged
+
+    def score(self, q) -> dict:
+        """Todos os termos obrigatórios (o último como prefixo), tf-idf"""
+        terms = tokenize(q)
+        if not terms:
+            return {}
+        self._sync()
+        with self._lock:
+            total_docs = max(len(self._doc_terms), 1)
+            scores = None
+            for position, term in enumerate(terms):
+                matches = self._matches(term, prefix=position == len(terms) - 1)
+                if not matches:
+                    return {}
+                idf = math.log(1 + total_docs / len(matches))
+                term_scores = {pid: idf * (1 + math.log(w)) for pid, w in matches.items()}
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+                if not scores:
+                    return {}
+            return scores
+
+    def search(self, q, query, limit):
+        scores = self.score(q)
+        if not scores:
+            return []
+        rows = query.filter(Procurement.id.in_(list(scores))).all()
+        rows.sort(key=lambda row: (-scores[row.id], -row.id))
+        return [(row, scores[row.id]) for row in rows[:limit]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.name,
+                "documents": len(self._doc_terms),
+                "terms": len(self._postings),
+                "pending": len(self._dirty),
+            }
+
+
+BACKENDS = {
+    "postgres": PostgresSearch,
+    "sqlite": SqliteFtsSearch,
+    "memory": MemorySearch,
+}
+
+search_index = MemorySearch()
+
+
+def configure(engine, backend: str = "auto"):
+    """Escolhe e prepara o backend; preenche search_documents se vazia"""
+    global search_index
+    if backend == "auto":
+        backend = {"postgresql": "postgres", "sqlite": "sqlite"}.get(engine.dialect.name, "memory")
+
+    with engine.begin() as conn:
+        if not conn.execute(select(_documents.c.procurement_id).limit(1)).first():
+            _write_documents(conn)
+        try:
+            with conn.begin_nested():
+                search_index = BACKENDS[backend]().setup(conn)
+        except OperationalError:
+            # SQLite compilado sem FTS5
+            search_index = MemorySearch()
+    return search_index
+
+
+def search_procurements(q: str, query, limit: int) -> list:
+    """
+    Aplica a busca a ``query`` (projeção sobre Procurement já filtrada pelo
+    papel) e retorna [(linha, relevância)] em ordem decrescente
+    """
+    return search_index.search(q, query, limit)
+
+
+def _text_changed(obj, fields) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in fields)
+
+
+def _previous_procurement_id(session, tr):
+    # Valor ainda gravado no banco: o atributo pode estar expirado, e pela
+    # relação a FK só é sincronizada durante o flush
+    return session.connection().scalar(select(_trs.c.procurement_id).where(_trs.c.id == tr.id))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_search_changes(session, flush_context, instances):
+    # Guarda os objetos: processos novos só recebem id durante o flush
+    pending = session.info.setdefault("search_dirty", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, TR):
+            relinked = obj not in session.new and _text_changed(obj, ("procurement_id", "procurement"))
+            if obj in session.new or relinked or _text_changed(obj, TR_SEARCH_FIELDS):
+                pending.append(obj)
+            if relinked:
+                # TR vinculado/movido: o processo anterior também perde o texto do TR
+                session.info.setdefault("search_dirty_ids", set()).add(_previous_procurement_id(session, obj))
+        elif isinstance(obj, Procurement):
+            if obj in session.new or _text_changed(obj, PROCUREMENT_SEARCH_FIELDS):
+                pending.append(obj)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _refresh_search_documents(session, flush_context):
+    pending = session.info.pop("search_dirty", None)
+    previous = session.info.pop("search_dirty_ids", set())
+    if pending or previous:
+        refresh_documents(session, previous | {
+            obj.procurement_id if isinstance(obj, TR) else obj.id for obj in pending or ()
+        })
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_search_changes(session):
+    changed = session.info.pop("search_changed", None)
+    if changed:
+        search_index.committed(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_search_changes(session):
+    session.info.pop("search_changed", None)
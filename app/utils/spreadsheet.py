@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Leitura incremental de planilhas enviadas (CSV/XLSX).
+
+Os leitores devolvem um gerador de linhas (listas de strings/None) lendo o
+arquivo aos poucos: o CSV é decodificado em fluxo e o XLSX é um zip cuja
+planilha é percorrida com ``iterparse``, descartando cada ``<row>`` depois de
+entregue.  Só a tabela de textos compartilhados (sharedStrings) fica inteira
+em memória, e ela tem um texto por valor distinto, não por célula.
+"""
+
+import csv
+import io
+import posixpath
+import re
+import zipfile
+from itertools import chain
+from xml.etree import ElementTree
+
+IMPORT_FORMATS = ("csv", "xlsx")
+
+_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_CELL_REF = re.compile(r"([A-Z]+)")
+
+
+class SpreadsheetFormatError(ValueError):
+    """XLSX legível, mas sem uma parte esperada ou com referência inválida"""
+
+
+# Erros de arquivo corrompido/fora do formato, tratados como 400 pelas rotas
+SpreadsheetError = (zipfile.BadZipFile, ElementTree.ParseError, UnicodeDecodeError, csv.Error)
+
+
+def iter_csv_rows(stream, encoding: str = "utf-8-sig"):
+    """Linhas de um CSV binário; separador ``;`` ou ``,`` pelo cabeçalho"""
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    first = text.readline()
+    # Excel em pt-BR grava ";" (a vírgula é o separador decimal)
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    yield from csv.reader(chain([first], text), delimiter=delimiter)
+
+
+def _column_index(ref: str) -> int:
+    index = 0
+    for letter in _CELL_REF.match(ref).group(1):
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _text(element) -> str:
+    return "".join(t.text or "" for t in element.iter(_MAIN + "t"))
+
+
+def _shared_strings(archive, names) -> list:
+    if "xl/sharedStrings.xml" not in names:
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as source:
+        for _, element in ElementTree.iterparse(source):
+            if element.tag == _MAIN + "si":
+                strings.append(_text(element))
+                element.clear()
+    return strings
+
+
+def _first_sheet(archive, names) -> str:
+    """Caminho da primeira aba segundo workbook.xml e seus relacionamentos"""
+    default = "xl/worksheets/sheet1.xml"
+    if "xl/workbook.xml" not in names or "xl/_rels/workbook.xml.rels" not in names:
+        return default
+    sheet = ElementTree.fromstring(archive.read("xl/workbook.xml")).find(f"{_MAIN}sheets/{_MAIN}sheet")
+    if sheet is None:
+        return default
+    rel_id = sheet.get(_REL + "id")
+    for rel in ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels")):
+        if rel.tag == _PKG_REL + "Relationship" and rel.get("Id") == rel_id:
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    return default
+
+
+def _cell_value(cell, shared):
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        inline = cell.find(_MAIN + "is")
+        return _text(inline) if inline is not None else None
+    value = cell.find(_MAIN + "v")
+    if value is None or value.text is None:
+        return None
+    if kind == "s":
+        try:
+            return shared[int(value.text)]
+        except (ValueError, IndexError):
+            raise SpreadsheetFormatError(f"texto compartilhado inexistente na célula {cell.get('r')}")
+    return value.text
+
+
+def iter_xlsx_rows(fileobj):
+    """Linhas da primeira aba de um XLSX (arquivo com seek, ex.: upload)"""
+    with zipfile.ZipFile(fileobj) as archive:
+        names = set(archive.namelist())
+        shared = _shared_strings(archive, names)
+        sheet = _first_sheet(archive, names)
+        if sheet not in names:
+            raise SpreadsheetFormatError(f"XLSX sem a aba {sheet}")
+        with archive.open(sheet) as source:
+            sheet_data = None
+            for event, element in ElementTree.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    if element.tag == _MAIN + "sheetData":
+                        sheet_data = element
+                    continue
+                if element.tag != _MAIN + "row":
+                    continue
+                values = []
+                for cell in element.iter(_MAIN + "c"):
+                    ref = cell.get("r")
+                    index = _column_index(ref) if ref else len(values)
+                    values.extend([None] * (index - len(values)))
+                    values.append(_cell_value(cell, shared))
+                # Linha entregue: solta os elementos já lidos
+                if sheet_data is not None:
+                    sheet_data.clear()
+                yield values
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Fornecedores: resolução em lote de e-mails de convite e visibilidade de
+processos
+"""
+
+from sqlalchemy import exists, or_
+from .. import db
+from ..models import User, Organization, Role, Procurement, ProcurementStatus, SupplierVisibility
+
+# Status em que qualquer fornecedor enxerga o processo
+PUBLIC_STATUSES = (ProcurementStatus.ABERTO, ProcurementStatus.ANALISE_TECNICA)
+
+
+def resolve_suppliers(emails) -> dict:
+    """
+    Mapeia e-mail -> linha (id, email, full_name, org_name) dos fornecedores
+    cadastrados, em uma única consulta.  E-mails sem cadastro ficam de fora.
+    """
+    emails = {e for e in emails if e}
+    if not emails:
+        return {}
+
+    rows = db.session.query(
+        User.id,
+        User.email,
+        User.full_name,
+        Organization.name.label("org_name"),
+    ).outerjoin(
+        Organization, Organization.id == User.org_id
+    ).filter(
+        User.email.in_(emails),
+        User.role == Role.FORNECEDOR
+    ).all()
+
+    return {row.email: row for row in rows}
+
+
+def supplier_visibility_filter(user):
+    """
+    Critério SQL dos processos visíveis para o fornecedor: status público
+    (índice em ``procurements.status``) ou convite em ``supplier_visibility``
+    (mantida por utils/visibility.py), buscado pela chave
+    """
+    return or_(
+        Procurement.status.in_(PUBLIC_STATUSES),
+        exists().where(
+            SupplierVisibility.user_id == user.id,
+            SupplierVisibility.procurement_id == Procurement.id,
+        ),
+    )
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Totais materializados das propostas (``Proposal.total_value`` e
+``Proposal.item_count``).
+
+Toda alteração em ``ProposalService``/``ProposalPrice`` feita pela sessão
+do ORM marca a proposta e, no fim do flush, os totais dessas propostas são
+recalculados no banco com um único UPDATE (Numeric, sem float).  Escritas
+em lote fora do ORM devem chamar ``refresh_proposal_totals`` diretamente.
+"""
+
+from sqlalchemy import and_, event, func, select, update
+from sqlalchemy.orm import Session
+from ..models import Proposal, ProposalService, ProposalPrice
+
+_proposals = Proposal.__table__
+_services = ProposalService.__table__
+_prices = ProposalPrice.__table__
+
+
+def _priced_lines():
+    return _services.join(
+        _prices,
+        and_(
+            _prices.c.proposal_id == _services.c.proposal_id,
+            _prices.c.service_item_id == _services.c.service_item_id,
+        )
+    )
+
+
+def _totals_update():
+    total = select(
+        func.coalesce(func.sum(_services.c.qty * _prices.c.unit_price), 0)
+    ).select_from(_priced_lines()).where(
+        _services.c.proposal_id == _proposals.c.id
+    ).scalar_subquery()
+
+    count = select(func.count()).select_from(_priced_lines()).where(
+        _services.c.proposal_id == _proposals.c.id
+    ).scalar_subquery()
+
+    return update(_proposals).values(total_value=total, item_count=count)
+
+
+def refresh_proposal_totals(session, proposal_ids) -> None:
+    """Recalcula os totais das propostas indicadas (uma instrução)"""
+    proposal_ids = {pid for pid in proposal_ids if pid is not None}
+    if not proposal_ids:
+        return
+    session.connection().execute(_totals_update().where(_proposals.c.id.in_(proposal_ids)))
+    _expire_totals(session, proposal_ids)
+
+
+def rebuild_all_proposal_totals(session) -> int:
+    """Recalcula os totais de todas as propostas; retorna quantas linhas"""
+    result = session.connection().execute(_totals_update())
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Proposal):
+            session.expire(obj, ["total_value", "item_count"])
+    return result.rowcount
+
+
+def _expire_totals(session, proposal_ids):
+    # Instâncias já carregadas passam a reler os totais do banco
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Proposal) and obj.id in proposal_ids:
+            session.expire(obj, ["total_value", "item_count"])
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_touched_proposals(session, flush_context, instances):
+    # Guarda os objetos: linhas novas só recebem proposal_id durante o flush
+    touched = session.info.setdefault("proposal_totals_dirty", [])
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (ProposalService, ProposalPrice)):
+            touched.append(obj)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _refresh_touched_proposals(session, flush_context):
+    touched = session.info.pop("proposal_totals_dirty", None)
+    if touched:
+        refresh_proposal_totals(session, {obj.proposal_id for obj in touched})
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Sincronização da planilha de serviços do TR por diff.
+
+A planilha recebida é comparada com os itens gravados (uma consulta) e só o
+que mudou vai ao banco, em lote: um DELETE, um UPDATE executemany e um
+INSERT multi-linha.  Os itens são casados primeiro pelo ``codigo`` e depois
+pelo ``item_ordem``, então reordenar ou editar uma célula preserva os ids e,
+com eles, as quantidades/preços já propostos (ProposalService/ProposalPrice).
+
+Remover itens só é permitido com o TR em RASCUNHO/REJEITADO e sem nada
+proposto para eles; caso contrário a gravação é recusada (ItemsLockedError)
+em vez de apagar o que os fornecedores já informaram.
+"""
+
+import unicodedata
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import delete, exists, insert, or_, select, update
+from ..models import TRServiceItem, TRStatus, ProposalService, ProposalPrice
+
+ITEM_FIELDS = ("item_ordem", "codigo", "descricao", "unid", "qtde")
+
+# Status em que a planilha ainda pode perder itens
+EDITABLE_TR_STATUSES = (TRStatus.RASCUNHO, TRStatus.REJEITADO)
+
+
+class ItemsLockedError(Exception):
+    """Remoção de itens recusada (TR fora de edição ou itens já propostos)"""
+
+
+# Numeric(18, 3): até 15 dígitos inteiros
+QTDE_PLACES = Decimal("0.001")
+QTDE_MAX = Decimal(10) ** 15
+
+
+def parse_decimal(value) -> Decimal:
+    """Quantidade como Decimal; aceita "1.234,5" (pt-BR) e "1234.5" """
+    if isinstance(value, str):
+        value = value.strip().replace(" ", "")
+        if "," in value:
+            value = value.replace(".", "").replace(",", ".")
+    number = Decimal(str(value))
+    if not number.is_finite():
+        raise InvalidOperation
+    return number
+
+
+def parse_item(item: dict, default_ordem: int) -> dict:
+    """Um item da planilha no formato das colunas; ValueError se inválido"""
+    raw_ordem = item.get("item_ordem")
+    try:
+        item_ordem = default_ordem if raw_ordem in (None, "") else parse_decimal(raw_ordem)
+        if item_ordem != int(item_ordem):
+            raise InvalidOperation
+        item_ordem = int(item_ordem)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError(f"item_ordem inválido: {raw_ordem!r}")
+
+    raw_qtde = item.get("qtde", 1)
+    try:
+        qtde = parse_decimal(raw_qtde).quantize(QTDE_PLACES)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError(f"qtde inválida: {raw_qtde!r}")
+    if qtde < 0 or qtde >= QTDE_MAX:
+        raise ValueError(f"qtde fora do intervalo: {raw_qtde!r}")
+
+    codigo = (item.get("codigo") or "").strip()
+    unid = (item.get("unid") or "").strip() or "UN"
+    if len(codigo) > 80:
+        raise ValueError("codigo com mais de 80 caracteres")
+    if len(unid) > 20:
+        raise ValueError("unid com mais de 20 caracteres")
+    return {
+        "item_ordem": item_ordem,
+        "codigo": codigo,
+        "descricao": item.get("descricao") or "",
+        "unid": unid,
+        "qtde": qtde,
+    }
+
+
+def normalize_rows(rows) -> list:
+    """Valores da planilha no formato das colunas; ValueError se inválida"""
+    normalized = []
+    seen_ordem = set()
+    for idx, item in enumerate(rows, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"linha {idx}: item deve ser um objeto")
+        try:
+            parsed = parse_item(item, idx)
+        except ValueError as exc:
+            raise ValueError(f"linha {idx}: {exc}")
+        if parsed["item_ordem"] in seen_ordem:
+            raise ValueError(f"linha {idx}: item_ordem {parsed['item_ordem']} repetido")
+        seen_ordem.add(parsed["item_ordem"])
+        normalized.append(parsed)
+    return normalized
+
+
+def _match(existing, incoming):
+    """Pares (existente, novo): por codigo único, depois por item_ordem"""
+    codigo_count = {}
+    for row in existing:
+        if row.codigo:
+            codigo_count[row.codigo] = codigo_count.get(row.codigo, 0) + 1
+    by_codigo = {row.codigo: row for row in existing if row.codigo and codigo_count[row.codigo] == 1}
+    by_ordem = {row.item_ordem: row for row in existing}
+
+    matched = {}
+    used = set()
+    for position, item in enumerate(incoming):
+        row = by_codigo.get(item["codigo"]) if item["codigo"] else None
+        if row is not None and row.id not in used:
+            matched[position] = row
+            used.add(row.id)
+    for position, item in enumerate(incoming):
+        if position in matched:
+            continue
+        row = by_ordem.get(item["item_ordem"])
+        if row is not None and row.id not in used:
+            matched[position] = row
+            used.add(row.id)
+    return matched, used
+
+
+def _stored_item(row) -> dict:
+    """Item gravado no formato de ``parse_item`` (NULL vira "", qtde na escala da coluna)"""
+    return {
+        "item_ordem": row.item_ordem,
+        "codigo": row.codigo or "",
+        "descricao": row.descricao or "",
+        "unid": row.unid or "",
+        "qtde": Decimal(row.qtde).quantize(QTDE_PLACES),
+    }
+
+
+def _delete_items(session, tr, criterion) -> int:
+    """Remove itens do TR; ItemsLockedError se o TR ou as propostas os travarem"""
+    if tr.status not in EDITABLE_TR_STATUSES:
+        raise ItemsLockedError(f"TR {tr.status.value}: itens da planilha não podem ser removidos")
+    items = select(TRServiceItem.id).where(criterion).scalar_subquery()
+    proposed = session.scalar(select(or_(
+        exists().where(ProposalService.service_item_id.in_(items)),
+        exists().where(ProposalPrice.service_item_id.in_(items)),
+    )))
+    if proposed:
+        raise ItemsLockedError("itens com quantidades/preços propostos não podem ser removidos")
+    return session.execute(delete(TRServiceItem).where(criterion)).rowcount
+
+
+def sync_service_items(session, tr, rows) -> dict:
+    """
+    Aplica a planilha ao TR na transação corrente e retorna as contagens
+    {"inserted", "updated", "deleted", "unchanged"}.  ValueError se a
+    planilha for inválida; ItemsLockedError se ela remover itens que não
+    podem mais sair (ver ``_delete_items``).
+    """
+    incoming = normalize_rows(rows)
+    existing = session.execute(
+        select(TRServiceItem.id, *(getattr(TRServiceItem, f) for f in ITEM_FIELDS))
+        .where(TRServiceItem.tr_id == tr.id)
+    ).all()
+
+    matched, used = _match(existing, incoming)
+    to_delete = [row.id for row in existing if row.id not in used]
+    to_insert = [dict(item, tr_id=tr.id) for pos, item in enumerate(incoming) if pos not in matched]
+    to_update = []
+    moved = []
+    for position, row in matched.items():
+        item = incoming[position]
+        stored = _stored_item(row)
+        if any(stored[f] != item[f] for f in ITEM_FIELDS):
+            to_update.append(dict(item, id=row.id))
+            if row.item_ordem != item["item_ordem"]:
+                moved.append(row.id)
+
+    if to_delete:
+        _delete_items(session, tr, TRServiceItem.id.in_(to_delete))
+    if moved:
+        # Ordem provisória negativa: evita colisão em uq_tr_item_ordem ao trocar posições
+        session.execute(update(TRServiceItem), [{"id": i, "item_ordem": -i} for i in moved])
+    if to_update:
+        session.execute(update(TRServiceItem), to_update)
+    if to_insert:
+        session.execute(insert(TRServiceItem), to_insert)
+
+    # Coleção carregada ficou desatualizada pelas escritas em lote
+    session.expire(tr, ["service_items"])
+
+    return {
+        "inserted": len(to_insert),
+        "updated": len(to_update),
+        "deleted": len(to_delete),
+        "unchanged": len(matched) - len(to_update),
+    }
+
+
+IMPORT_CHUNK_SIZE = 1000
+# Erros devolvidos por linha; os demais só entram na contagem
+MAX_IMPORT_ERRORS = 200
+
+# Cabeçalhos aceitos (minúsculos, sem acento nem pontuação) -> coluna
+HEADER_ALIASES = {
+    "item": "item_ordem", "itemordem": "item_ordem", "ordem": "item_ordem", "n": "item_ordem",
+    "codigo": "codigo", "cod": "codigo",
+    "descricao": "descricao", "descricaodoservico": "descricao", "servico": "descricao",
+    "unid": "unid", "unidade": "unid", "un": "unid",
+    "qtde": "qtde", "qtd": "qtde", "quantidade": "qtde", "qtdetr": "qtde",
+}
+REQUIRED_COLUMNS = ("descricao", "qtde")
+
+
+def _header_key(value) -> str:
+    text = unicodedata.normalize("NFKD", str(value or "")).lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def map_header(header) -> dict:
+    """Índice da coluna -> campo do item; ValueError se faltar coluna obrigatória"""
+    columns = {}
+    for index, value in enumerate(header):
+        field = HEADER_ALIASES.get(_header_key(value))
+        if field and field not in columns.values():
+            columns[index] = field
+    missing = [f for f in REQUIRED_COLUMNS if f not in columns.values()]
+    if missing:
+        raise ValueError(f"colunas obrigatórias ausentes no cabeçalho: {', '.join(missing)}")
+    return columns
+
+
+def _is_blank(values) -> bool:
+    return all(v is None or not str(v).strip() for v in values)
+
+
+def import_service_items(session, tr, rows, replace: bool = False) -> dict:
+    """
+    Importa linhas de planilha (a primeira é o cabeçalho) na transação
+    corrente, em INSERTs de ``IMPORT_CHUNK_SIZE`` linhas; cada lote é
+    descartado depois de gravado.  ``replace`` remove os itens atuais antes;
+    sem ele os itens são acrescentados e ``item_ordem`` em branco continua a
+    numeração existente.
+
+    Retorna as contagens e os erros por linha ({"row", "error"}).  Ao achar o
+    primeiro erro para de gravar e só segue validando: quem chama deve
+    desfazer a transação se ``error_count`` > 0.
+    """
+    rows = enumerate(rows, start=1)
+    header = next((values for _, values in rows if not _is_blank(values)), None)
+    if header is None:
+        raise ValueError("arquivo vazio")
+    columns = map_header(header)
+
+    deleted = 0
+    if replace:
+        deleted = _delete_items(session, tr, TRServiceItem.tr_id == tr.id)
+        taken = set()
+    else:
+        taken = set(session.scalars(select(TRServiceItem.item_ordem).where(TRServiceItem.tr_id == tr.id)))
+    offset = max(taken, default=0)
+
+    chunk = []
+    errors = []
+    error_count = inserted = position = 0
+    for line, values in rows:
+        if _is_blank(values):
+            continue
+        position += 1
+        item = {field: values[index] for index, field in columns.items() if index < len(values)}
+        try:
+            if not (item.get("descricao") or "").strip():
+                raise ValueError("descricao obrigatória")
+            if item.get("qtde") in (None, ""):
+                raise ValueError("qtde obrigatória")
+            parsed = parse_item(item, offset + position)
+            if parsed["item_ordem"] in taken:
+                raise ValueError(f"item_ordem {parsed['item_ordem']} repetido")
+        except ValueError as exc:
+            error_count += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"row": line, "error": str(exc)})
+            continue
+
+        taken.add(parsed["item_ordem"])
+        if error_count:
+            continue
+        parsed["tr_id"] = tr.id
+        chunk.append(parsed)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            session.execute(insert(TRServiceItem), chunk)
+            inserted += len(chunk)
+            chunk = []
+
+    if chunk and not error_count:
+        session.execute(insert(TRServiceItem), chunk)
+        inserted += len(chunk)
+
+    session.expire(tr, ["service_items"])
+    return {
+        "rows": position,
+        "inserted": inserted,
+        "deleted": deleted,
+        "error_count": error_count,
+        "errors": errors,
+    }
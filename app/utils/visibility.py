@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Visibilidade fornecedor → processo por convite (``supplier_visibility``).
+
+Um fornecedor enxerga os processos em status público (predicado indexado
+em ``procurements.status``, ver ``suppliers.supplier_visibility_filter``) e
+aqueles para os quais foi convidado.  Só a parte dos convites é
+materializada, uma linha por (fornecedor, processo), mantida pelos eventos
+da sessão no mesmo flush da escrita:
+
+- convite criado/aceito: resolve ``Invite.supplier_user_id`` pelo e-mail e
+  grava a linha;
+- fornecedor registrado: herda os convites pendentes do seu e-mail.
+
+Mudanças de status não tocam a tabela.  Escritas fora do ORM devem chamar
+``rebuild_supplier_visibility``.
+"""
+
+from sqlalchemy import and_, delete, event, exists, func, insert, select, update
+from sqlalchemy.orm import Session
+from ..models import Invite, Role, SupplierVisibility, User
+
+_visibility = SupplierVisibility.__table__
+_invites = Invite.__table__
+_users = User.__table__
+
+
+def _grant(conn, pairs) -> None:
+    """Garante as linhas (user_id, procurement_id) do select ``pairs``"""
+    pairs = pairs.subquery()
+    missing = select(pairs.c.user_id, pairs.c.procurement_id).where(~exists().where(and_(
+        _visibility.c.user_id == pairs.c.user_id,
+        _visibility.c.procurement_id == pairs.c.procurement_id,
+    ))).distinct()
+    conn.execute(insert(_visibility).from_select(["user_id", "procurement_id"], missing))
+
+
+def _invited_pairs(*criteria):
+    return select(
+        _invites.c.supplier_user_id.label("user_id"),
+        _invites.c.procurement_id.label("procurement_id"),
+    ).where(_invites.c.supplier_user_id.isnot(None), *criteria)
+
+
+def _resolve_invites(conn, *criteria) -> None:
+    """Preenche ``supplier_user_id`` dos convites ainda sem fornecedor"""
+    supplier = select(_users.c.id).where(
+        _users.c.email == _invites.c.email,
+        _users.c.role == Role.FORNECEDOR,
+    ).scalar_subquery()
+    conn.execute(
+        update(_invites)
+        .where(_invites.c.supplier_user_id.is_(None), *criteria)
+        .values(supplier_user_id=supplier)
+    )
+
+
+def sync_invites(session, invite_ids) -> None:
+    invite_ids = {i for i in invite_ids if i is not None}
+    if not invite_ids:
+        return
+    conn = session.connection()
+    _resolve_invites(conn, _invites.c.id.in_(invite_ids))
+    _grant(conn, _invited_pairs(_invites.c.id.in_(invite_ids)))
+    _expire(session, Invite, invite_ids, ["supplier_user_id"])
+
+
+def sync_suppliers(session, user_ids, emails) -> None:
+    """Fornecedor novo: convites pendentes do e-mail"""
+    user_ids = {u for u in user_ids if u is not None}
+    if not user_ids:
+        return
+    conn = session.connection()
+    _resolve_invites(conn, _invites.c.email.in_(set(emails)))
+    _grant(conn, _invited_pairs(_invites.c.supplier_user_id.in_(user_ids)))
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Invite) and obj.email in emails:
+            session.expire(obj, ["supplier_user_id"])
+
+
+def rebuild_supplier_visibility(session) -> int:
+    """Recria a tabela inteira a partir dos convites; retorna linhas"""
+    conn = session.connection()
+    conn.execute(delete(_visibility))
+    _resolve_invites(conn)
+    _grant(conn, _invited_pairs())
+    return conn.execute(select(func.count()).select_from(_visibility)).scalar()
+
+
+def _expire(session, model, ids, attrs):
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, model) and obj.id in ids:
+            session.expire(obj, attrs)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_visibility_changes(session, flush_context, instances):
+    # Guarda os objetos: ids de linhas novas só existem depois do flush
+    pending = session.info.setdefault("supplier_visibility_dirty", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Invite):
+            pending.append(("invite", obj))
+        elif isinstance(obj, User):
+            if obj in session.new and obj.role == Role.FORNECEDOR:
+                pending.append(("supplier", obj))
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _apply_visibility_changes(session, flush_context):
+    pending = session.info.pop("supplier_visibility_dirty", None)
+    if not pending:
+        return
+    by_kind = {}
+    for kind, obj in pending:
+        by_kind.setdefault(kind, []).append(obj)
+
+    suppliers = by_kind.get("supplier", [])
+    sync_suppliers(session, [u.id for u in suppliers], [u.email for u in suppliers])
+    sync_invites(session, [inv.id for inv in by_kind.get("invite", [])])
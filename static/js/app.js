@@ -8,6 +8,8 @@ let currentProcurement = null;
 let currentTR = null;
 let currentProposal = null;
 let serviceItemsCount = 0;
+// Cursor da próxima página da lista de processos (null: não há mais)
+let procurementsCursor = null;
 
 // API Base URL
 const API_BASE = window.location.origin + '/api';
@@ -930,7 +932,7 @@ async function createProcessFromTR(trId) {
             
             <div class="form-group">
                 <label>Prazo para Recebimento de Propostas</label>
-                <input type="datetime-local" id="procDeadline" min="${new Date().toISOString().slice(0,16)}">
+                <input type="datetime-local" id="procDeadline" min="${localDateTimeInputValue(new Date())}">
             </div>
             
             <div class="btn-group">
@@ -963,7 +965,7 @@ async function saveProcessFromTR(trId) {
                 tr_id: trId,
                 title: title,
                 description: description,
-                deadline_proposals: deadline
+                deadline_proposals: deadlineToISO(deadline)
             })
         });
         
@@ -1125,6 +1127,10 @@ async function rejectTR(trId) {
     }
 }
 
+// Lista de processos do comprador: uma página por vez ("Carregar mais")
+const PROCUREMENTS_PAGE_SIZE = 50;
+const PROCUREMENTS_ENDPOINT = '/procurements?count=0';
+
 async function loadProcurements() {
     const container = document.getElementById('procurements');
     if (!container) return;
@@ -1132,14 +1138,15 @@ async function loadProcurements() {
     container.innerHTML = '<div class="spinner"></div>';
     
     try {
-        const procurements = await fetchAPI('/procurements').then(r => r.json());
+        const page = await fetchPage(PROCUREMENTS_ENDPOINT, null, PROCUREMENTS_PAGE_SIZE);
+        procurementsCursor = page.cursor;
         
         container.innerHTML = `
             <div class="card">
                 <div class="card-header">
                     <h3 class="card-title">📁 Processos de Concorrência</h3>
                 </div>
-                ${procurements.length === 0 ? `
+                ${page.items.length === 0 ? `
                     <div class="empty-state">
                         <div class="empty-state-icon">📋</div>
                         <div class="empty-state-title">Nenhum processo encontrado</div>
@@ -1158,26 +1165,11 @@ async function loadProcurements() {
                                 <th>Ações</th>
                             </tr>
                         </thead>
-                        <tbody>
-                            ${procurements.map(proc => `
-                                <tr>
-                                    <td>#${proc.id}</td>
-                                    <td><strong>${proc.title}</strong></td>
-                                    <td><span class="status-badge status-${proc.status.toLowerCase()}">${proc.status}</span></td>
-                                    <td>R$ ${(proc.orcamento_disponivel || 0).toLocaleString('pt-BR')}</td>
-                                    <td>${proc.deadline_proposals ? new Date(proc.deadline_proposals).toLocaleDateString('pt-BR') : '-'}</td>
-                                    <td>${new Date(proc.created_at).toLocaleDateString('pt-BR')}</td>
-                                    <td>
-                                        <button class="btn btn-primary" onclick="viewProcurement(${proc.id})">👁️</button>
-                                        ${proc.status === 'TR_APROVADO' ? 
-                                            `<button class="btn btn-success" onclick="openProcurementModal(${proc.id})">📢 Abrir</button>` : ''}
-                                        ${proc.status === 'ABERTO' ? 
-                                            `<button class="btn btn-warning" onclick="closeProcurement(${proc.id})">🔒 Fechar</button>` : ''}
-                                    </td>
-                                </tr>
-                            `).join('')}
+                        <tbody id="procurementsRows">
+                            ${page.items.map(procurementRow).join('')}
                         </tbody>
                     </table>
+                    <div class="btn-group" id="procurementsMore">${procurementsMoreButton()}</div>
                 `}
             </div>
         `;
@@ -1187,12 +1179,56 @@ async function loadProcurements() {
     }
 }
 
+async function loadMoreProcurements() {
+    const more = document.getElementById('procurementsMore');
+    const rows = document.getElementById('procurementsRows');
+    if (!more || !rows || !procurementsCursor) return;
+    
+    more.innerHTML = '<div class="spinner"></div>';
+    
+    try {
+        const page = await fetchPage(PROCUREMENTS_ENDPOINT, procurementsCursor, PROCUREMENTS_PAGE_SIZE);
+        procurementsCursor = page.cursor;
+        rows.insertAdjacentHTML('beforeend', page.items.map(procurementRow).join(''));
+        more.innerHTML = procurementsMoreButton();
+    } catch (error) {
+        console.error('Error loading procurements:', error);
+        more.innerHTML = procurementsMoreButton();
+        showNotification('❌ Erro', 'Erro ao carregar mais processos');
+    }
+}
+
+function procurementsMoreButton() {
+    return procurementsCursor ?
+        '<button class="btn btn-secondary" onclick="loadMoreProcurements()">⬇️ Carregar mais</button>' : '';
+}
+
+function procurementRow(proc) {
+    return `
+        <tr>
+            <td>#${proc.id}</td>
+            <td><strong>${proc.title}</strong></td>
+            <td><span class="status-badge status-${proc.status.toLowerCase()}">${proc.status}</span></td>
+            <td>R$ ${(proc.orcamento_disponivel || 0).toLocaleString('pt-BR')}</td>
+            <td>${proc.deadline_proposals ? new Date(proc.deadline_proposals).toLocaleDateString('pt-BR') : '-'}</td>
+            <td>${new Date(proc.created_at).toLocaleDateString('pt-BR')}</td>
+            <td>
+                <button class="btn btn-primary" onclick="viewProcurement(${proc.id})">👁️</button>
+                ${proc.status === 'TR_APROVADO' ? 
+                    `<button class="btn btn-success" onclick="openProcurementModal(${proc.id})">📢 Abrir</button>` : ''}
+                ${proc.status === 'ABERTO' ? 
+                    `<button class="btn btn-warning" onclick="closeProcurement(${proc.id})">🔒 Fechar</button>` : ''}
+            </td>
+        </tr>
+    `;
+}
+
 // Continua com resto das funções...
 async function openProcurementModal(procId) {
     const modalContent = `
         <div class="form-group">
             <label>Prazo para Propostas (opcional)</label>
-            <input type="datetime-local" id="procDeadline" min="${new Date().toISOString().slice(0,16)}">
+            <input type="datetime-local" id="procDeadline" min="${localDateTimeInputValue(new Date())}">
         </div>
         <div class="btn-group">
             <button class="btn btn-success" onclick="openProcurement(${procId})">📢 Abrir Processo</button>
@@ -1209,7 +1245,7 @@ async function openProcurement(procId) {
     try {
         const response = await fetchAPI(`/procurements/${procId}/open`, {
             method: 'POST',
-            body: JSON.stringify({ deadline })
+            body: JSON.stringify({ deadline: deadlineToISO(deadline) })
         });
         
         if (response.ok) {
@@ -1254,7 +1290,7 @@ async function loadInvitesManagement() {
     container.innerHTML = '<div class="spinner"></div>';
     
     try {
-        const procurements = await fetchAPI('/procurements').then(r => r.json());
+        const procurements = await fetchAllPages('/procurements?status=ABERTO&count=0');
         const openProcs = procurements.filter(p => p.status === 'ABERTO');
         
         container.innerHTML = `
@@ -1379,7 +1415,7 @@ async function loadProposals() {
     container.innerHTML = '<div class="spinner"></div>';
     
     try {
-        const procurements = await fetchAPI('/procurements').then(r => r.json());
+        const procurements = await fetchAllPages('/procurements?status=ABERTO,ANALISE_TECNICA,ANALISE_COMERCIAL&count=0');
         
         let allProposals = [];
         for (const proc of procurements) {
@@ -1458,7 +1494,7 @@ async function loadComparison() {
     container.innerHTML = '<div class="spinner"></div>';
     
     try {
-        const procurements = await fetchAPI('/procurements').then(r => r.json());
+        const procurements = await fetchAllPages('/procurements?status=ANALISE_TECNICA,ANALISE_COMERCIAL&count=0');
         const procsWithProposals = procurements.filter(p => 
             p.status === 'ANALISE_TECNICA' || p.status === 'ANALISE_COMERCIAL'
         );
@@ -1515,7 +1551,7 @@ async function loadAvailableProcurements() {
     container.innerHTML = '<div class="spinner"></div>';
     
     try {
-        const procurements = await fetchAPI('/procurements').then(r => r.json());
+        const procurements = await fetchAllPages('/procurements?status=ABERTO,ANALISE_TECNICA&count=0&include=description');
         const available = procurements.filter(p => p.status === 'ABERTO' || p.status === 'ANALISE_TECNICA');
         
         container.innerHTML = `
@@ -1573,7 +1609,7 @@ async function loadProposalForm() {
     const container = document.getElementById('create-proposal');
     if (!container) return;
     
-    const procurements = await fetchAPI('/procurements').then(r => r.json());
+    const procurements = await fetchAllPages('/procurements?status=ABERTO&count=0');
     const available = procurements.filter(p => p.status === 'ABERTO');
     
     container.innerHTML = `
@@ -1729,6 +1765,37 @@ async function fetchAPI(endpoint, options = {}) {
     return fetch(`${API_BASE}${endpoint}`, { ...defaultOptions, ...options });
 }
 
+// datetime-local não tem fuso: envia o instante em UTC (com "Z") para a API
+function deadlineToISO(value) {
+    return value ? new Date(value).toISOString() : null;
+}
+
+// Valor de datetime-local (horário local, sem fuso) para uma data
+function localDateTimeInputValue(date) {
+    return new Date(date.getTime() - date.getTimezoneOffset() * 60000).toISOString().slice(0, 16);
+}
+
+// Uma página de listagem paginada por cursor: itens e o X-Next-Cursor (null na última)
+async function fetchPage(endpoint, cursor = null, pageSize = 200) {
+    const sep = endpoint.includes('?') ? '&' : '?';
+    const url = `${endpoint}${sep}limit=${pageSize}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`;
+    const response = await fetchAPI(url);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    return { items: await response.json(), cursor: response.headers.get('X-Next-Cursor') };
+}
+
+// Listas filtradas por status (conjunto limitado): segue X-Next-Cursor até o fim
+async function fetchAllPages(endpoint, pageSize = 200) {
+    const items = [];
+    let cursor = null;
+    do {
+        const page = await fetchPage(endpoint, cursor, pageSize);
+        items.push(...page.items);
+        cursor = page.cursor;
+    } while (cursor);
+    return items;
+}
+
 // Stubs for missing functions
 async function viewProcurement(procId) {
     console.log('View procurement', procId);
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures dos testes: app com SQLite em memória, sem greenlets de fundo
+(agendador de prazos desligado, autosave gravando na requisição).
+"""
+
+import os
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["DEADLINE_SCHEDULER_ENABLED"] = "0"
+os.environ["AUTOSAVE_FLUSH_INTERVAL_MS"] = "0"
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import Organization, Role, User
+from app.utils.auth import claims_for, identity_cache
+from app.utils.autosave import autosave_buffer
+from app.utils.cache import result_cache
+from app.utils.deadlines import deadline_scheduler
+
+
+@pytest.fixture
+def app():
+    # Estado de processo compartilhado entre apps: cada teste começa limpo
+    deadline_scheduler.__init__()
+    autosave_buffer.__init__()
+    app = create_app()
+    app.config["TESTING"] = True
+    identity_cache.clear()
+    # Ids se repetem entre bancos em memória: resultado de um teste não vale no outro
+    result_cache.clear()
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Cria um usuário direto no banco e devolve (user, headers com o token)"""
+    def make(email, role, org_name=None):
+        org = None
+        if org_name:
+            org = Organization.query.filter_by(name=org_name).first() or Organization(name=org_name)
+        user = User(email=email, full_name=email.split("@")[0], password_hash="-",
+                    role=Role(role), organization=org)
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims=claims_for(user))
+        return user, {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def count_queries(app):
+    """``with count_queries() as queries:`` -> lista dos SQL executados no bloco"""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return counter
+
+
+@pytest.fixture
+def open_procurement(app, make_user):
+    """Processo ABERTO com TR aprovado de dois itens, um requisitante e um fornecedor"""
+    from app.models import Procurement, ProcurementStatus, TR, TRServiceItem, TRStatus
+
+    buyer, buyer_headers = make_user("comprador@x.com", "COMPRADOR", "Compradora")
+    requester, requester_headers = make_user("requisitante@x.com", "REQUISITANTE", "Compradora")
+    supplier, supplier_headers = make_user("fornecedor@x.com", "FORNECEDOR", "Fornecedora")
+    proc = Procurement(title="Processo", created_by=buyer.id, requisitante_id=requester.id,
+                       status=ProcurementStatus.ABERTO)
+    db.session.add(proc)
+    db.session.flush()
+    tr = TR(procurement_id=proc.id, status=TRStatus.APROVADO, created_by=buyer.id)
+    db.session.add(tr)
+    db.session.flush()
+    items = [
+        TRServiceItem(tr_id=tr.id, item_ordem=i + 1, descricao=f"servico {i}", unid="UN", qtde=2)
+        for i in range(2)
+    ]
+    db.session.add_all(items)
+    db.session.commit()
+    return SimpleNamespace(
+        proc=proc, tr=tr, item_ids=[item.id for item in items],
+        buyer=buyer, buyer_headers=buyer_headers,
+        requester=requester, requester_headers=requester_headers,
+        supplier=supplier, supplier_headers=supplier_headers,
+    )
+
+
+@pytest.fixture
+def priced_proposal(open_procurement):
+    """Proposta ENVIADA do fornecedor de ``open_procurement``: qty 2 × 10,00 nos dois itens"""
+    from app.models import Proposal, ProposalPrice, ProposalService, ProposalStatus
+
+    ctx = open_procurement
+    proposal = Proposal(procurement_id=ctx.proc.id, supplier_user_id=ctx.supplier.id,
+                        status=ProposalStatus.ENVIADA)
+    db.session.add(proposal)
+    db.session.flush()
+    for sid in ctx.item_ids:
+        db.session.add(ProposalService(proposal_id=proposal.id, service_item_id=sid, qty=2))
+        db.session.add(ProposalPrice(proposal_id=proposal.id, service_item_id=sid, unit_price=10))
+    db.session.commit()
+    return proposal
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark das estatísticas de preço: matriz sintética de 5.000 itens × 30
+propostas (5% das células sem preço, 1% com preço 20x maior).
+
+Fora da suíte padrão; rode com ``RUN_BENCHMARKS=1 python -m pytest -q -s
+tests/test_analytics_benchmark.py``.  Imprime o melhor de várias rodadas de
+``price_statistics`` e ``build_price_analytics`` e confere a meta de 50 ms
+para as duas somadas (sem a leitura do banco).
+"""
+
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from app.utils.analytics import build_price_analytics, price_statistics
+
+pytestmark = pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS=1 para rodar")
+
+ITEMS, PROPOSALS = 5000, 30
+ROUNDS = 5
+TARGET_MS = 50
+
+Item = namedtuple("Item", "id item_ordem codigo descricao unid")
+Proposal = namedtuple("Proposal", "id supplier organization")
+
+
+def _matrix(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    unit = rng.integers(100, 100_000, size=(ITEMS, PROPOSALS), dtype=np.int64)
+    unit[rng.random(unit.shape) < 0.01] *= 20
+    line = unit * rng.integers(1, 100, size=(ITEMS, 1))
+    priced = rng.random(unit.shape) > 0.05
+    return unit, line, priced
+
+
+def _best_ms(fn) -> tuple:
+    best, result = None, None
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def test_price_analytics_5000_by_30():
+    unit, line, priced = _matrix()
+    items = [Item(i, i, f"C{i}", f"serviço {i}", "UN") for i in range(1, ITEMS + 1)]
+    proposals = [Proposal(i, f"Fornecedor {i}", None) for i in range(1, PROPOSALS + 1)]
+
+    stats_ms, stats = _best_ms(lambda: price_statistics(unit, line, priced))
+    build_ms, response = _best_ms(lambda: build_price_analytics(items, proposals, stats))
+
+    assert len(response["items"]) == ITEMS and len(response["proposals"]) == PROPOSALS
+    print(f"\n{ITEMS}×{PROPOSALS}: price_statistics {stats_ms:.1f} ms, "
+          f"build_price_analytics {build_ms:.1f} ms, total {stats_ms + build_ms:.1f} ms "
+          f"(melhor de {ROUNDS}; {response['summary']['outlier_cells']} células atípicas)")
+    assert stats_ms + build_ms < TARGET_MS
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Autosave adiado x envio da proposta e encerramento do processo"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import ProcurementStatus, ProposalPrice
+from app.utils.autosave import autosave_buffer
+from app.utils.deadlines import deadline_scheduler
+
+
+@pytest.fixture
+def deferred_autosave(monkeypatch):
+    # Gravação adiada sem o greenlet: o buffer só grava quando chamado
+    monkeypatch.setattr(autosave_buffer, "interval", 1.0)
+    monkeypatch.setattr(autosave_buffer, "_greenlet", object())
+
+
+def _price(proposal_id, sid):
+    db.session.expire_all()
+    return db.session.get(ProposalPrice, (proposal_id, sid)).unit_price
+
+
+def test_submit_writes_pending_autosave_and_later_edits_are_discarded(
+        app, client, open_procurement, deferred_autosave):
+    ctx = open_procurement
+    sid = ctx.item_ids[0]
+    response = client.post(f"/api/procurements/{ctx.proc.id}/proposals", headers=ctx.supplier_headers, json={
+        "technical_description": "ok",
+        "service_items": [{"service_item_id": s, "qty": 1} for s in ctx.item_ids],
+        "prices": [{"service_item_id": s, "unit_price": 10} for s in ctx.item_ids],
+    })
+    proposal_id = response.get_json()["proposal_id"]
+
+    response = client.patch(f"/api/proposals/{ctx.proc.id}/autosave", headers=ctx.supplier_headers,
+                            json={"seq": 1, "changes": [{"service_item_id": sid, "field": "unit_price", "value": 99}]})
+    assert response.status_code == 202
+    assert _price(proposal_id, sid) == Decimal("10")
+
+    response = client.post(f"/api/proposals/{proposal_id}/submit", headers=ctx.supplier_headers)
+    assert response.status_code == 200
+    assert _price(proposal_id, sid) == Decimal("99")
+    assert autosave_buffer.committed_seq(proposal_id) == 1
+
+    response = client.patch(f"/api/proposals/{ctx.proc.id}/autosave", headers=ctx.supplier_headers,
+                            json={"seq": 2, "changes": [{"service_item_id": sid, "field": "unit_price", "value": 5}]})
+    assert response.status_code == 409
+
+    # Edição aceita antes do envio mas gravada depois: descartada na gravação
+    autosave_buffer.accept(proposal_id, ctx.proc.id, ctx.supplier.id, 3, [(sid, "unit_price", Decimal("7"))])
+    autosave_buffer.flush()
+    assert _price(proposal_id, sid) == Decimal("99")
+    assert autosave_buffer.stats()["discarded"] == 1
+    assert autosave_buffer.committed_seq(proposal_id) == 1
+
+
+@pytest.fixture
+def draft_with_pending_edit(app, client, open_procurement, deferred_autosave, monkeypatch):
+    """Rascunho com preço 10 e uma edição (99) aceita, ainda não gravada"""
+    ctx = open_procurement
+    sid = ctx.item_ids[0]
+    response = client.put(f"/api/proposals/{ctx.proc.id}/prices", headers=ctx.supplier_headers,
+                          json=[{"service_item_id": sid, "unit_price": 10}])
+    proposal_id = response.get_json()["proposal_id"]
+    response = client.patch(f"/api/proposals/{ctx.proc.id}/autosave", headers=ctx.supplier_headers,
+                            json={"seq": 1, "changes": [{"service_item_id": sid, "field": "unit_price", "value": 99}]})
+    assert response.status_code == 202
+
+    failed = []
+    monkeypatch.setattr(autosave_buffer, "_notify_failed",
+                        lambda proposal_id, pending, reason: failed.append((proposal_id, reason)))
+    return ctx, proposal_id, sid, failed
+
+
+def test_edits_are_discarded_once_the_procurement_closes(draft_with_pending_edit):
+    ctx, proposal_id, sid, failed = draft_with_pending_edit
+    # Encerramento automático entre o aceite e a gravação
+    ctx.proc.status = ProcurementStatus.ANALISE_TECNICA
+    db.session.commit()
+
+    autosave_buffer.flush()
+    assert _price(proposal_id, sid) == Decimal("10")
+    assert failed == [(proposal_id, "closed")]
+    assert autosave_buffer.committed_seq(proposal_id) == 0
+
+
+def test_edits_are_discarded_past_the_deadline_before_the_close(draft_with_pending_edit):
+    ctx, proposal_id, sid, failed = draft_with_pending_edit
+    # Prazo vencido, processo ainda ABERTO (o agendador não rodou)
+    deadline_scheduler.schedule(ctx.proc.id, datetime.utcnow() - timedelta(seconds=1))
+
+    autosave_buffer.flush()
+    assert _price(proposal_id, sid) == Decimal("10")
+    assert failed == [(proposal_id, "closed")]
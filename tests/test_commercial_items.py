@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Itens comerciais pivotados: colunas alinhadas aos itens e filtro por papel"""
+
+from app import db
+from app.models import Proposal, ProposalStatus
+
+
+def test_requester_gets_no_prices(app, client, priced_proposal, open_procurement):
+    ctx = open_procurement
+    response = client.get(f"/api/proposals/{ctx.proc.id}/commercial-items", headers=ctx.requester_headers)
+    assert response.status_code == 403
+
+
+def test_buyer_gets_columns_aligned_with_items(app, client, make_user, priced_proposal, open_procurement):
+    ctx = open_procurement
+    # Rascunho sem itens: colunas zeradas, mesmo tamanho
+    other, _ = make_user("outro@x.com", "FORNECEDOR", "Outra")
+    db.session.add(Proposal(procurement_id=ctx.proc.id, supplier_user_id=other.id,
+                            status=ProposalStatus.RASCUNHO))
+    db.session.commit()
+
+    response = client.get(f"/api/proposals/{ctx.proc.id}/commercial-items", headers=ctx.buyer_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [item["item_ordem"] for item in body["items"]] == [1, 2]
+    priced, draft = body["proposals"]
+    assert priced["proposal_id"] == priced_proposal.id
+    assert priced["unit_price"] == [10.0, 10.0]
+    assert priced["total_item"] == [20.0, 20.0]
+    assert priced["total_geral"] == 40.0
+    assert draft["qty"] == [0.0, 0.0] and draft["total_geral"] == 0.0
+
+
+def test_supplier_sees_only_its_own_proposal(app, client, make_user, priced_proposal, open_procurement):
+    ctx = open_procurement
+    other, other_headers = make_user("outro@x.com", "FORNECEDOR", "Outra")
+    db.session.add(Proposal(procurement_id=ctx.proc.id, supplier_user_id=other.id,
+                            status=ProposalStatus.ENVIADA))
+    db.session.commit()
+
+    for headers, supplier_id in ((ctx.supplier_headers, ctx.supplier.id), (other_headers, other.id)):
+        response = client.get(f"/api/proposals/{ctx.proc.id}/commercial-items", headers=headers)
+        assert response.status_code == 200
+        assert [p["supplier_user_id"] for p in response.get_json()["proposals"]] == [supplier_id]
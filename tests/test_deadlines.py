@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Prazos de propostas: fuso dos valores enviados sem offset"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Invite, Procurement, TR, TRStatus
+from app.utils.deadlines import parse_deadline
+
+
+def test_parse_deadline_reads_naive_values_in_app_timezone():
+    assert parse_deadline("2026-03-10T18:00", "America/Sao_Paulo") == datetime(2026, 3, 10, 21, 0)
+    assert parse_deadline("2026-03-10T18:00:00Z", "America/Sao_Paulo") == datetime(2026, 3, 10, 18, 0)
+    assert parse_deadline("2026-03-10T18:00:00-05:00", "America/Sao_Paulo") == datetime(2026, 3, 10, 23, 0)
+    with pytest.raises(ValueError):
+        parse_deadline("amanhã", "America/Sao_Paulo")
+    with pytest.raises(ValueError):
+        parse_deadline(1234, "America/Sao_Paulo")
+
+
+@pytest.fixture
+def ready_procurement(app, make_user):
+    buyer, headers = make_user("comprador@x.com", "COMPRADOR")
+    proc = Procurement(title="Processo", created_by=buyer.id)
+    db.session.add(proc)
+    db.session.flush()
+    db.session.add_all([
+        TR(procurement_id=proc.id, status=TRStatus.APROVADO, created_by=buyer.id),
+        Invite(procurement_id=proc.id, email="f@x.com", token="t1", created_by=buyer.id),
+    ])
+    db.session.commit()
+    return proc, headers
+
+
+def test_open_accepts_later_today_in_app_timezone(app, client, ready_procurement):
+    proc, headers = ready_procurement
+    app.config["APP_TIMEZONE"] = "America/Sao_Paulo"
+    # Daqui a 1h no horário de Brasília, como o datetime-local envia (sem offset)
+    local = datetime.utcnow() - timedelta(hours=3) + timedelta(hours=1)
+    response = client.post(f"/api/procurements/{proc.id}/open", headers=headers,
+                           json={"deadline": local.strftime("%Y-%m-%dT%H:%M")})
+    assert response.status_code == 200, response.get_json()
+    stored = db.session.get(Procurement, proc.id).deadline_proposals
+    assert timedelta(minutes=58) < stored - datetime.utcnow() <= timedelta(hours=1)
+
+
+def test_open_rejects_past_and_invalid_deadlines(app, client, ready_procurement):
+    proc, headers = ready_procurement
+    past = (datetime.utcnow() - timedelta(minutes=5)).isoformat() + "Z"
+    for deadline in (past, "31/12/2026"):
+        response = client.post(f"/api/procurements/{proc.id}/open", headers=headers, json={"deadline": deadline})
+        assert response.status_code == 400
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Exportação CSV/XLSX: quem vê os preços de quem"""
+
+import csv
+import io
+
+import pytest
+
+from app import db
+from app.models import Proposal, ProposalPrice, ProposalService, ProposalStatus
+
+
+@pytest.fixture
+def two_proposals(make_user, open_procurement, priced_proposal):
+    """Segunda proposta, de outro fornecedor, com 7,00 por item"""
+    ctx = open_procurement
+    other, other_headers = make_user("outro@x.com", "FORNECEDOR", "Outra")
+    proposal = Proposal(procurement_id=ctx.proc.id, supplier_user_id=other.id,
+                        status=ProposalStatus.ENVIADA)
+    db.session.add(proposal)
+    db.session.flush()
+    for sid in ctx.item_ids:
+        db.session.add(ProposalService(proposal_id=proposal.id, service_item_id=sid, qty=1))
+        db.session.add(ProposalPrice(proposal_id=proposal.id, service_item_id=sid, unit_price=7))
+    db.session.commit()
+    return ctx
+
+
+def _csv(response):
+    return list(csv.reader(io.StringIO(response.get_data().decode("utf-8-sig"))))
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx"])
+def test_requester_cannot_export_commercial_items(app, client, two_proposals, fmt):
+    ctx = two_proposals
+    response = client.get(f"/api/proposals/{ctx.proc.id}/commercial-items/export?format={fmt}",
+                          headers=ctx.requester_headers)
+    assert response.status_code == 403
+
+
+def test_supplier_exports_only_its_own_proposal(app, client, two_proposals):
+    ctx = two_proposals
+    response = client.get(f"/api/proposals/{ctx.proc.id}/commercial-items/export",
+                          headers=ctx.supplier_headers)
+    assert response.status_code == 200
+    header, *rows = _csv(response)
+    assert [h for h in header if "Preço unit." in h] == ["fornecedor (Fornecedora) - Preço unit."]
+    assert rows[-1][-1] == "40"
+
+
+def test_buyer_exports_every_proposal(app, client, two_proposals):
+    ctx = two_proposals
+    response = client.get(f"/api/proposals/{ctx.proc.id}/commercial-items/export",
+                          headers=ctx.buyer_headers)
+    assert response.status_code == 200
+    header, *rows = _csv(response)
+    assert len([h for h in header if "Preço unit." in h]) == 2
+    assert rows[-1][-4:] == ["40", "", "", "14"]
+
+
+def test_comparison_export_is_buyer_only(app, client, two_proposals):
+    ctx = two_proposals
+    for headers in (ctx.requester_headers, ctx.supplier_headers):
+        response = client.get(f"/api/procurements/{ctx.proc.id}/comparison/export", headers=headers)
+        assert response.status_code == 403
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da importação de planilha do TR: 50.000 itens em CSV e XLSX.
+
+Fora da suíte padrão; rode com ``RUN_BENCHMARKS=1 python -m pytest -q -s
+tests/test_import_benchmark.py``.  Imprime o tempo de cada formato e, numa
+segunda importação (mode=replace), o pico de memória Python (tracemalloc).
+"""
+
+import io
+import os
+import time
+import tracemalloc
+
+import pytest
+
+from app import db
+from app.models import TR, TRServiceItem
+from app.utils.export import stream_xlsx
+
+pytestmark = pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS=1 para rodar")
+
+ITEMS = 50_000
+HEADER = ["Item", "Código", "Descrição", "Unid.", "Qtde"]
+
+
+def _rows():
+    for i in range(1, ITEMS + 1):
+        yield [i, f"C{i}", f"Serviço número {i} com descrição", "m2", f"{i % 97},5"]
+
+
+def _csv() -> bytes:
+    lines = [";".join(HEADER)] + [";".join(str(v) for v in row) for row in _rows()]
+    return "\n".join(lines).encode()
+
+
+def _xlsx() -> bytes:
+    return b"".join(stream_xlsx(HEADER, _rows()))
+
+
+@pytest.mark.parametrize("fmt,build", [("csv", _csv), ("xlsx", _xlsx)])
+def test_import_50k_items(app, client, make_user, fmt, build):
+    requester, headers = make_user("requisitante@x.com", "REQUISITANTE")
+    tr = TR(procurement_id=None, created_by=requester.id)
+    db.session.add(tr)
+    db.session.commit()
+    data = build()
+
+    def upload():
+        return client.post(
+            f"/api/tr/{tr.id}/items/import?mode=replace", headers=headers,
+            data={"file": (io.BytesIO(data), f"planilha.{fmt}")}, content_type="multipart/form-data",
+        )
+
+    started = time.perf_counter()
+    response = upload()
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.get_json()
+
+    # Memória em uma segunda rodada: o tracemalloc deixa a execução bem mais lenta
+    tracemalloc.start()
+    response = upload()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert response.status_code == 200, response.get_json()
+    assert TRServiceItem.query.filter_by(tr_id=tr.id).count() == ITEMS
+    print(f"\n{fmt}: {ITEMS} itens, arquivo {len(data) / 1e6:.1f} MB, "
+          f"{elapsed:.2f} s, pico {peak / 1e6:.1f} MB")
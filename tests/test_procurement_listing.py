@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""GET /api/procurements: número de consultas constante no tamanho da página"""
+
+import pytest
+
+from app import db
+from app.models import Procurement, ProcurementStatus, TR, TRStatus
+
+
+def _seed(count, buyer, requester, status=ProcurementStatus.ABERTO):
+    for i in range(count):
+        proc = Procurement(title=f"Processo {i}", description="desc", status=status,
+                           created_by=buyer.id, requisitante_id=requester.id)
+        db.session.add(proc)
+        db.session.flush()
+        db.session.add(TR(procurement_id=proc.id, objetivo=f"objetivo {i}",
+                          status=TRStatus.APROVADO, created_by=requester.id))
+    db.session.commit()
+
+
+def _listing_queries(client, headers, count_queries, url="/api/procurements"):
+    client.get(url, headers=headers)  # aquece o cache de identidade
+    with count_queries() as queries:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return len(response.get_json()), len(queries)
+
+
+@pytest.mark.parametrize("role,url", [
+    ("COMPRADOR", "/api/procurements"),
+    ("COMPRADOR", "/api/procurements?count=0&include=description"),
+    ("FORNECEDOR", "/api/procurements?status=ABERTO"),
+    ("REQUISITANTE", "/api/procurements"),
+])
+def test_listing_query_count_does_not_grow_with_rows(app, client, make_user, count_queries, role, url):
+    buyer, buyer_headers = make_user("comprador@x.com", "COMPRADOR", "Compradora")
+    requester, requester_headers = make_user("requisitante@x.com", "REQUISITANTE")
+    _, supplier_headers = make_user("fornecedor@x.com", "FORNECEDOR", "Fornecedora")
+    headers = {"COMPRADOR": buyer_headers, "REQUISITANTE": requester_headers,
+               "FORNECEDOR": supplier_headers}[role]
+
+    _seed(2, buyer, requester)
+    rows_small, queries_small = _listing_queries(client, headers, count_queries, url)
+    _seed(28, buyer, requester)
+    rows_large, queries_large = _listing_queries(client, headers, count_queries, url)
+
+    assert (rows_small, rows_large) == (2, 30)
+    assert queries_small == queries_large
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Escritas de proposta: status do processo, valores e ids inválidos"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import ProcurementStatus
+
+
+@pytest.mark.parametrize("url,field", [
+    ("/api/proposals/{id}/service-qty", "qty"),
+    ("/api/proposals/{id}/prices", "unit_price"),
+])
+def test_closed_procurement_rejects_writes_without_scheduled_deadline(app, client, open_procurement, url, field):
+    # Encerrado antes de uma reinicialização: o agendador não tem o prazo
+    ctx = open_procurement
+    ctx.proc.status = ProcurementStatus.ANALISE_TECNICA
+    ctx.proc.deadline_proposals = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+
+    response = client.put(url.format(id=ctx.proc.id), headers=ctx.supplier_headers,
+                          json=[{"service_item_id": ctx.item_ids[0], field: 1}])
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Processo não está aberto para propostas"
+
+
+@pytest.mark.parametrize("raw", ["NaN", "Infinity", "-Infinity"])
+def test_non_finite_amounts_are_rejected(app, client, open_procurement, raw):
+    # O json do Python aceita NaN/Infinity como números
+    ctx = open_procurement
+    sid = ctx.item_ids[0]
+    response = client.put(f"/api/proposals/{ctx.proc.id}/prices", headers=ctx.supplier_headers,
+                          data=f'[{{"service_item_id": {sid}, "unit_price": {raw}}}]',
+                          content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == f"unit_price inválido para service_item_id {sid}"
+
+    response = client.patch(f"/api/proposals/{ctx.proc.id}/autosave", headers=ctx.supplier_headers,
+                            data=f'{{"seq": 1, "changes": [{{"service_item_id": {sid}, '
+                                 f'"field": "qty", "value": {raw}}}]}}',
+                            content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == f"qty inválido para service_item_id {sid}"
+
+
+@pytest.mark.parametrize("sid", [[1], {"id": 1}, "1", True, 1.0])
+def test_non_int_service_item_ids_are_rejected(app, client, open_procurement, sid):
+    ctx = open_procurement
+    response = client.post(f"/api/procurements/{ctx.proc.id}/proposals", headers=ctx.supplier_headers,
+                           json={"prices": [{"service_item_id": sid, "unit_price": 1}]})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "service_item_id inválido"
+
+    response = client.put(f"/api/proposals/{ctx.proc.id}/service-qty", headers=ctx.supplier_headers,
+                          json=[{"service_item_id": sid, "qty": 1}])
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "service_item_id inválido"
+
+    response = client.patch(f"/api/proposals/{ctx.proc.id}/autosave", headers=ctx.supplier_headers,
+                            json={"seq": 1, "changes": [{"service_item_id": sid, "field": "qty", "value": 1}]})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "service_item_id inválido"
+
+
+@pytest.mark.parametrize("key,value", [("prices", 5), ("service_items", {"service_item_id": 1}), ("prices", "x")])
+def test_non_list_lines_are_rejected(app, client, open_procurement, key, value):
+    ctx = open_procurement
+    response = client.post(f"/api/procurements/{ctx.proc.id}/proposals", headers=ctx.supplier_headers,
+                           json={key: value})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "itens devem ser enviados em uma lista"
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Critério e simulação de cenários: validação de top_k e max_price"""
+
+import pytest
+
+from app import db
+from app.models import Proposal, ProposalStatus
+from app.utils.scoring import MAX_TOP_K
+
+
+@pytest.fixture
+def scenarios_url(open_procurement):
+    ctx = open_procurement
+    db.session.add(Proposal(procurement_id=ctx.proc.id, supplier_user_id=ctx.supplier.id,
+                            status=ProposalStatus.APROVADA_TECNICAMENTE, technical_score=80, total_value=100))
+    db.session.commit()
+    return f"/api/procurements/{ctx.proc.id}/scoring/scenarios", ctx.buyer_headers
+
+
+@pytest.mark.parametrize("top_k", ["Infinity", "NaN", "0", str(MAX_TOP_K + 1), "2.5", "true", '"3"'])
+def test_invalid_top_k_is_rejected_with_its_own_message(client, scenarios_url, top_k):
+    url, headers = scenarios_url
+    response = client.post(url, headers=headers, content_type="application/json",
+                           data=f'{{"sweep": {{"steps": 3}}, "top_k": {top_k}}}')
+    assert response.status_code == 400
+    assert response.get_json()["error"] == f"top_k deve ser um inteiro entre 1 e {MAX_TOP_K}"
+
+
+def test_top_k_defaults_and_accepts_range(client, scenarios_url):
+    url, headers = scenarios_url
+    response = client.post(url, headers=headers, json={"sweep": {"steps": 3}})
+    assert response.status_code == 200
+    assert response.get_json()["stability"]["top_k"] == 3
+    response = client.post(url, headers=headers, json={"sweep": {"steps": 3}, "top_k": MAX_TOP_K})
+    assert response.get_json()["stability"]["top_k"] == MAX_TOP_K
+
+
+@pytest.mark.parametrize("max_price", [1e30, 1e16, "1e300"])
+def test_max_price_beyond_the_column_is_rejected(client, open_procurement, max_price):
+    ctx = open_procurement
+    url = f"/api/procurements/{ctx.proc.id}/scoring"
+    response = client.put(url, headers=ctx.buyer_headers, json={"max_price": max_price})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "max_price deve ser menor que 10^16"
+    assert client.get(url, headers=ctx.buyer_headers).get_json()["saved"] is False
+
+
+def test_max_price_is_stored_in_cents(client, open_procurement):
+    ctx = open_procurement
+    url = f"/api/procurements/{ctx.proc.id}/scoring"
+    response = client.put(url, headers=ctx.buyer_headers, json={"max_price": 1234.567})
+    assert response.status_code == 200
+    assert response.get_json()["max_price"] == 1234.57
+    assert client.get(url, headers=ctx.buyer_headers).get_json()["max_price"] == 1234.57
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Documento de busca acompanha o vínculo TR -> processo"""
+
+import pytest
+
+from app import db
+from app.models import Procurement, TR
+
+
+def _search_ids(client, headers, q):
+    response = client.get("/api/search", query_string={"q": q}, headers=headers)
+    assert response.status_code == 200
+    return {row["id"] for row in response.get_json()}
+
+
+@pytest.mark.parametrize("link", ["column", "relationship"])
+def test_linking_tr_reindexes_old_and_new_procurement(app, client, make_user, link):
+    buyer, headers = make_user("comprador@x.com", "COMPRADOR")
+    first = Procurement(title="Processo A", created_by=buyer.id)
+    second = Procurement(title="Processo B", created_by=buyer.id)
+    tr = TR(procurement_id=None, objetivo="impermeabilizacao da laje", created_by=buyer.id)
+    db.session.add_all([first, second, tr])
+    db.session.commit()
+    assert _search_ids(client, headers, "impermeabilizacao") == set()
+
+    tr.procurement_id = first.id
+    db.session.commit()
+    assert _search_ids(client, headers, "impermeabilizacao") == {first.id}
+
+    if link == "column":
+        tr.procurement_id = second.id
+    else:
+        tr.procurement = second
+    db.session.commit()
+    assert _search_ids(client, headers, "impermeabilizacao") == {second.id}
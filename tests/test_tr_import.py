@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Importação de planilha do TR: arquivos fora do formato, limite de tamanho, mode=replace"""
+
+import io
+import zipfile
+
+import pytest
+
+from app import db
+from app.models import ProposalPrice, TR, TRServiceItem
+
+
+@pytest.fixture
+def tr_upload(app, client, make_user):
+    requester, headers = make_user("requisitante@x.com", "REQUISITANTE")
+    tr = TR(procurement_id=None, created_by=requester.id)
+    db.session.add(tr)
+    db.session.commit()
+
+    def upload(data, filename):
+        return client.post(f"/api/tr/{tr.id}/items/import", headers=headers,
+                           data={"file": (io.BytesIO(data), filename)}, content_type="multipart/form-data")
+    return upload
+
+
+def _zip(parts: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in parts.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_xlsx_without_sheet_reports_missing_part(tr_upload):
+    response = tr_upload(_zip({"xl/styles.xml": "<styleSheet/>"}), "planilha.xlsx")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Planilha inválida: XLSX sem a aba xl/worksheets/sheet1.xml"
+
+
+def test_xlsx_with_unknown_shared_string_is_rejected(tr_upload):
+    sheet = (
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        '<row r="1"><c r="A1" t="s"><v>7</v></c></row></sheetData></worksheet>'
+    )
+    response = tr_upload(_zip({"xl/worksheets/sheet1.xml": sheet}), "planilha.xlsx")
+    assert response.status_code == 400
+    assert "texto compartilhado inexistente na célula A1" in response.get_json()["error"]
+
+
+def test_corrupted_files_keep_generic_message(tr_upload):
+    assert tr_upload(b"not a zip", "planilha.xlsx").status_code == 400
+    response = tr_upload("descricao;qtde\nSé;1\n".encode("latin-1"), "planilha.csv")
+    assert response.status_code == 400
+    assert "codificação" in response.get_json()["error"]
+
+
+def _chunked_upload(client, url, headers, content: bytes, filename="planilha.csv"):
+    """POST multipart sem Content-Length, como um upload chunked"""
+    boundary = "limite"
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return client.post(url, headers={**headers, "Transfer-Encoding": "chunked"}, input_stream=io.BytesIO(body),
+                       content_type=f"multipart/form-data; boundary={boundary}",
+                       environ_overrides={"wsgi.input_terminated": True})
+
+
+@pytest.mark.parametrize("max_content_length", [2000, 100_000])
+def test_chunked_upload_over_the_limit_is_rejected(app, client, make_user, max_content_length):
+    # Corpo acima de MAX_CONTENT_LENGTH (cortado no stream) ou só o arquivo acima do limite
+    app.config.update(TR_IMPORT_MAX_BYTES=1000, MAX_CONTENT_LENGTH=max_content_length)
+    requester, headers = make_user("requisitante@x.com", "REQUISITANTE")
+    tr = TR(procurement_id=None, created_by=requester.id)
+    db.session.add(tr)
+    db.session.commit()
+
+    content = b"descricao;qtde\n" + b"servico;1\n" * 500
+    response = _chunked_upload(client, f"/api/tr/{tr.id}/items/import", headers, content)
+    assert response.status_code == 413
+    assert response.get_json()["error"] == "Arquivo muito grande"
+
+    response = _chunked_upload(client, f"/api/tr/{tr.id}/items/import", headers, content[:195])
+    assert response.status_code == 200
+    assert response.get_json()["inserted"] == 18
+
+
+def test_replace_refuses_to_wipe_proposed_items(app, client, priced_proposal, open_procurement):
+    ctx = open_procurement
+    response = client.post(f"/api/tr/{ctx.tr.id}/items/import?mode=replace", headers=ctx.requester_headers,
+                           data={"file": (io.BytesIO(b"descricao;qtde\nnovo;1\n"), "planilha.csv")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 409
+    assert "TR APROVADO" in response.get_json()["error"]
+
+    db.session.expire_all()
+    assert ProposalPrice.query.filter_by(proposal_id=priced_proposal.id).count() == 2
+    assert TRServiceItem.query.filter_by(tr_id=ctx.tr.id).count() == 2
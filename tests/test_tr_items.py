@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Planilha do TR por diff: itens propostos não somem, linhas iguais não regravam"""
+
+from decimal import Decimal
+
+from app import db
+from app.models import ProposalPrice, ProposalService, TRServiceItem, TRStatus
+
+
+def _sheet(*rows):
+    return {"planilha_servico": [
+        {"item_ordem": ordem, "descricao": descricao, "unid": "UN", "qtde": 2}
+        for ordem, descricao in rows
+    ]}
+
+
+def _proposed_rows(proposal_id):
+    services = ProposalService.query.filter_by(proposal_id=proposal_id).count()
+    prices = ProposalPrice.query.filter_by(proposal_id=proposal_id).count()
+    return services, prices
+
+
+def test_approved_tr_refuses_dropping_items(app, client, priced_proposal, open_procurement):
+    ctx = open_procurement
+    response = client.put(f"/api/tr/{ctx.tr.id}", headers=ctx.requester_headers,
+                          json=_sheet((1, "servico 0")))
+    assert response.status_code == 409
+    assert "TR APROVADO" in response.get_json()["error"]
+
+    db.session.expire_all()
+    assert TRServiceItem.query.filter_by(tr_id=ctx.tr.id).count() == 2
+    assert _proposed_rows(priced_proposal.id) == (2, 2)
+    assert db.session.get(type(priced_proposal), priced_proposal.id).total_value == Decimal("40")
+
+
+def test_proposed_items_are_kept_even_on_a_draft_tr(app, client, priced_proposal, open_procurement):
+    # Renumerar sem codigo deixa o item sem par: seria DELETE + INSERT
+    ctx = open_procurement
+    ctx.tr.status = TRStatus.RASCUNHO
+    db.session.commit()
+
+    response = client.put(f"/api/tr/{ctx.tr.id}", headers=ctx.requester_headers,
+                          json=_sheet((1, "servico 0"), (3, "servico 1")))
+    assert response.status_code == 409
+    assert "propostos" in response.get_json()["error"]
+    db.session.expire_all()
+    assert _proposed_rows(priced_proposal.id) == (2, 2)
+
+
+def test_draft_tr_without_proposals_drops_items(app, client, open_procurement):
+    ctx = open_procurement
+    ctx.tr.status = TRStatus.REJEITADO
+    db.session.commit()
+
+    response = client.put(f"/api/tr/{ctx.tr.id}", headers=ctx.requester_headers,
+                          json=_sheet((1, "servico 0")))
+    assert response.status_code == 200
+    assert response.get_json()["items"] == {"inserted": 0, "updated": 0, "deleted": 1, "unchanged": 1}
+
+
+def test_unchanged_legacy_rows_are_not_rewritten(app, client, open_procurement):
+    # Linhas antigas: codigo NULL e qtde gravada com outra escala
+    ctx = open_procurement
+    db.session.execute(TRServiceItem.__table__.update().values(codigo=None, qtde=Decimal("2.0")))
+    db.session.commit()
+
+    for _ in range(2):
+        response = client.put(f"/api/tr/{ctx.tr.id}", headers=ctx.requester_headers,
+                              json=_sheet((1, "servico 0"), (2, "servico 1")))
+        assert response.status_code == 200
+        assert response.get_json()["items"] == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 2}
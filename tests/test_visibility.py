@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Visibilidade do fornecedor: status público pelo predicado, convites pela tabela"""
+
+import pytest
+
+from app import db
+from app.models import Invite, Procurement, ProcurementStatus, SupplierVisibility
+
+
+@pytest.fixture
+def buyer(make_user):
+    return make_user("comprador@x.com", "COMPRADOR", "Compradora")[0]
+
+
+def _procurement(buyer, status, title="Processo"):
+    proc = Procurement(title=title, created_by=buyer.id, status=status)
+    db.session.add(proc)
+    db.session.commit()
+    return proc
+
+
+def _visible_ids(client, headers):
+    response = client.get("/api/procurements?count=0", headers=headers)
+    assert response.status_code == 200
+    return {row["id"] for row in response.get_json()}
+
+
+def test_public_status_needs_no_rows(app, client, make_user, buyer):
+    _, headers = make_user("fornecedor@x.com", "FORNECEDOR")
+    opened = _procurement(buyer, ProcurementStatus.TR_APROVADO, "aberto")
+    hidden = _procurement(buyer, ProcurementStatus.TR_APROVADO, "oculto")
+    opened.status = ProcurementStatus.ABERTO
+    db.session.commit()
+
+    assert SupplierVisibility.query.count() == 0
+    assert _visible_ids(client, headers) == {opened.id}
+    assert client.get(f"/api/procurements/{opened.id}", headers=headers).status_code == 200
+    assert client.get(f"/api/procurements/{hidden.id}", headers=headers).status_code == 403
+
+    # Sair do status público esconde de novo, sem escrita na tabela
+    opened.status = ProcurementStatus.ANALISE_COMERCIAL
+    db.session.commit()
+    assert _visible_ids(client, headers) == set()
+
+
+def test_invite_rows_follow_invites_not_suppliers(app, client, make_user, buyer):
+    proc = _procurement(buyer, ProcurementStatus.ANALISE_COMERCIAL)
+    # Convite antes do cadastro: a linha nasce quando o fornecedor se registra
+    db.session.add(Invite(procurement_id=proc.id, email="convidado@x.com", token="t1",
+                          created_by=buyer.id))
+    db.session.commit()
+    assert SupplierVisibility.query.count() == 0
+
+    invited, invited_headers = make_user("convidado@x.com", "FORNECEDOR")
+    _, other_headers = make_user("outro@x.com", "FORNECEDOR")
+    assert [(v.user_id, v.procurement_id) for v in SupplierVisibility.query] == [(invited.id, proc.id)]
+
+    assert _visible_ids(client, invited_headers) == {proc.id}
+    assert _visible_ids(client, other_headers) == set()
+    assert client.get(f"/api/procurements/{proc.id}", headers=other_headers).status_code == 403
+
+
+def test_status_change_does_not_touch_the_table(app, make_user, buyer, count_queries):
+    for i in range(5):
+        make_user(f"fornecedor{i}@x.com", "FORNECEDOR")
+    proc = _procurement(buyer, ProcurementStatus.TR_APROVADO)
+
+    with count_queries() as queries:
+        proc.status = ProcurementStatus.ABERTO
+        db.session.commit()
+    assert not [sql for sql in queries if "supplier_visibility" in sql]
+    assert SupplierVisibility.query.count() == 0